@@ -0,0 +1,119 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import statistics
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+
+from benchmarks.run import CLEAN_STAGES, scale_wide
+
+DEFAULT_STAGES = ['clean.co2', 'clean.energy', 'clean.us_co2']
+
+
+def setup(stage, countries, impl):
+    import logging
+    import os
+    import warnings
+    os.environ['CLIMATE_BUNDLE'] = 'off'
+    warnings.filterwarnings('ignore')
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    import streamlit as st
+
+    import climate_data as cd
+    from ingest_cache import load_source
+
+    source, id_col, clean = CLEAN_STAGES[stage]
+    scaled = scale_wide(load_source(source), id_col, countries)
+    if impl == 'cache_data':
+        # the decorator these functions used to carry: hash the argument, pickle the result
+        legacy = SimpleNamespace(**{name: st.cache_data(getattr(cd, name).__wrapped__)
+                                    for name in ('clean_co2_data', 'clean_worldbank_data', 'clean_us_co2_data')})
+        return scaled, lambda: clean(legacy, scaled)
+    # what build_*_clean sees: the frame get_dataset handed out, which carries its source key
+    cd.DATASETS[source] = ((), lambda: scaled)
+    raw = cd.get_dataset(source)
+    return raw, lambda: clean(cd, raw)
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * 4096 / 2**20
+
+
+def measure(stage, countries, impl, hits, sessions, queue):
+    raw, call = setup(stage, countries, impl)
+
+    start = time.perf_counter()
+    first = call()
+    miss_ms = (time.perf_counter() - start) * 1000
+
+    times = []
+    for _ in range(hits):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+
+    # every session keeps the frame its last rerun got back
+    gc.collect()
+    before = rss_mb()
+    held = [call() for _ in range(sessions)]
+    gc.collect()
+    held_mb = rss_mb() - before
+
+    queue.put({
+        'stage': stage,
+        'countries_scale': countries,
+        'impl': impl,
+        'input_mb': round(float(raw.memory_usage(deep=True).sum()) / 2**20, 1),
+        'result_mb': round(float(first.memory_usage(deep=True).sum()) / 2**20, 1),
+        'miss_ms': round(miss_ms, 1),
+        'hit_us_median': round(statistics.median(times) * 1e6),
+        'hit_us_p95': round(statistics.quantiles(times, n=20)[-1] * 1e6),
+        'mb_per_session': round(held_mb / len(held), 3),
+    })
+
+
+def run_isolated(*args):
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=measure, args=args + (queue,))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        raise RuntimeError(f'benchmark worker failed for {args}')
+    return queue.get()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare st.cache_data with fingerprint-keyed shared caching '
+                                                 'for the clean_* transforms.')
+    parser.add_argument('stages', nargs='*', help=f"clean stages (default: {', '.join(DEFAULT_STAGES)})")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--hits', type=int, default=200)
+    parser.add_argument('--sessions', type=int, default=20,
+                        help='simulated sessions holding a cache hit (st.cache_data needs sessions x result size of RAM)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON lines')
+    args = parser.parse_args()
+    unknown = [stage for stage in args.stages if stage not in CLEAN_STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}; choose from {', '.join(CLEAN_STAGES)}")
+
+    results = []
+    for stage in args.stages or DEFAULT_STAGES:
+        for countries in args.scales:
+            for impl in ('cache_data', 'fingerprinted'):
+                results.append(run_isolated(stage, countries, impl, args.hits, args.sessions))
+
+    if args.json:
+        for row in results:
+            print(json.dumps(row))
+    else:
+        print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
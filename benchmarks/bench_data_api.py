@@ -0,0 +1,130 @@
+import argparse
+import csv
+import functools
+import gzip
+import io
+import json
+import os
+import statistics
+import struct
+import threading
+import time
+import urllib.request
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+PUBLIC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'climate-analysis-app', 'public')
+# what dataLoader.js fetched before the data API
+STATIC_FILES = ['data/co2_pcap_cons.csv', 'invidual/us_temperature.csv', 'invidual/us_co2_emissions.csv',
+                'invidual/us_energy_use.csv']
+# what it fetches now, in one request
+BATCH = ['CO2_per_capita/NOR', 'Energy_use_per_capita/NOR', 'GDP_growth/NOR', 'Temperature_F/USA',
+         'CO2_emissions_1000_tonnes/USA', 'US_Energy_use_per_capita/USA']
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def fetch(url, headers=None):
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.headers, exc.read()
+
+
+def parse_csv(payloads):
+    # the PapaParse({header: true}) step: every row of every file becomes a dict
+    rows = [list(csv.DictReader(io.StringIO(data.decode('utf-8-sig')))) for data in payloads]
+    norway = next(row for row in rows[0] if row['country'] and 'norway' in row['country'].lower())
+    return {year: float(value) for year, value in norway.items() if year.isdigit() and value}
+
+
+def parse_json(data):
+    return json.loads(gzip.decompress(data))
+
+
+def parse_binary(data):
+    raw = gzip.decompress(data)
+    count, = struct.unpack_from('<I', raw)
+    offset, series = 4, []
+    for _ in range(count):
+        first, length = struct.unpack_from('<hH', raw, offset)
+        series.append((first, np.frombuffer(raw, '<f4', length, offset + 4)))
+        offset += 4 + 4 * length
+    return series
+
+
+def timed(parse, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse()
+        times.append(time.perf_counter() - start)
+    return round(statistics.median(times) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the React app's CSV downloads with the data API.")
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--json', action='store_true', help='print results as JSON lines')
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    import data_api
+
+    # local stand-ins for the static host and the API
+    static = start(ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=PUBLIC)))
+    service = data_api.SeriesService()
+    api = start(data_api.serve(port=0, service=service))
+
+    payloads = [fetch(f'{static}/{path}')[2] for path in STATIC_FILES]
+    results = [{
+        'client': 'csv files + parse',
+        'requests': len(payloads),
+        'wire_bytes': sum(map(len, payloads)),
+        'wire_bytes_if_gzipped': sum(len(gzip.compress(data)) for data in payloads),
+        'parse_ms': timed(lambda: parse_csv(payloads), args.repeat),
+    }]
+
+    gzip_header = {'Accept-Encoding': 'gzip'}
+    for fmt, parse in (('json', parse_json), ('binary', parse_binary)):
+        url = f"{api}/batch?series={','.join(BATCH)}&format={fmt}"
+        start_time = time.perf_counter()
+        status, headers, cold = fetch(url, gzip_header)
+        cold_ms = (time.perf_counter() - start_time) * 1000
+        assert status == 200, cold
+        _, _, body = fetch(url, gzip_header)
+        revalidated, _, not_modified = fetch(url, dict(gzip_header, **{'If-None-Match': headers['ETag']}))
+        results.append({
+            'client': f'api batch ({fmt})',
+            'requests': 1,
+            'wire_bytes': len(body),
+            'wire_bytes_if_gzipped': len(body),
+            'parse_ms': timed(lambda: parse(body), args.repeat),
+            'first_response_ms': round(cold_ms, 1),
+            'server_ms': timed(lambda: fetch(url, gzip_header), args.repeat),
+            'revalidate_status': revalidated,
+            'revalidate_bytes': len(not_modified),
+        })
+
+    if args.json:
+        for row in results:
+            print(json.dumps(row))
+    else:
+        print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.run import scale_wide
+
+STAGES = ['co2_trends', 'norway_co2__Year__CO2_per_capita__mean', 'us_co2_per_capita']
+
+
+def revise_cells(df):
+    # a release that corrects the last two years for a handful of countries
+    df.update(df.iloc[:5, -2:].mul(1.05))
+    return df
+
+
+def add_year(df):
+    return df.assign(**{str(int(df.columns[-1]) + 1): df[df.columns[-1]] * 1.01})
+
+
+CHANGES = {'revise 10 cells': revise_cells, 'add a year': add_year}
+
+
+def edit(path, change):
+    CHANGES[change](pd.read_csv(path)).to_csv(path, index=False)
+    # same-second rewrites must still change the fingerprint
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def refresh_ms(bundle, previous=None):
+    # stages carried over from previous still record what they took to build there
+    return sum(entry.get('stage_ms', 0) for name, entry in bundle.artifacts.items()
+               if previous is None or entry != previous.artifacts.get(name))
+
+
+def written_mb(bundle):
+    # files linked from the previous bundle have more than one link
+    sizes = [os.stat(os.path.join(root, name)) for root, _, names in os.walk(bundle.path) for name in names]
+    return round(sum(stat.st_size for stat in sizes if stat.st_nlink == 1) / 2**20, 2)
+
+
+def measure(scale, queue):
+    import logging
+    import warnings
+    tmp = tempfile.mkdtemp()
+    os.environ['INGEST_CACHE_DIR'] = os.path.join(tmp, 'ingest')
+    os.environ['CLIMATE_BUNDLE'] = 'off'
+    os.environ['CLIMATE_SHARED'] = 'off'
+    warnings.filterwarnings('ignore')
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    import climate_data as cd
+    import pipeline
+    from ingest_cache import SOURCES, load_source
+
+    path = os.path.join(tmp, 'co2_pcap_cons.csv')
+    scale_wide(load_source('co2_data'), 'country', scale).to_csv(path, index=False)
+    SOURCES['co2_data'] = (path, {})
+    quiet = lambda message: None
+
+    try:
+        before = pipeline.build(os.path.join(tmp, 'incremental'), names=STAGES, log=quiet)
+        for change in CHANGES:
+            edit(path, change)
+            load_source('co2_data')
+            cd.shared_cache().clear()
+            start = time.perf_counter()
+            patched = pipeline.build(os.path.join(tmp, 'incremental'), names=STAGES, log=quiet)
+            incremental_s = time.perf_counter() - start
+            cd.shared_cache().clear()
+            start = time.perf_counter()
+            full = pipeline.build(os.path.join(tmp, 'full'), names=STAGES, force=True, log=quiet)
+            full_s = time.perf_counter() - start
+
+            summary = patched.manifest['changes']['summary']['co2_data']
+            queue.put({
+                'countries_scale': scale,
+                'change': change,
+                'cells_changed': summary['cells'],
+                'cells_total': int(full.load('co2_clean').shape[0]),
+                'full_stage_ms': round(refresh_ms(full), 1),
+                'delta_stage_ms': round(refresh_ms(patched, before), 1),
+                'full_mb': written_mb(full),
+                'delta_mb': written_mb(patched),
+                'full_s': round(full_s, 2),
+                'incremental_s': round(incremental_s, 2),
+                'identical': all(pipeline.same_value(patched.load(name), full.load(name)) for name in full.names()),
+            })
+            before = patched
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    queue.put(None)
+
+
+def run_isolated(*args):
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=measure, args=args + (queue,))
+    proc.start()
+    rows = list(iter(queue.get, None))
+    proc.join()
+    if proc.exitcode != 0:
+        raise RuntimeError(f'benchmark worker failed for {args}')
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare a delta refresh of the bundle with a full rebuild '
+                                                 'after a Gapminder CO2 release.')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--json', action='store_true', help='print results as JSON lines')
+    args = parser.parse_args()
+
+    results = []
+    for scale in args.scales:
+        results += run_isolated(scale)
+
+    if args.json:
+        for row in results:
+            print(json.dumps(row))
+    else:
+        print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from disasters import ParseMetrics, iter_disasters, read_disasters
+
+HEADER = b'Name,Disaster,Begin Date,End Date,CPI-Adjusted Cost,Unadjusted Cost,Deaths\n'
+PREAMBLE = b'Billion-Dollar Weather and Climate Disasters: Events\nCost values are in millions of dollars\n'
+DISASTERS = [b'Drought', b'Flooding', b'Freeze', b'Severe Storm', b'Tropical Cyclone', b'Wildfire', b'Winter Storm']
+
+
+def with_field(row, i, value):
+    fields = row.split(b',')
+    fields[i] = value(fields[i])
+    return b','.join(fields)
+
+
+# each fault is one kind of damage found in hand-edited or re-exported NOAA extracts
+FAULTS = {
+    'latin1_name': lambda row: with_field(row, 0, lambda name: name + b' Cr\xe9te'),
+    'unterminated_quote': lambda row: b'"' + row,
+    'quoted_comma': lambda row: with_field(row, 0, lambda name: b'"' + name + b', Central"'),
+    'trailing_comma': lambda row: row + b',,',
+    'extra_field': lambda row: row + b',oops',
+    'missing_field': lambda row: row.rsplit(b',', 1)[0],
+    'dollar_cost': lambda row: with_field(row, 4, lambda cost: b'"$%s"' % f'{float(cost):,.1f}'.encode()),
+    'suffix_cost': lambda row: with_field(row, 4, lambda cost: b'%.2fB' % (float(cost) / 1000)),
+    'missing_cost': lambda row: with_field(row, 5, lambda cost: b'n/a'),
+    'bad_deaths': lambda row: with_field(row, 6, lambda deaths: b'unknown'),
+    'iso_date': lambda row: with_field(row, 2, lambda date: b'%s-%s-%s' % (date[:4], date[4:6], date[6:])),
+    'repeated_header': lambda row: HEADER.rstrip(b'\n'),
+    'blank': lambda row: b'',
+}
+
+
+def synthetic_rows(n, rng):
+    year = rng.integers(1980, 2025, n)
+    month = rng.integers(1, 13, n)
+    day = rng.integers(1, 29, n)
+    length = rng.integers(0, 20, n)
+    cost = np.round(rng.lognormal(7.5, 1.2, n), 1)
+    deaths = rng.poisson(5, n)
+    kind = rng.integers(0, len(DISASTERS), n)
+    for i in range(n):
+        begin = year[i] * 10000 + month[i] * 100 + day[i]
+        end = begin + length[i] if day[i] + length[i] <= 28 else begin
+        yield (b'%s %d,%s,%d,%d,%.1f,%.1f,%d' % (
+            DISASTERS[kind[i]], i, DISASTERS[kind[i]], begin, end, cost[i], cost[i] * 0.6, deaths[i]))
+
+
+def generate(path, rows, fault_rate=0.01, seed=0):
+    rng = np.random.default_rng(seed)
+    names = list(FAULTS)
+    faulty = rng.random(rows) < fault_rate
+    picks = rng.integers(0, len(names), rows)
+    injected = dict.fromkeys(names, 0)
+    with open(path, 'wb') as f:
+        f.write(PREAMBLE + HEADER)
+        block = []
+        for i, row in enumerate(synthetic_rows(rows, rng)):
+            if faulty[i]:
+                name = names[picks[i]]
+                row = FAULTS[name](row)
+                injected[name] += 1
+            block.append(row)
+            if len(block) >= 50_000:
+                f.write(b'\n'.join(block) + b'\n')
+                block = []
+        if block:
+            f.write(b'\n'.join(block) + b'\n')
+    return injected
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(path, impl, chunk_mb, queue):
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    if impl == 'stream':
+        metrics = ParseMetrics()
+        rows = 0
+        cost = 0.0
+        for frame in iter_disasters(path, int(chunk_mb * 2**20), metrics):
+            rows += len(frame)
+            cost += frame['CPI-Adjusted Cost'].sum()
+        rejected = sum(metrics.rejected.values())
+    elif impl == 'frame':
+        df = read_disasters(path, int(chunk_mb * 2**20))
+        rows, rejected = len(df), df.attrs['parse_metrics']['rejected']
+    else:
+        # what load_data() used to do: anything malformed disappears without a trace
+        df = pd.read_csv(path, encoding='latin-1', skiprows=2, on_bad_lines='skip')
+        rows, rejected = len(df), None
+    elapsed = time.perf_counter() - start
+    queue.put({
+        'impl': impl,
+        'rows_kept': rows,
+        'rejected': rejected,
+        'wall_s': round(elapsed, 2),
+        'rows_per_s': round(rows / elapsed),
+        'mb_per_s': round(os.path.getsize(path) / 2**20 / elapsed, 1),
+        'peak_rss_delta_mb': round(peak_rss_mb() - before, 1),
+    })
+
+
+def run_isolated(*args):
+    # one process per measurement so ru_maxrss isn't polluted by earlier runs
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=measure, args=args + (queue,))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        raise RuntimeError(f'benchmark worker failed for {args}')
+    return queue.get()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the streaming NOAA disasters parser on a synthetic file.')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--fault-rate', type=float, default=0.01)
+    parser.add_argument('--chunk-mb', type=float, nargs='+', default=[0.5, 2, 8])
+    parser.add_argument('--path', help='keep the synthetic file here instead of a temporary directory')
+    parser.add_argument('--json', action='store_true', help='print results as JSON lines')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path or os.path.join(tmp, 'disasters.csv')
+        start = time.perf_counter()
+        injected = generate(path, args.rows, args.fault_rate)
+        print(f'generated {args.rows} rows ({os.path.getsize(path) / 2**20:.0f} MB) in '
+              f'{time.perf_counter() - start:.1f}s; injected faults: {injected}')
+
+        results = [run_isolated(path, 'pandas_skip', None)]
+        for chunk_mb in args.chunk_mb:
+            for impl in ('stream', 'frame'):
+                results.append(dict(run_isolated(path, impl, chunk_mb), chunk_mb=chunk_mb))
+
+    if args.json:
+        for row in results:
+            print(json.dumps(row))
+    else:
+        print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
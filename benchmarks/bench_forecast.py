@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from forecast import HORIZON, QUANTILES, country_rng, run_bands
+from trends import country_year_matrix, fit_series
+
+
+def loop_bands(labels, years, matrix, future, n_sims, seed):
+    # the straightforward version: refit every simulated history with fit_series, one simulation at a time
+    bands = []
+    for label, values in zip(labels, matrix):
+        rng = country_rng(seed, label)
+        present = ~np.isnan(values)
+        x, y = years[present], values[present]
+        fit = fit_series(x, y)
+        residuals = y - (fit['intercept'] + fit['slope'] * x)
+        paths = []
+        for _ in range(n_sims):
+            refit = fit_series(x, fit['intercept'] + fit['slope'] * x + rng.choice(residuals, len(x)))
+            paths.append(refit['intercept'] + refit['slope'] * future + rng.choice(residuals, len(future)))
+        bands.append(np.percentile(paths, QUANTILES, axis=0))
+    return np.array(bands)
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the bootstrap forecast engine against a per-simulation loop.')
+    parser.add_argument('--sims', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--start', type=int, default=1990, help='first year of the trend fit')
+    parser.add_argument('--loop-countries', type=int, default=5,
+                        help='countries to time the loop on (extrapolated to all of them)')
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument('--json', action='store_true', help='print results as JSON lines')
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    import climate_data as cd
+
+    df = cd.get_dataset('co2_index').df
+    labels, years, matrix = country_year_matrix(df, 'CO2_per_capita', start=args.start)
+    enough = (~np.isnan(matrix)).sum(axis=1) >= 3
+    labels, matrix = labels[enough], matrix[enough]
+    future = np.arange(years[-1] + 1, HORIZON + 1)
+
+    results = []
+    for n_sims in args.sims:
+        sample = slice(0, args.loop_countries)
+        seconds = timed(lambda: loop_bands(labels[sample], years, matrix[sample], future, n_sims, 0))
+        results.append({'impl': 'loop', 'workers': 1, 'sims': n_sims, 'countries': len(labels),
+                        'seconds': round(seconds * len(labels) / args.loop_countries, 2), 'extrapolated': True})
+        for workers in args.workers:
+            seconds = timed(lambda: run_bands(labels, years, matrix, future, n_sims, 0, workers=workers))
+            results.append({'impl': 'vectorised', 'workers': workers, 'sims': n_sims, 'countries': len(labels),
+                            'seconds': round(seconds, 2), 'extrapolated': False})
+
+        cd.get_forecast('co2_index', 'CO2_per_capita', args.start, n_sims=n_sims)
+        seconds = timed(lambda: cd.get_forecast('co2_index', 'CO2_per_capita', args.start, n_sims=n_sims))
+        results.append({'impl': 'cached', 'workers': 1, 'sims': n_sims, 'countries': len(labels),
+                        'seconds': round(seconds, 5), 'extrapolated': False})
+
+    if args.json:
+        for row in results:
+            print(json.dumps(row))
+    else:
+        print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
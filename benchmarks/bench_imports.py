@@ -0,0 +1,108 @@
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = ['streamlit_app', 'data_api', 'serving', 'forecast']
+# cold-start import budgets on a laptop-class CPU, with headroom over what each entry point takes today;
+# pulling in matplotlib, seaborn or TensorFlow at module level blows straight through them
+BUDGETS_MS = {
+    'streamlit_app': 1800,
+    'data_api': 1800,
+    'serving': 900,
+    'forecast': 900,
+}
+
+
+def entry_imports(path):
+    # the module-level imports of an entry point: what every process start pays before any code runs
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    return '\n'.join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def run(code, importtime=False):
+    flags = ['-X', 'importtime'] if importtime else []
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *flags, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return seconds, result.stderr
+
+
+def parse_importtime(output):
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+        })
+    return pd.DataFrame(rows, columns=['module', 'depth', 'self_ms', 'cumulative_ms'])
+
+
+def cold_start_ms(code, repeat):
+    # each run is a fresh interpreter; the bare interpreter start is subtracted
+    baseline = statistics.median(run('pass')[0] for _ in range(repeat))
+    return (statistics.median(run(code)[0] for _ in range(repeat)) - baseline) * 1000
+
+
+def profile(code):
+    table = parse_importtime(run(code, importtime=True)[1])
+    # a top-level package's cumulative time covers everything it pulled in
+    return table[table['depth'] == 0].sort_values('cumulative_ms', ascending=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile and check cold-start import time of the entry points.')
+    parser.add_argument('entries', nargs='*', help=f"entry modules or .py files (default: {', '.join(ENTRY_POINTS)})")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='slowest top-level imports to list per entry point')
+    parser.add_argument('--check', action='store_true', help='exit non-zero if an entry point is over its budget')
+    parser.add_argument('--budget-ms', type=float, help='budget for every entry point (default: BUDGETS_MS)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON lines')
+    args = parser.parse_args()
+
+    results, over = [], []
+    for entry in args.entries or ENTRY_POINTS:
+        path = entry if entry.endswith('.py') else os.path.join(ROOT, f'{entry}.py')
+        if not os.path.exists(path):
+            parser.error(f'no such entry point: {entry}')
+        name = os.path.splitext(os.path.basename(path))[0]
+        code = entry_imports(path)
+        budget = args.budget_ms or BUDGETS_MS.get(name)
+        row = {'entry': name, 'import_ms': round(cold_start_ms(code, args.repeat), 1), 'budget_ms': budget}
+        slowest = profile(code).head(args.top)
+        row['slowest'] = dict(zip(slowest['module'], slowest['cumulative_ms'].round(1)))
+        results.append(row)
+        if budget is not None and row['import_ms'] > budget:
+            over.append(row)
+
+    if args.json:
+        for row in results:
+            print(json.dumps(row))
+    else:
+        for row in results:
+            status = '' if row['budget_ms'] is None else f" (budget {row['budget_ms']:.0f} ms)"
+            print(f"{row['entry']}: {row['import_ms']:.0f} ms{status}")
+            for module, ms in row['slowest'].items():
+                print(f'  {ms:>8.1f} ms  {module}')
+    if args.check and over:
+        parser.exit(1, ''.join(f"{row['entry']} imports in {row['import_ms']:.0f} ms, over its "
+                               f"{row['budget_ms']:.0f} ms budget\n" for row in over))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import time
+
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'streamlit_app.py')
+
+
+def payload_bytes(node):
+    total = 0
+    proto = getattr(node, 'proto', None)
+    if proto is not None and hasattr(proto, 'ByteSize'):
+        total += proto.ByteSize()
+    for child in getattr(node, 'children', {}).values():
+        total += payload_bytes(child)
+    return total
+
+
+def dynamic_comparison_fragment():
+    import os
+    import sys
+    sys.path.insert(0, os.getcwd())
+    import streamlit_app
+    from climate_data import section_data
+    streamlit_app.show_dynamic_comparison(section_data(streamlit_app.show_interactive_charts))
+
+
+def trend_rankings_fragment():
+    import os
+    import sys
+    sys.path.insert(0, os.getcwd())
+    import streamlit_app
+    from climate_data import section_data
+    streamlit_app.show_trend_rankings(section_data(streamlit_app.show_statistical_analysis))
+
+
+def timed_run(at, interact=None):
+    if interact is not None:
+        interact(at)
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return elapsed, payload_bytes(at._tree)
+
+
+def measure(name, make_app, interactions, repeat):
+    at = make_app()
+    timed_run(at)
+    rows = []
+    for label, interact in interactions:
+        times = []
+        for _ in range(repeat):
+            elapsed, size = timed_run(at, interact)
+            times.append(elapsed)
+        rows.append({
+            'mode': name,
+            'interaction': label,
+            'latency_ms': round(sorted(times)[len(times) // 2] * 1000, 1),
+            'payload_bytes': size,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-interaction latency and payload: full-page rerun vs fragment rerun.')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='print results as JSON lines')
+    args = parser.parse_args()
+
+    comparison = [(f'comparison={option}', lambda at, option=option: at.selectbox[0].select(option))
+                  for option in ['Energy Consumption', 'GDP Growth', 'CO2 Emissions']]
+    window = [(f'window={start}-2000', lambda at, start=start: at.slider[0].set_value((start, 2000)))
+              for start in [1900, 1950, 1980]]
+
+    # AppTest always re-executes the whole script on a widget change, which is what the page cost
+    # before fragments. Running the fragment body on its own gives the cost of a fragment-scoped rerun.
+    results = []
+    results += measure('full_page', lambda: AppTest.from_file(APP, default_timeout=300), comparison + window, args.repeat)
+    results += measure('fragment', lambda: AppTest.from_function(dynamic_comparison_fragment, default_timeout=300),
+                       comparison, args.repeat)
+    results += measure('fragment', lambda: AppTest.from_function(trend_rankings_fragment, default_timeout=300),
+                       window, args.repeat)
+
+    if args.json:
+        for row in results:
+            print(json.dumps(row))
+    else:
+        for row in results:
+            print(f"{row['mode']:<10} {row['interaction']:<32} {row['latency_ms']:>8.1f} ms {row['payload_bytes']:>10,} B")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import json
+import multiprocessing
+import resource
+import time
+
+import pandas as pd
+
+from benchmarks import legacy_clean
+from ingest_cache import load_source
+from reshape import wide_to_long
+
+CASES = {
+    'co2_data': (
+        lambda df: legacy_clean.clean_co2_data(df),
+        lambda df: wide_to_long(df, 'country', 'CO2_per_capita'),
+        'country',
+    ),
+    'energy_data': (
+        lambda df: legacy_clean.clean_worldbank_data(df, 'Energy_use_per_capita'),
+        lambda df: wide_to_long(df, 'Country Name', 'Energy_use_per_capita'),
+        'Country Name',
+    ),
+    'us_co2_data': (
+        lambda df: legacy_clean.clean_us_co2_data(df),
+        lambda df: wide_to_long(df, 'country', 'CO2_emissions_1000_tonnes', min_year=1960),
+        'country',
+    ),
+}
+
+
+def scaled(df, id_col, scale):
+    if scale == 1:
+        return df
+    copies = [df]
+    for i in range(1, scale):
+        copy = df.copy()
+        copy[id_col] = copy[id_col].astype(str) + f' #{i}'
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(source, impl, scale, countries, queue):
+    legacy, engine, id_col = CASES[source]
+    df = scaled(load_source(source), id_col, scale)
+    if impl == 'engine' and countries:
+        run = lambda frame: wide_to_long(
+            frame, id_col, 'value', countries=countries,
+            min_year=1960 if source == 'us_co2_data' else None)
+    else:
+        run = legacy if impl == 'legacy' else engine
+
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    out = run(df)
+    elapsed = time.perf_counter() - start
+    queue.put({
+        'source': source,
+        'impl': impl if not countries else f'{impl}+filter',
+        'scale': scale,
+        'rows_out': len(out),
+        'wall_ms': round(elapsed * 1000, 2),
+        'peak_rss_delta_mb': round(peak_rss_mb() - before, 2),
+        'out_mb': round(out.memory_usage(deep=True).sum() / 2**20, 2),
+    })
+
+
+def run_isolated(*args):
+    # one process per measurement so ru_maxrss isn't polluted by earlier runs
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=measure, args=args + (queue,))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        raise RuntimeError(f'benchmark worker failed for {args}')
+    return queue.get()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the legacy melt cleaners with reshape.wide_to_long.')
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--json', action='store_true', help='print results as JSON lines')
+    args = parser.parse_args()
+
+    results = []
+    for source in CASES:
+        for scale in args.scale:
+            results.append(run_isolated(source, 'legacy', scale, None))
+            results.append(run_isolated(source, 'engine', scale, None))
+            results.append(run_isolated(source, 'engine', scale, ['Norway', 'United States', 'USA']))
+
+    if args.json:
+        for row in results:
+            print(json.dumps(row))
+    else:
+        print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
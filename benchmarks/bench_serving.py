@@ -0,0 +1,141 @@
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from serving import MODELS, ModelRegistry, PredictionService
+
+
+def sample_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.uniform(40000, 70000, n),
+        rng.uniform(-2, 6, n),
+        rng.integers(1971, 2036, n),
+    ]).astype(np.float64)
+
+
+def summarise(mode, latencies, elapsed, rows):
+    latencies = np.asarray(latencies) * 1000
+    return {
+        'mode': mode,
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'rows_per_s': round(rows / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+    }
+
+
+def run_clients(call, rows, clients):
+    latencies = [None] * len(rows)
+
+    def one(i):
+        start = time.perf_counter()
+        call(rows[i])
+        latencies[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        list(pool.map(one, range(len(rows))))
+    return latencies, time.perf_counter() - start
+
+
+def bench_direct(predict, rows):
+    latencies = []
+    start = time.perf_counter()
+    for row in rows:
+        t = time.perf_counter()
+        predict(row[None, :])
+        latencies.append(time.perf_counter() - t)
+    return summarise('direct, one row per call', latencies, time.perf_counter() - start, len(rows))
+
+
+def bench_bulk(predict, rows, batch):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(0, len(rows), batch):
+        t = time.perf_counter()
+        predict(rows[i:i + batch])
+        latencies.append(time.perf_counter() - t)
+    return summarise(f'direct, {batch} rows per call', latencies, time.perf_counter() - start, len(rows))
+
+
+def bench_service(name, registry, rows, clients, max_batch, max_wait_ms, cached):
+    service = PredictionService(registry, max_batch=max_batch, max_wait_ms=max_wait_ms,
+                                cache_size=len(rows) if cached else 0)
+    if cached:
+        for row in rows:
+            service.predict(name, row)
+    latencies, elapsed = run_clients(lambda row: service.predict(name, row), rows, clients)
+    mode = f'micro-batched, {clients} clients' + (', warm cache' if cached else '')
+    result = summarise(mode, latencies, elapsed, len(rows))
+    result['mean_batch'] = service.stats()['batchers'][name]['mean_batch']
+    return result
+
+
+def bench_http(url, name, rows, clients):
+    local = threading.local()
+
+    def call(row):
+        body = json.dumps({'instances': [row.tolist()]}).encode()
+        request = urllib.request.Request(f'{url}/predict/{name}', data=body,
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request) as response:
+            local.last = response.read()
+
+    latencies, elapsed = run_clients(call, rows, clients)
+    return summarise(f'http {url}, {clients} clients', latencies, elapsed, len(rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Single vs micro-batched prediction throughput and p99 latency.')
+    parser.add_argument('--models', nargs='+', default=list(MODELS))
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--http', metavar='URL', help='also load-test a running `python serving.py` instance')
+    parser.add_argument('--out', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    rows = sample_rows(args.requests)
+    results = []
+    for name in args.models:
+        start = time.perf_counter()
+        try:
+            predict = registry.get(name)
+        except ImportError as exc:
+            print(f'{name}: skipped ({exc})')
+            continue
+        print(f'{name}: loaded in {(time.perf_counter() - start) * 1000:.0f} ms')
+        predict(rows[:1])
+
+        model_results = [bench_direct(predict, rows), bench_bulk(predict, rows, args.max_batch)]
+        for clients in args.clients:
+            model_results.append(bench_service(name, registry, rows, clients, args.max_batch,
+                                               args.max_wait_ms, cached=False))
+        model_results.append(bench_service(name, registry, rows, max(args.clients), args.max_batch,
+                                           args.max_wait_ms, cached=True))
+        if args.http:
+            for clients in args.clients:
+                model_results.append(bench_http(args.http.rstrip('/'), name, rows, clients))
+
+        for row in model_results:
+            row['model'] = name
+            print(f"  {row['mode']:<40} {row['throughput_rps']:>10.1f} req/s {row['rows_per_s']:>10.1f} rows/s "
+                  f"{row['p50_ms']:>9.3f} ms p50 {row['p99_ms']:>9.3f} ms p99")
+        results += model_results
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
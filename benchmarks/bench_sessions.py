@@ -0,0 +1,167 @@
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from benchmarks.run import SECTIONS, scale_sources
+
+
+def memory_mb(pid='self'):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if value.strip().endswith('kB'):
+                fields[name] = int(value.split()[0]) / 1024
+    return {'rss': fields['Rss'], 'pss': fields['Pss'], 'anon': fields['Anonymous']}
+
+
+def start_server(impl, scale, shared_dir):
+    import logging
+    import warnings
+    os.environ['CLIMATE_BUNDLE'] = 'off'
+    os.environ['CLIMATE_SHARED'] = 'on' if impl == 'shared' else 'off'
+    os.environ['CLIMATE_SHARED_DIR'] = shared_dir
+    warnings.filterwarnings('ignore')
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    import climate_data as cd
+    import streamlit_app
+
+    if scale > 1:
+        scale_sources(cd, scale)
+    sections = [getattr(streamlit_app, name) for name in SECTIONS]
+
+    def session():
+        # what one viewer's rerun keeps alive: every section's data plus the comparison frames
+        held = {}
+        for section in sections:
+            data = cd.section_data(section)
+            held.update((name, data[name]) for name in data)
+        held.update(cd.prepare_comparison_data())
+        if impl == 'copies':
+            # st.cache_data's hit path: each session unpickles its own copy
+            held = {name: pickle.loads(pickle.dumps(value)) for name, value in held.items()}
+        return held
+
+    session()
+    return session
+
+
+def open_sessions(session, count, threads):
+    times = []
+
+    def timed():
+        start = time.perf_counter()
+        held = session()
+        times.append(time.perf_counter() - start)
+        return held
+
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(lambda _: timed(), range(count))), times
+
+
+def measure_sessions(impl, counts, threads, scale, shared_dir, queue):
+    session = start_server(impl, scale, shared_dir)
+    base = memory_mb()
+    for count in counts:
+        held, times = open_sessions(session, count, threads)
+        now = memory_mb()
+        queue.put({
+            'impl': impl,
+            'sessions': count,
+            'rss_mb': round(now['rss'], 1),
+            'rss_growth_mb': round(now['rss'] - base['rss'], 1),
+            'anon_growth_mb': round(now['anon'] - base['anon'], 1),
+            'session_ms_p50': round(statistics.median(times) * 1000, 2),
+        })
+        del held
+    queue.put(None)
+
+
+def serve(impl, sessions, threads, scale, shared_dir, ready, done):
+    session = start_server(impl, scale, shared_dir)
+    held, _ = open_sessions(session, sessions, threads)
+    ready.set()
+    done.wait()
+
+
+def measure_host(impl, processes, sessions, threads, scale, shared_dir):
+    # several dashboard processes on one host, each holding its sessions, measured from outside
+    ctx = multiprocessing.get_context('spawn')
+    done = ctx.Event()
+    workers = []
+    for _ in range(processes):
+        ready = ctx.Event()
+        proc = ctx.Process(target=serve, args=(impl, sessions, threads, scale, shared_dir, ready, done))
+        proc.start()
+        workers.append((proc, ready))
+    for proc, ready in workers:
+        ready.wait()
+    usage = [memory_mb(proc.pid) for proc, _ in workers]
+    done.set()
+    for proc, _ in workers:
+        proc.join()
+    return {
+        'impl': impl,
+        'processes': processes,
+        'sessions_per_process': sessions,
+        'host_pss_mb': round(sum(row['pss'] for row in usage), 1),
+        'host_anon_mb': round(sum(row['anon'] for row in usage), 1),
+        'rss_per_process_mb': round(statistics.mean(row['rss'] for row in usage), 1),
+    }
+
+
+def run_isolated(*args):
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=measure_sessions, args=args + (queue,))
+    proc.start()
+    rows = list(iter(queue.get, None))
+    proc.join()
+    if proc.exitcode != 0:
+        raise RuntimeError(f'benchmark worker failed for {args}')
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test dashboard memory as concurrent sessions grow.')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 10, 50, 100, 200])
+    parser.add_argument('--threads', type=int, default=8, help='sessions running a rerun at the same time')
+    parser.add_argument('--scale', type=int, default=1, help='country multiplier for synthetic inputs')
+    parser.add_argument('--processes', type=int, nargs='*', default=[1, 4],
+                        help='dashboard processes per host for the host-wide test (none to skip)')
+    parser.add_argument('--impls', nargs='+', default=['copies', 'process', 'shared'],
+                        choices=['copies', 'process', 'shared'],
+                        help='copies: per-session unpickled copies (st.cache_data); process: one copy per '
+                             'process; shared: one memory-mapped copy per host')
+    parser.add_argument('--json', action='store_true', help='print results as JSON lines')
+    args = parser.parse_args()
+
+    sessions, host = [], []
+    with tempfile.TemporaryDirectory(dir='/dev/shm' if os.path.isdir('/dev/shm') else None) as shared_dir:
+        for impl in args.impls:
+            sessions += run_isolated(impl, sorted(args.sessions), args.threads, args.scale, shared_dir)
+        for impl in args.impls:
+            for processes in args.processes:
+                host.append(measure_host(impl, processes, max(args.sessions), args.threads, args.scale, shared_dir))
+
+    if args.json:
+        for row in sessions + host:
+            print(json.dumps(row))
+        return
+    print(pd.DataFrame(sessions).to_string(index=False))
+    if host:
+        print()
+        print(pd.DataFrame(host).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+
+import pandas as pd
+
+from workbook import read_workbook
+
+WORKBOOKS = {
+    'us_co2_data': 'invidual/yearly_co2_emissions_1000_tonnes.xlsx',
+    'us_gdp_growth': 'invidual/gdp_per_capita_yearly_growth.xlsx',
+}
+SLICES = {
+    'all': {},
+    'from 1960': {'min_year': 1960},
+    '2 countries, 1990-2020': {'countries': ['Norway', 'United States'], 'min_year': 1990, 'max_year': 2020},
+}
+
+
+def measure(read, repeat):
+    seconds = statistics.median(timed(read) for _ in range(repeat))
+    tracemalloc.start()
+    df = read()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return df, seconds, peak
+
+
+def timed(read):
+    start = time.perf_counter()
+    read()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare pd.read_excel with the streaming Gapminder workbook reader.')
+    parser.add_argument('sources', nargs='*', help=f"sources to read (default: {', '.join(WORKBOOKS)})")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='print results as JSON lines')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.sources if name not in WORKBOOKS]
+    if unknown:
+        parser.error(f"unknown source(s): {', '.join(unknown)}; choose from {', '.join(WORKBOOKS)}")
+
+    results = []
+    for source in args.sources or WORKBOOKS:
+        path = WORKBOOKS[source]
+        full, seconds, peak = measure(lambda: pd.read_excel(path), args.repeat)
+        results.append({'source': source, 'reader': 'read_excel', 'slice': 'all', 'shape': list(full.shape),
+                        'ms': round(seconds * 1000, 1), 'peak_mb': round(peak / 1e6, 2), 'matches': True})
+        for label, predicates in SLICES.items():
+            df, seconds, peak = measure(lambda: read_workbook(path, **predicates), args.repeat)
+            # what filtering the full read_excel frame after the fact gives
+            years = [col for col in full.columns[1:]
+                     if predicates.get('min_year', col) <= col <= predicates.get('max_year', col)]
+            rows = full['country'].isin(predicates['countries']) if 'countries' in predicates else slice(None)
+            expected = full.loc[rows, ['country'] + years].reset_index(drop=True)
+            results.append({'source': source, 'reader': 'read_workbook', 'slice': label, 'shape': list(df.shape),
+                            'ms': round(seconds * 1000, 1), 'peak_mb': round(peak / 1e6, 2),
+                            'matches': df.equals(expected)})
+
+    if args.json:
+        for row in results:
+            print(json.dumps(row))
+    else:
+        print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import pandas as pd
+
+
+def clean_co2_data(df):
+    df_clean = df.copy()
+    
+    if 'country' not in df_clean.columns:
+        if df_clean.index.name == 'country':
+            df_clean = df_clean.reset_index()
+        elif 'Country' in df_clean.columns:
+            df_clean = df_clean.rename(columns={'Country': 'country'})
+        else:
+            df_clean.columns = ['country'] + list(df_clean.columns[1:])
+    
+    year_columns = [col for col in df_clean.columns if col != 'country' and str(col).isdigit()]
+    
+    df_clean = df_clean.melt(id_vars=['country'], value_vars=year_columns, 
+                           var_name='Year', value_name='CO2_per_capita')
+    
+    df_clean['Year'] = pd.to_numeric(df_clean['Year'])
+    df_clean['CO2_per_capita'] = pd.to_numeric(df_clean['CO2_per_capita'], errors='coerce')
+    
+    df_clean = df_clean.rename(columns={'country': 'Country'})
+    
+    return df_clean.dropna()
+
+
+def clean_worldbank_data(df, value_name):
+    df_clean = df.copy()
+    
+    cols_to_drop = ['Country Code', 'Indicator Name', 'Indicator Code', 'Unnamed: 67']
+    for col in cols_to_drop:
+        if col in df_clean.columns:
+            df_clean = df_clean.drop(col, axis=1)
+    
+    df_clean = df_clean.melt(id_vars=['Country Name'], var_name='Year', value_name=value_name)
+    
+    df_clean['Year'] = pd.to_numeric(df_clean['Year'], errors='coerce')
+    df_clean[value_name] = pd.to_numeric(df_clean[value_name], errors='coerce')
+    df_clean = df_clean.rename(columns={'Country Name': 'Country'})
+    
+    return df_clean.dropna()
+
+
+def clean_us_co2_data(df):
+    df_clean = df.copy()
+    
+    if df_clean.index.name == 'country' or 'country' not in df_clean.columns:
+        df_clean = df_clean.reset_index()
+        if df_clean.columns[0] == 'index':
+            df_clean = df_clean.rename(columns={'index': 'country'})
+    
+    df_clean = pd.melt(df_clean, id_vars=['country'], var_name='Year', value_name='CO2_emissions_1000_tonnes')
+    df_clean['Year'] = pd.to_numeric(df_clean['Year'], errors='coerce')
+    df_clean = df_clean.dropna(subset=['Year', 'CO2_emissions_1000_tonnes'])
+    df_clean = df_clean[df_clean['Year'] >= 1960]
+    df_clean = df_clean.rename(columns={'country': 'Country'})
+    
+    return df_clean
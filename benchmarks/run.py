@@ -0,0 +1,256 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+CLEAN_STAGES = {
+    'clean.co2': ('co2_data', 'country', lambda cd, df: cd.clean_co2_data(df)),
+    'clean.energy': ('energy_data', 'Country Name', lambda cd, df: cd.clean_worldbank_data(df, 'Energy_use_per_capita')),
+    'clean.gdp': ('gdp_data', 'Country Name', lambda cd, df: cd.clean_worldbank_data(df, 'GDP_growth')),
+    'clean.us_energy': ('us_energy_data', 'Country Name',
+                        lambda cd, df: cd.clean_worldbank_data(df, 'US_Energy_use_per_capita')),
+    'clean.us_co2': ('us_co2_data', 'country', lambda cd, df: cd.clean_us_co2_data(df)),
+}
+
+SECTIONS = [
+    'show_overview', 'show_norway_analysis', 'show_us_analysis',
+    'show_comparative_analysis', 'show_statistical_analysis', 'show_interactive_charts',
+]
+
+SCALABLE = set(CLEAN_STAGES) | {'prepare_comparison_data'}
+
+ID_COLUMNS = {'co2_data': 'country', 'us_co2_data': 'country', 'us_gdp_growth': 'country',
+              'us_energy_per_person': 'country', 'energy_data': 'Country Name',
+              'gdp_data': 'Country Name', 'us_energy_data': 'Country Name'}
+
+
+def stage_names():
+    from ingest_cache import SOURCES
+    names = [f'ingest.parse.{source}' for source in SOURCES]
+    names += [f'ingest.cached.{source}' for source in SOURCES]
+    names += ['load_data'] + list(CLEAN_STAGES) + ['prepare_comparison_data']
+    names += [f'section.{section}' for section in SECTIONS]
+    return names
+
+
+def scale_wide(df, id_col, countries=1, years=1):
+    import pandas as pd
+
+    if years > 1:
+        year_cols = [col for col in df.columns if col != id_col and str(col).isdigit()]
+        first, last = int(str(year_cols[0])), int(str(year_cols[-1]))
+        span = last - first + 1
+        extra = {}
+        for j in range(1, years):
+            for col in year_cols:
+                label = int(str(col)) + span * j
+                extra[label if isinstance(col, int) else str(label)] = df[col]
+        df = pd.concat([df, pd.DataFrame(extra, index=df.index)], axis=1)
+
+    if countries > 1:
+        copies = [df]
+        for i in range(1, countries):
+            copy = df.copy()
+            copy[id_col] = copy[id_col].astype(str) + f' #{i}'
+            copies.append(copy)
+        df = pd.concat(copies, ignore_index=True)
+    return df
+
+
+def scale_sources(cd, countries, years=1):
+    from ingest_cache import load_source
+
+    for source, id_col in ID_COLUMNS.items():
+        scaled = scale_wide(load_source(source), id_col, countries, years)
+        cd.DATASETS[source] = ((), lambda scaled=scaled: scaled)
+
+
+def make_stage(name, countries, years):
+    import streamlit as st
+
+    import climate_data as cd
+    from ingest_cache import SOURCES, load_source, read_source
+
+    def clear_caches():
+        st.cache_data.clear()
+        st.cache_resource.clear()
+
+    if name.startswith('ingest.parse.'):
+        path, kwargs = SOURCES[name.split('.', 2)[2]]
+        return clear_caches, lambda: read_source(path, **kwargs)
+
+    if name.startswith('ingest.cached.'):
+        source = name.split('.', 2)[2]
+        load_source(source)
+        return clear_caches, lambda: load_source(source)
+
+    if name == 'load_data':
+        return clear_caches, cd.load_data
+
+    if name in CLEAN_STAGES:
+        source, id_col, clean = CLEAN_STAGES[name]
+        raw = scale_wide(load_source(source), id_col, countries, years)
+        return clear_caches, lambda: clean(cd, raw)
+
+    if name == 'prepare_comparison_data':
+        if countries > 1 or years > 1:
+            scale_sources(cd, countries, years)
+        return clear_caches, cd.prepare_comparison_data
+
+    if name.startswith('section.'):
+        import streamlit_app
+        section = getattr(streamlit_app, name.split('.', 1)[1])
+
+        def setup():
+            clear_caches()
+            data = cd.section_data(section)
+            for key in data:
+                data[key]
+            # keep the loaded datasets but drop figure and aggregate caches so the render path is cold
+            st.cache_resource.clear()
+            setup.data = data
+
+        return setup, lambda: section(setup.data)
+
+    raise KeyError(f'Unknown stage: {name}')
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(name, countries, years, repeat, queue):
+    os.environ['CLIMATE_BUNDLE'] = 'off'
+    import warnings
+    warnings.filterwarnings('ignore')
+    import logging
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    setup, run = make_stage(name, countries, years)
+
+    times = []
+    rss_delta = None
+    for _ in range(repeat):
+        setup()
+        before = peak_rss_mb()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+        if rss_delta is None:
+            rss_delta = peak_rss_mb() - before
+
+    setup()
+    tracemalloc.start()
+    run()
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained = sum(stat.size for stat in snapshot.statistics('filename'))
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+
+    queue.put({
+        'stage': name,
+        'countries_scale': countries,
+        'years_scale': years,
+        'wall_ms_min': round(min(times) * 1000, 2),
+        'wall_ms_median': round(statistics.median(times) * 1000, 2),
+        'peak_rss_delta_mb': round(rss_delta, 2),
+        'alloc_peak_mb': round(peak / 2**20, 2),
+        'alloc_retained_mb': round(retained / 2**20, 2),
+        'alloc_retained_blocks': blocks,
+    })
+
+
+def run_isolated(*args):
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=measure, args=args + (queue,))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        raise RuntimeError(f'benchmark worker failed for {args}')
+    return queue.get()
+
+
+def environment():
+    import numpy
+    import pandas
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'machine': platform.machine(),
+    }
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = {(r['stage'], r['countries_scale'], r['years_scale']): r for r in json.load(f)['results']}
+    with open(new_path) as f:
+        new = json.load(f)['results']
+    print(f"{'stage':<40} {'scale':>7} {'wall ms':>18} {'peak rss mb':>18} {'alloc peak mb':>18}")
+    for row in new:
+        key = (row['stage'], row['countries_scale'], row['years_scale'])
+        base = old.get(key)
+        if base is None:
+            continue
+        cells = []
+        for metric in ('wall_ms_median', 'peak_rss_delta_mb', 'alloc_peak_mb'):
+            before, after = base[metric], row[metric]
+            change = (after - before) / before * 100 if before else 0.0
+            cells.append(f'{before:>7.1f}->{after:<7.1f}{change:+4.0f}%')
+        print(f'{row["stage"]:<40} {row["countries_scale"]:>3}x{row["years_scale"]:<3} ' + ' '.join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the dashboard data path and render path.')
+    parser.add_argument('stages', nargs='*', help='stage names or prefixes (default: all); see --list')
+    parser.add_argument('--list', action='store_true', help='list stage names and exit')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100],
+                        help='country multipliers for synthetic inputs (clean and prepare stages)')
+    parser.add_argument('--year-scales', type=int, nargs='+', default=[1],
+                        help='year-column multipliers for synthetic inputs')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--out', help='write results as JSON to this file')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='diff two result files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    names = stage_names()
+    if args.list:
+        print('\n'.join(names))
+        return
+    if args.stages:
+        names = [name for name in names if any(name.startswith(stage) for stage in args.stages)]
+
+    results = []
+    for name in names:
+        scales = [(c, y) for c in args.scales for y in args.year_scales] if name in SCALABLE else [(1, 1)]
+        for countries, years in scales:
+            row = run_isolated(name, countries, years, args.repeat)
+            results.append(row)
+            print(f"{name:<40} {countries:>3}x{years:<3} {row['wall_ms_median']:>9.1f} ms "
+                  f"{row['peak_rss_delta_mb']:>8.1f} MB rss {row['alloc_peak_mb']:>8.1f} MB alloc", flush=True)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from country_index import CountryIndex
+from ingest_cache import from_arrow, to_arrow
+from memo import digest
+
+ARTIFACT_DIR = os.environ.get('CLIMATE_ARTIFACT_DIR', 'artifacts')
+
+
+def part_key(value):
+    # decades of years, or codes by their first letter, so a few changed cells only touch a few parts
+    if isinstance(value, (int, np.integer)):
+        return int(value) // 10 * 10
+    return ord(str(value)[0])
+
+
+def part_keys(column):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        keys = np.array([part_key(value) for value in column.cat.categories], dtype=np.int64)
+        return keys[column.cat.codes.to_numpy()]
+    return column.to_numpy(dtype=np.int64) // 10 * 10
+
+
+def categories_key(frame):
+    # every part is written with the full categories, so a part can only be reused while they stay the same
+    return digest([(col, list(frame[col].cat.categories)) for col in frame.columns
+                   if isinstance(frame[col].dtype, pd.CategoricalDtype)])
+
+
+def write_frame(frame, path):
+    feather.write_feather(to_arrow(frame.reset_index(drop=True)), path, compression='uncompressed')
+
+
+def link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def artifact_files(entry):
+    if 'parts' not in entry:
+        return [entry['file']]
+    files = [os.path.join(entry['file'], f'{key}.arrow') for key in entry['parts']]
+    return files + ([os.path.join(entry['file'], 'codes.json')] if entry['kind'] == 'index' else [])
+
+
+def link_artifact(entry, source, directory):
+    if 'parts' in entry:
+        os.makedirs(os.path.join(directory, entry['file']))
+    for filename in artifact_files(entry):
+        link_or_copy(os.path.join(source, filename), os.path.join(directory, filename))
+
+
+def save_parts(frame, directory, name, column, previous=None, touched=()):
+    # one file per part key, rewriting only the parts with a touched key; the rest are linked from previous,
+    # a (directory, entry) pair for the same artifact in an older bundle
+    keys = part_keys(frame[column])
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.array([0])
+    stops = np.r_[starts[1:], len(keys)]
+    # an empty frame is one empty part, so it keeps its columns
+    labels = [int(key) for key in keys[starts]] if len(keys) else [0]
+    categories = categories_key(frame)
+    reusable = set()
+    if previous is not None and previous[1].get('categories') == categories:
+        reusable = set(previous[1].get('parts', ())) - {part_key(value) for value in touched}
+
+    os.makedirs(os.path.join(directory, name))
+    for key, start, stop in zip(labels, starts, stops):
+        filename = os.path.join(name, f'{key}.arrow')
+        if key in reusable:
+            link_or_copy(os.path.join(previous[0], filename), os.path.join(directory, filename))
+        else:
+            write_frame(frame.iloc[start:stop], os.path.join(directory, filename))
+    return {'file': name, 'parts': labels, 'partition': column, 'categories': categories}
+
+
+def partitionable(frame, column):
+    if column is None or column not in frame or not len(frame):
+        return False
+    keys = part_keys(frame[column])
+    return bool((keys[1:] >= keys[:-1]).all())
+
+
+def save_artifact(value, directory, name, partition=None, previous=None, touched=()):
+    if isinstance(value, dict):
+        filename = f'{name}.json'
+        with open(os.path.join(directory, filename), 'w') as f:
+            json.dump(value, f, sort_keys=True)
+        return {'file': filename, 'kind': 'dict'}
+
+    if isinstance(value, CountryIndex):
+        # stored already sorted, so loading it skips the code lookups and the sort
+        entry = save_parts(value.df, directory, name, 'ISO3', previous, touched)
+        with open(os.path.join(directory, name, 'codes.json'), 'w') as f:
+            json.dump(value.codes, f, sort_keys=True)
+        return dict(entry, kind='index', index=None)
+
+    if isinstance(value, pd.Series):
+        kind, index = 'series', [value.index.name or 'index']
+        frame = value.to_frame(value.name if value.name is not None else 'value').reset_index()
+    elif isinstance(value, pd.DataFrame):
+        kind = 'frame'
+        index = None if isinstance(value.index, pd.RangeIndex) else list(value.index.names)
+        frame = value if index is None else value.reset_index()
+    else:
+        raise TypeError(f"Cannot store artifact '{name}' of type {type(value).__name__}")
+
+    if partitionable(frame, partition):
+        return dict(save_parts(frame, directory, name, partition, previous, touched), kind=kind, index=index)
+    filename = f'{name}.arrow'
+    write_frame(frame, os.path.join(directory, filename))
+    return {'file': filename, 'kind': kind, 'index': index}
+
+
+def load_artifact(directory, entry):
+    path = os.path.join(directory, entry['file'])
+    if entry['kind'] == 'dict':
+        with open(path) as f:
+            return json.load(f)
+
+    if 'parts' in entry:
+        tables = [feather.read_table(os.path.join(path, f'{key}.arrow'), memory_map=True) for key in entry['parts']]
+        frame = from_arrow(pa.concat_tables(tables))
+    else:
+        frame = from_arrow(feather.read_table(path, memory_map=True))
+    if entry['kind'] == 'index':
+        with open(os.path.join(path, 'codes.json')) as f:
+            return CountryIndex(frame, json.load(f), ordered=True)
+    if entry['index']:
+        frame = frame.set_index(entry['index'])
+    if entry['kind'] == 'series':
+        return frame.iloc[:, 0]
+    return frame
+
+
+class Bundle:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        self.version = self.manifest['version']
+        self.artifacts = self.manifest['artifacts']
+
+    @classmethod
+    def latest(cls, root=ARTIFACT_DIR):
+        pointer = os.path.join(root, 'LATEST')
+        if not os.path.exists(pointer):
+            return None
+        with open(pointer) as f:
+            return cls(os.path.join(root, f.read().strip()))
+
+    def __contains__(self, name):
+        return name in self.artifacts
+
+    def names(self):
+        return list(self.artifacts)
+
+    def load(self, name):
+        return load_artifact(self.path, self.artifacts[name])
+
+
+def load_bundle(root=ARTIFACT_DIR, names=None, strict=False):
+    # checked like the app does: a stale artifact is logged and built from the sources, or refused with strict
+    import climate_data
+
+    bundle = Bundle.latest(root)
+    if bundle is None:
+        raise FileNotFoundError(f"No artifact bundle under '{root}'; run `python pipeline.py` first")
+    values = {}
+    for name in names or bundle.names():
+        if climate_data.bundled(name, bundle):
+            values[name] = bundle.load(name)
+        elif strict:
+            raise ValueError(f"Bundle {bundle.version} is stale for '{name}'; run `python pipeline.py` to refresh it")
+        else:
+            values[name] = climate_data.get_dataset(name)
+    return values
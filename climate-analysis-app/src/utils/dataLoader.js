@@ -1,128 +1,132 @@
-import Papa from 'papaparse';
+// a production build without REACT_APP_DATA_API_URL reads the static export instead of a visitor's localhost
+const API_URL = process.env.REACT_APP_DATA_API_URL ||
+  (process.env.NODE_ENV === 'development' ? 'http://localhost:8700' : null);
+const STATIC_URL = `${process.env.PUBLIC_URL || ''}/data/bundle`;
 
-export const loadClimateData = async () => {
-  try {
-    const norwayCo2Response = await fetch('/data/co2_pcap_cons.csv');
-    const norwayCo2Text = await norwayCo2Response.text();
-    const norwayCo2Data = Papa.parse(norwayCo2Text, { header: true });
-    
-    const usTempResponse = await fetch('/invidual/us_temperature.csv');
-    const usTempText = await usTempResponse.text();
-    const usTempData = Papa.parse(usTempText, { header: true });
-    
-    const usCo2Response = await fetch('/invidual/us_co2_emissions.csv');
-    const usCo2Text = await usCo2Response.text();
-    const usCo2Data = Papa.parse(usCo2Text, { header: true });
-    
-    const usEnergyResponse = await fetch('/invidual/us_energy_use.csv');
-    const usEnergyText = await usEnergyResponse.text();
-    const usEnergyData = Papa.parse(usEnergyText, { header: true });
-    
-    return {
-      norwayCo2: norwayCo2Data.data,
-      usTemp: usTempData.data,
-      usCo2: usCo2Data.data,
-      usEnergy: usEnergyData.data
-    };
-  } catch (error) {
-    console.error('Error loading climate data:', error);
-    return null;
+// name -> [metric, country] on the data API (python data_api.py)
+const SERIES = {
+  norwayCo2: ['CO2_per_capita', 'NOR'],
+  norwayEnergy: ['Energy_use_per_capita', 'NOR'],
+  norwayGdp: ['GDP_growth', 'NOR'],
+  usTemp: ['Temperature_F', 'USA'],
+  usCo2: ['CO2_emissions_1000_tonnes', 'USA'],
+  usEnergy: ['US_Energy_use_per_capita', 'USA']
+};
+
+// the same series in the JSON files python pipeline.py --web climate-analysis-app/public/data/bundle writes:
+// name -> [export, column]
+const STATIC_SERIES = {
+  norwayCo2: ['norway_co2', 'CO2_per_capita'],
+  norwayEnergy: ['norway_energy', 'Energy_use_per_capita'],
+  norwayGdp: ['norway_gdp', 'GDP_growth'],
+  usTemp: ['us_temperature_clean', 'Temperature_F'],
+  usCo2: ['us_co2_filtered', 'CO2_emissions_1000_tonnes'],
+  usEnergy: ['us_energy_filtered', 'US_Energy_use_per_capita']
+};
+
+let pending = null;
+
+// uint32 count, then per series: int16 first year, uint16 length, float32[length] (NaN = no value)
+export const decodeSeries = (buffer) => {
+  const view = new DataView(buffer);
+  const count = view.getUint32(0, true);
+  const series = [];
+  let offset = 4;
+  for (let i = 0; i < count; i++) {
+    const firstYear = view.getInt16(offset, true);
+    const length = view.getUint16(offset + 2, true);
+    const values = new Float32Array(buffer, offset + 4, length);
+    const points = [];
+    values.forEach((value, index) => {
+      if (!isNaN(value)) {
+        // float32 -> the value the server had, without trailing noise in tooltips
+        points.push({ year: firstYear + index, value: parseFloat(value.toPrecision(7)) });
+      }
+    });
+    series.push(points);
+    offset += 4 + 4 * length;
   }
+  return series;
 };
 
-export const processNorwayData = (rawData) => {
-  if (!rawData || !rawData.norwayCo2) return null;
-  
-  const norwayRow = rawData.norwayCo2.find(row => 
-    row.country && row.country.toLowerCase().includes('norway')
-  );
-  
-  if (!norwayRow) return null;
-  
-  const processedData = [];
-  Object.keys(norwayRow).forEach(key => {
-    if (key !== 'country' && !isNaN(key) && !isNaN(norwayRow[key])) {
-      processedData.push({
-        year: parseInt(key),
-        co2: parseFloat(norwayRow[key])
-      });
-    }
+const fetchSeries = async () => {
+  const names = Object.keys(SERIES);
+  const query = names.map(name => SERIES[name].join('/')).join(',');
+  const response = await fetch(`${API_URL}/batch?series=${query}&format=binary`);
+  if (!response.ok) {
+    throw new Error(`Data API returned ${response.status}`);
+  }
+  const series = decodeSeries(await response.arrayBuffer());
+  const data = {};
+  names.forEach((name, index) => {
+    data[name] = series[index];
   });
-  
-  return processedData.sort((a, b) => a.year - b.year);
+  return data;
 };
 
-export const processUSData = (rawData) => {
-  if (!rawData || !rawData.usTemp) return null;
-  
-  const processedData = [];
-  rawData.usTemp.forEach(row => {
-    if (row.Date && row.Value && !isNaN(parseFloat(row.Value))) {
-      const year = parseInt(row.Date.toString().substring(0, 4));
-      const temp = parseFloat(row.Value);
-      if (year >= 1900 && year <= 2020) {
-        processedData.push({
-          year: year,
-          temperature: temp
-        });
-      }
+const fetchStaticSeries = async () => {
+  const names = Object.keys(STATIC_SERIES);
+  const series = await Promise.all(names.map(async name => {
+    const [file, column] = STATIC_SERIES[name];
+    const response = await fetch(`${STATIC_URL}/${file}.json`);
+    if (!response.ok) {
+      throw new Error(`Static export ${file}.json returned ${response.status}`);
     }
+    const rows = await response.json();
+    return rows
+      .filter(row => row[column] !== null)
+      .map(row => ({ year: row.Year, value: row[column] }));
+  }));
+  const data = {};
+  names.forEach((name, index) => {
+    data[name] = series[index];
   });
-  
-  return processedData.sort((a, b) => a.year - b.year);
+  return data;
 };
 
-export const processNorwayEnergyData = (rawData) => {
-  const sampleEnergyData = [
-    { year: 1960, energy: 2000 },
-    { year: 1970, energy: 2500 },
-    { year: 1980, energy: 3000 },
-    { year: 1990, energy: 4000 },
-    { year: 2000, energy: 5000 },
-    { year: 2010, energy: 4800 }
-  ];
-  return sampleEnergyData;
+const fetchData = async () => {
+  if (!API_URL) {
+    return fetchStaticSeries();
+  }
+  try {
+    return await fetchSeries();
+  } catch (error) {
+    console.warn('Data API unavailable, reading the static export:', error);
+    return fetchStaticSeries();
+  }
 };
 
-export const processNorwayGdpData = (rawData) => {
-  const sampleGdpData = [
-    { year: 1970, gdp: 2.5 },
-    { year: 1980, gdp: 3.1 },
-    { year: 1990, gdp: 2.8 },
-    { year: 2000, gdp: 3.4 },
-    { year: 2010, gdp: 2.9 }
-  ];
-  return sampleGdpData;
+export const loadClimateData = async () => {
+  // both dashboards ask on mount; share one request between them
+  if (!pending) {
+    pending = fetchData();
+  }
+  try {
+    return await pending;
+  } catch (error) {
+    pending = null;
+    console.error('Error loading climate data:', error);
+    return null;
+  }
 };
 
-export const processUSCo2Data = (rawData) => {
-  if (!rawData || !rawData.usCo2) return null;
-  
-  const processedData = [];
-  rawData.usCo2.forEach(row => {
-    if (row.Year && row.CO2_Emissions && !isNaN(parseInt(row.Year)) && !isNaN(parseFloat(row.CO2_Emissions))) {
-      processedData.push({
-        year: parseInt(row.Year),
-        co2: parseFloat(row.CO2_Emissions)
-      });
-    }
-  });
-  
-  return processedData.sort((a, b) => a.year - b.year);
-};
+const toPoints = (rawData, name, field, filter = () => true) => {
+  if (!rawData || !rawData[name]) return null;
 
-export const processUSEnergyData = (rawData) => {
-  if (!rawData || !rawData.usEnergy) return null;
-  
-  const processedData = [];
-  rawData.usEnergy.forEach(row => {
-    if (row.Year && row.Energy_Use && !isNaN(parseInt(row.Year)) && !isNaN(parseFloat(row.Energy_Use))) {
-      processedData.push({
-        year: parseInt(row.Year),
-        energy: parseFloat(row.Energy_Use)
-      });
-    }
-  });
-  
-  return processedData.sort((a, b) => a.year - b.year);
+  return rawData[name]
+    .filter(point => filter(point.year))
+    .map(point => ({ year: point.year, [field]: point.value }));
 };
+
+export const processNorwayData = (rawData) => toPoints(rawData, 'norwayCo2', 'co2');
+
+export const processUSData = (rawData) =>
+  toPoints(rawData, 'usTemp', 'temperature', year => year >= 1900 && year <= 2020);
+
+export const processNorwayEnergyData = (rawData) => toPoints(rawData, 'norwayEnergy', 'energy');
+
+export const processNorwayGdpData = (rawData) => toPoints(rawData, 'norwayGdp', 'gdp');
+
+export const processUSCo2Data = (rawData) => toPoints(rawData, 'usCo2', 'co2');
+
+export const processUSEnergyData = (rawData) => toPoints(rawData, 'usEnergy', 'energy');
@@ -0,0 +1,661 @@
+import functools
+import hashlib
+import inspect
+import logging
+import os
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import shared_frames
+from bundle import Bundle
+from comparison import CountryTensor
+from country_index import CountryIndex, country_codes
+from delta import Changes, apply_cells, patch_groups, patch_trends
+from forecast import HORIZON, forecast_table
+from ingest_cache import SOURCES, file_digest, load_source, source_fingerprint
+from memo import LRUCache, digest, fingerprinted
+from reshape import wide_to_long
+from rolling import RollingWindows
+from tracing import span, traced_cache, watch
+from trends import trend_table
+
+logger = logging.getLogger('climate.data')
+# every module whose code shapes a stored dataset: the source readers and the transforms behind registered stages
+TRANSFORM_MODULES = [
+    'climate_data.py', 'comparison.py', 'country_index.py', 'delta.py', 'disasters.py', 'forecast.py',
+    'ingest_cache.py', 'reshape.py', 'rolling.py', 'trends.py', 'workbook.py',
+]
+
+
+@st.cache_resource
+def shared_cache():
+    # one copy per process of every cleaned frame and dataset, handed to sessions as copy-on-write views
+    return watch('shared', LRUCache(maxsize=256))
+
+
+@traced_cache(st.cache_data, 'load')
+def load_data():
+    co2_data = load_source('co2_data')
+    
+    energy_data = load_source('energy_data')
+    
+    gdp_data = load_source('gdp_data')
+    
+    us_energy_data = load_source('us_energy_data')
+    
+    us_co2_data = load_source('us_co2_data')
+    
+    us_temp_data = load_source('us_temp_data')
+    
+    us_disasters_data = load_source('us_disasters_data')
+    
+    us_energy_per_person = load_source('us_energy_per_person')
+    
+    us_gdp_growth = load_source('us_gdp_growth')
+    
+    return (co2_data, energy_data, gdp_data, us_energy_data, 
+            us_co2_data, us_temp_data, us_disasters_data, 
+            us_energy_per_person, us_gdp_growth)
+
+
+@traced_cache(fingerprinted(shared_cache, version=1), 'clean')
+def clean_co2_data(df, countries=None):
+    if 'country' not in df.columns:
+        if df.index.name == 'country':
+            df = df.reset_index()
+        elif 'Country' in df.columns:
+            df = df.rename(columns={'Country': 'country'})
+        else:
+            df = df.set_axis(['country'] + list(df.columns[1:]), axis=1)
+    
+    return wide_to_long(df, 'country', 'CO2_per_capita', countries=countries)
+
+
+@traced_cache(fingerprinted(shared_cache, version=1), 'clean')
+def clean_worldbank_data(df, value_name, countries=None):
+    return wide_to_long(df, 'Country Name', value_name, countries=countries)
+
+
+@traced_cache(fingerprinted(shared_cache, version=1), 'clean')
+def clean_us_co2_data(df, countries=None):
+    if df.index.name == 'country' or 'country' not in df.columns:
+        df = df.reset_index()
+        if df.columns[0] == 'index':
+            df = df.rename(columns={'index': 'country'})
+    
+    return wide_to_long(df, 'country', 'CO2_emissions_1000_tonnes', countries=countries, min_year=1960)
+
+DATASETS = {}
+# name -> patch(old, changes, *requires) returning (value, changes): how pipeline.py refreshes a stored
+# dataset from its previous version when only some cells of its inputs changed
+DELTAS = {}
+
+
+def dataset(name, requires=()):
+    def register(build):
+        DATASETS[name] = (tuple(requires), build)
+        return build
+    return register
+
+
+def patches(name):
+    def register(patch):
+        DELTAS[name] = patch
+        return patch
+    return register
+
+
+@st.cache_resource
+def active_bundle():
+    if os.environ.get('CLIMATE_BUNDLE', 'on').lower() in ('0', 'off', 'false'):
+        return None
+    return Bundle.latest()
+
+
+@functools.lru_cache(maxsize=None)
+def build_version(build):
+    try:
+        return digest(inspect.getsource(build))
+    except (OSError, TypeError):
+        return build.__qualname__
+
+
+def transform_version():
+    root = os.path.dirname(os.path.abspath(__file__))
+    digests = [file_digest(os.path.join(root, module)) for module in TRANSFORM_MODULES]
+    return hashlib.sha1(''.join(digests).encode()).hexdigest()[:16]
+
+
+def stage_key(name, version, keys, sources=True):
+    # what a stored artifact was built from: the transform code, the stage's own code and, with sources,
+    # the fingerprints of the files upstream of it
+    if name not in keys:
+        requires, build = DATASETS[name]
+        parts = [version, name, build_version(build)] + [stage_key(dep, version, keys, sources) for dep in requires]
+        if sources and name in SOURCES:
+            path, kwargs = SOURCES[name]
+            parts.append(source_fingerprint(path, **kwargs))
+        keys[name] = hashlib.sha1('|'.join(parts).encode()).hexdigest()[:16]
+    return keys[name]
+
+
+@functools.lru_cache(maxsize=None)
+def report_stale(version, name):
+    logger.warning("artifact bundle %s is stale for '%s' (its sources or code changed since it was built); "
+                   "building it instead. Run `python pipeline.py` to refresh the bundle.", version, name)
+
+
+def bundled(name, bundle):
+    # the bundle's copy is only served while it matches the sources and code there are now
+    entry = bundle.artifacts.get(name) if bundle else None
+    if entry is None:
+        return False
+    if entry.get('key') == stage_key(name, transform_version(), {}):
+        return True
+    report_stale(bundle.version, name)
+    return False
+
+
+def dataset_key(name, bundle=None):
+    # which files and which code a dataset comes from, so a key costs a few os.stat calls, not a content hash;
+    # the transform modules count too, since a build function's own source doesn't cover the helpers it calls
+    if bundle is None:
+        bundle = active_bundle() or {}
+    if bundled(name, bundle):
+        return digest('bundle', bundle.artifacts[name]['key'])
+    requires, build = DATASETS[name]
+    parts = [name, build_version(build), transform_version()] + [dataset_key(dep, bundle) for dep in requires]
+    if name in SOURCES:
+        path, kwargs = SOURCES[name]
+        parts.append(source_fingerprint(path, **kwargs))
+    return digest(*parts)
+
+
+def index_query_key(index_name, *args, **kwargs):
+    return dataset_key(index_name), args, sorted(kwargs.items())
+
+
+def join_key(columns, *args, **kwargs):
+    return [dataset_key(index_name) for index_name, _ in columns], columns, args, sorted(kwargs.items())
+
+
+@traced_cache(fingerprinted(shared_cache, version=1, key=lambda name: dataset_key(name)),
+              'dataset', label=lambda name: name)
+def get_dataset(name):
+    bundle = active_bundle()
+    if bundled(name, bundle):
+        return bundle.load(name)
+    requires, build = DATASETS[name]
+    if name in SOURCES:
+        # already memory-mapped from the ingest cache
+        return build()
+    return shared_frames.get(name, dataset_key(name, bundle or {}),
+                             lambda: build(*[get_dataset(dep) for dep in requires]))
+
+
+def register_source(name):
+    dataset(name)(lambda: load_source(name))
+
+
+for source in SOURCES:
+    register_source(source)
+
+
+@dataset('co2_clean', requires=['co2_data'])
+def build_co2_clean(co2_data):
+    return clean_co2_data(co2_data)
+
+
+@dataset('energy_clean', requires=['energy_data'])
+def build_energy_clean(energy_data):
+    return clean_worldbank_data(energy_data, 'Energy_use_per_capita')
+
+
+@dataset('gdp_clean', requires=['gdp_data'])
+def build_gdp_clean(gdp_data):
+    return clean_worldbank_data(gdp_data, 'GDP_growth')
+
+
+@dataset('us_energy_clean', requires=['us_energy_data'])
+def build_us_energy_clean(us_energy_data):
+    return clean_worldbank_data(us_energy_data, 'US_Energy_use_per_capita')
+
+
+@dataset('us_co2_clean', requires=['us_co2_data'])
+def build_us_co2_clean(us_co2_data):
+    return clean_us_co2_data(us_co2_data)
+
+
+# id column of each wide (country x year) source, for cell-level diffs between releases
+WIDE_SOURCES = {
+    'co2_data': 'country',
+    'energy_data': 'Country Name',
+    'gdp_data': 'Country Name',
+    'us_energy_data': 'Country Name',
+    'us_co2_data': 'country',
+    'us_energy_per_person': 'country',
+    'us_gdp_growth': 'country',
+}
+CLEAN_DELTAS = {
+    'co2_clean': ('co2_data', 'CO2_per_capita', None),
+    'energy_clean': ('energy_data', 'Energy_use_per_capita', None),
+    'gdp_clean': ('gdp_data', 'GDP_growth', None),
+    'us_energy_clean': ('us_energy_data', 'US_Energy_use_per_capita', None),
+    'us_co2_clean': ('us_co2_data', 'CO2_emissions_1000_tonnes', 1960),
+}
+
+
+def register_clean_delta(name, source, value_name, min_year):
+    @patches(name)
+    def patch(old, changes, df):
+        cells = changes.cells if min_year is None else changes.cells[changes.cells['Year'] >= min_year]
+        return apply_cells(old, cells, value_name, df[WIDE_SOURCES[source]], min_year), Changes(cells)
+
+
+for clean_name, spec in CLEAN_DELTAS.items():
+    register_clean_delta(clean_name, *spec)
+
+
+@dataset('country_codes', requires=['energy_data'])
+def build_country_codes(energy_data):
+    return country_codes(energy_data)
+
+
+CMIP6_VARIABLES = {
+    'cdd65': 'cmip6_cdd65',
+    'hdd65': 'cmip6_hdd65',
+    'tas': 'cmip6_tas',
+}
+
+
+def clean_cmip6_sheet(df, value_name):
+    # annual columns are labelled by their mid-year month, e.g. '1950-07'
+    years = {col: col[:4] for col in df.columns if str(col)[:4].isdigit()}
+    long = wide_to_long(df.rename(columns=years), 'name', value_name)
+    long.insert(1, 'ISO3', long['Country'].map(dict(zip(df['name'], df['code']))))
+    return long
+
+
+@dataset('cmip6_clean', requires=list(CMIP6_VARIABLES.values()))
+def build_cmip6_clean(*sheets):
+    frames = [clean_cmip6_sheet(df, name).set_index(['Country', 'ISO3', 'Year'])
+              for name, df in zip(CMIP6_VARIABLES, sheets)]
+    return frames[0].join(frames[1:], how='outer').reset_index()
+
+
+@dataset('emdat_events', requires=['emdat_data'])
+def build_emdat_events(emdat_data):
+    events = emdat_data.rename(columns={
+        'Start Year': 'Year',
+        'Disaster Type': 'Disaster_type',
+        'Total Deaths': 'Deaths',
+        'Total Affected': 'Affected',
+        "Total Damage, Adjusted ('000 US$)": 'Damage_adjusted_1000_usd',
+        'ISO': 'ISO3',
+    })
+    events = events[['Country', 'ISO3', 'Year', 'Disaster_type', 'Deaths', 'Affected', 'Damage_adjusted_1000_usd']]
+    return events.astype({'Year': 'int16', 'Deaths': 'float32', 'Affected': 'float32',
+                          'Damage_adjusted_1000_usd': 'float32'})
+
+
+@dataset('emdat_clean', requires=['emdat_events'])
+def build_emdat_clean(emdat_events):
+    # grouped by code, so events filed under a country's older name still count towards it
+    grouped = emdat_events.groupby(['ISO3', 'Year'], sort=True)
+    clean = pd.DataFrame({
+        'Country': grouped['Country'].last(),
+        'Disasters': grouped.size().astype('int32'),
+        'Deaths': grouped['Deaths'].sum(),
+        'Affected': grouped['Affected'].sum(),
+        'Damage_adjusted_1000_usd': grouped['Damage_adjusted_1000_usd'].sum(),
+    }).reset_index()
+    return clean[['Country', 'ISO3', 'Year', 'Disasters', 'Deaths', 'Affected', 'Damage_adjusted_1000_usd']]
+
+
+@dataset('us_temperature_clean', requires=['us_temp_data'])
+def build_us_temperature_clean(us_temp_data):
+    valid = us_temp_data[us_temp_data['Value'] != -99]
+    return pd.DataFrame({
+        'Country': 'United States',
+        'Year': (valid['Date'] // 100).astype('int16'),
+        'Temperature_F': valid['Value'].astype('float32'),
+        'Temperature_anomaly_F': valid['Anomaly'].astype('float32'),
+    }).reset_index(drop=True)
+
+
+@dataset('us_disasters_clean', requires=['us_disasters_data'])
+def build_us_disasters_clean(us_disasters_data):
+    counts = [col for col in us_disasters_data.columns if col.endswith(' Count')]
+    costs = [col for col in us_disasters_data.columns if col.endswith(' Cost')]
+    return pd.DataFrame({
+        'Country': 'United States',
+        'Year': us_disasters_data['Year'].astype('int16'),
+        'Billion_dollar_disasters': us_disasters_data[counts].sum(axis=1).astype('int32'),
+        'Disaster_cost_billion_usd': us_disasters_data[costs].sum(axis=1).astype('float32'),
+    })
+
+
+INDEXED_DATASETS = {
+    'co2_index': 'co2_clean',
+    'energy_index': 'energy_clean',
+    'gdp_index': 'gdp_clean',
+    'us_energy_index': 'us_energy_clean',
+    'us_co2_index': 'us_co2_clean',
+    'cmip6_index': 'cmip6_clean',
+    'emdat_index': 'emdat_clean',
+    'us_temperature_index': 'us_temperature_clean',
+    'us_disasters_index': 'us_disasters_clean',
+}
+
+
+def register_index(name, clean_name):
+    dataset(name, requires=[clean_name, 'country_codes'])(CountryIndex)
+    if clean_name in CLEAN_DELTAS:
+        @patches(name)
+        def patch(old, changes, df, codes):
+            # the stored index keeps every country whose cells didn't change, along with its rows
+            cells = changes.cells.assign(ISO3=[old.code(country) for country in changes.cells['Country']])
+            return old.patch(df, changes.countries), Changes(cells)
+
+
+for index_name, clean_name in INDEXED_DATASETS.items():
+    register_index(index_name, clean_name)
+
+# how the large stored frames are split into files: clean frames are year-major and indexes sorted by code,
+# so the cells a release changes fall in a few parts and the rest are linked from the previous bundle
+PARTITIONS = {
+    **{name: 'Year' for name in CLEAN_DELTAS},
+    **{name: 'ISO3' for name in INDEXED_DATASETS},
+}
+
+
+@traced_cache(fingerprinted(shared_cache, version=1, key=index_query_key),
+              'query', label=lambda index_name, country: index_name)
+def get_country(index_name, country):
+    return get_dataset(index_name).select(country)
+
+
+@traced_cache(fingerprinted(shared_cache, version=1, key=index_query_key),
+              'query', label=lambda index_name, *args, **kwargs: index_name)
+def get_trends(index_name, value_col, start=None, end=None):
+    return trend_table(get_dataset(index_name).df, value_col, start=start, end=end)
+
+
+@traced_cache(fingerprinted(shared_cache, version=1, key=index_query_key),
+              'forecast', label=lambda index_name, *args, **kwargs: index_name)
+def get_forecast(index_name, value_col, start=None, horizon=HORIZON, n_sims=1000, seed=0):
+    # keyed by the series' provenance and the simulation settings; every country is simulated at once
+    return forecast_table(get_dataset(index_name).df, value_col, start=start, horizon=horizon, n_sims=n_sims,
+                          seed=seed)
+
+
+YEAR_SPAN = 10000
+
+
+def country_year_rows(index, countries=None):
+    if countries is None:
+        return index.df
+    codes = sorted({index.code(country) for country in countries if country in index})
+    if not codes:
+        return index.df.iloc[0:0]
+    return pd.concat([index.df.iloc[index.slices[code]] for code in codes])
+
+
+def country_year_keys(rows, categories):
+    # CountryIndex rows are sorted by (ISO3, Year), so these keys come out sorted too
+    codes = pd.Categorical(rows['ISO3'], categories=categories).codes.astype(np.int64)
+    return codes * YEAR_SPAN + rows['Year'].to_numpy(dtype=np.int64)
+
+
+def lookup_sorted(keys, values, target):
+    if not len(keys):
+        return np.full(len(target), np.nan)
+    position = np.searchsorted(keys, target).clip(max=len(keys) - 1)
+    return np.where(keys[position] == target, values[position], np.nan)
+
+
+@traced_cache(fingerprinted(shared_cache, version=1, key=join_key), 'join')
+def join_country_year(columns, countries=None, how='inner'):
+    parts = [(country_year_rows(get_dataset(index_name), countries), column) for index_name, column in columns]
+    firsts = [rows.drop_duplicates('ISO3') for rows, _ in parts]
+    categories = sorted(set().union(*(first['ISO3'].astype(str) for first in firsts)))
+    keys = [country_year_keys(rows, categories) for rows, _ in parts]
+
+    joined = keys[0]
+    for part_keys in keys[1:]:
+        joined = np.intersect1d(joined, part_keys) if how == 'inner' else np.union1d(joined, part_keys)
+
+    names = {}
+    # later indexes win, as in CountryTensor
+    for first in firsts:
+        names.update(zip(first['ISO3'].astype(str), first['Country']))
+    iso3 = np.asarray(categories, dtype=object)[joined // YEAR_SPAN] if len(joined) else np.array([], dtype=object)
+    frame = pd.DataFrame({
+        'Country': [names[code] for code in iso3],
+        'ISO3': iso3,
+        'Year': (joined % YEAR_SPAN).astype(np.int16),
+    })
+    for (rows, column), part_keys in zip(parts, keys):
+        frame[column] = lookup_sorted(part_keys, rows[column].to_numpy(dtype=np.float64), joined)
+    return frame
+
+
+@dataset('co2_trends', requires=['co2_index'])
+def build_co2_trends(co2_index):
+    return trend_table(co2_index.df, 'CO2_per_capita')
+
+
+@patches('co2_trends')
+def patch_co2_trends(old, changes, co2_index):
+    codes = {co2_index.code(country) for country in changes.countries}
+    return patch_trends(old, co2_index.df, 'CO2_per_capita', codes), changes
+
+
+@dataset('norway_co2', requires=['co2_index'])
+def build_norway_co2(co2_index):
+    return co2_index.select('NOR')
+
+
+@dataset('us_co2_per_capita', requires=['co2_index'])
+def build_us_co2_per_capita(co2_index):
+    return co2_index.select('USA')
+
+
+@dataset('norway_energy', requires=['energy_index'])
+def build_norway_energy(energy_index):
+    return energy_index.select('NOR')
+
+
+@dataset('us_energy_per_capita_global', requires=['energy_index'])
+def build_us_energy_per_capita_global(energy_index):
+    return energy_index.select('USA')
+
+
+@dataset('norway_gdp', requires=['gdp_index'])
+def build_norway_gdp(gdp_index):
+    return gdp_index.select('NOR')
+
+
+@dataset('us_gdp_global', requires=['gdp_index'])
+def build_us_gdp_global(gdp_index):
+    return gdp_index.select('USA')
+
+
+@dataset('us_energy_filtered', requires=['us_energy_index'])
+def build_us_energy_filtered(us_energy_index):
+    return us_energy_index.select('USA')
+
+
+@dataset('us_co2_filtered', requires=['us_co2_index'])
+def build_us_co2_filtered(us_co2_index):
+    return us_co2_index.select('USA')
+
+
+COUNTRY_SLICES = {
+    'norway_co2': 'NOR',
+    'us_co2_per_capita': 'USA',
+    'norway_energy': 'NOR',
+    'us_energy_per_capita_global': 'USA',
+    'norway_gdp': 'NOR',
+    'us_gdp_global': 'USA',
+    'us_energy_filtered': 'USA',
+    'us_co2_filtered': 'USA',
+}
+
+
+def register_slice_delta(name, code):
+    @patches(name)
+    def patch(old, changes, index):
+        mine = changes.only([country for country in changes.countries if index.code(country) == code])
+        return (DATASETS[name][1](index) if mine else old), mine
+
+
+for slice_name, code in COUNTRY_SLICES.items():
+    register_slice_delta(slice_name, code)
+
+
+COMPARISON_METRICS = {
+    'CO2_per_capita': 'co2_index',
+    'Energy_use_per_capita': 'energy_index',
+    'GDP_growth': 'gdp_index',
+}
+
+
+@dataset('country_tensor', requires=list(COMPARISON_METRICS.values()))
+def build_country_tensor(*indexes):
+    return CountryTensor(dict(zip(COMPARISON_METRICS, indexes)))
+
+
+@st.cache_resource
+def rolling_cache():
+    return watch('rolling', LRUCache(maxsize=64))
+
+
+def rolling(tensor, metric, window, kind='stats'):
+    with span(f'rolling:{kind}', 'rolling'):
+        windows = rolling_cache().get(
+            (tensor.key, metric),
+            lambda: RollingWindows(tensor.years, tensor.values[tensor.metrics.index(metric)]))
+        return rolling_cache().get((tensor.key, metric, window, kind), lambda: getattr(windows, kind)(window))
+
+
+def rolling_series(tensor, metric, window, code):
+    row = tensor.position[code]
+    stats = rolling(tensor, metric, window)
+    return pd.DataFrame({
+        'Year': tensor.years,
+        metric: tensor.values[tensor.metrics.index(metric), row],
+        'rolling_mean': stats['mean'][row],
+        'rolling_slope': stats['slope'][row],
+        'volatility': stats['volatility'][row],
+    })
+
+
+def found_years(result):
+    # <NA> where there was nothing to find, rather than the -1 placeholder
+    return pd.arrays.IntegerArray(result['year'].astype(np.int64), ~result['found'])
+
+
+def rolling_summary(tensor, metric, window):
+    def build():
+        peaks = rolling(tensor, metric, window, 'peaks')
+        breaks = rolling(tensor, metric, window, 'breaks')
+        table = pd.DataFrame({
+            'Country': [tensor.name(code) for code in tensor.codes],
+            'peak_year': found_years(peaks),
+            'peak_value': peaks['value'],
+            'break_year': found_years(breaks),
+            'slope_before': breaks['slope_before'],
+            'slope_after': breaks['slope_after'],
+        }, index=pd.Index(tensor.codes, name='ISO3'))
+        table['slope_change'] = table['slope_after'] - table['slope_before']
+        return table[peaks['found'] | breaks['found']]
+
+    return rolling_cache().get((tensor.key, metric, window, 'summary'), build)
+
+
+@st.cache_resource
+def aggregate_cache():
+    return watch('aggregates', LRUCache(maxsize=128))
+
+
+def aggregate_name(name, by, column, func):
+    return '__'.join([name, '+'.join(by) if isinstance(by, (list, tuple)) else by, column, func])
+
+
+def aggregate(name, by, column, func):
+    by = tuple(by) if isinstance(by, list) else by
+    with span(f'aggregate:{name}', 'aggregate'):
+        key = (name, dataset_key(name), by, column, func)
+        group_keys = list(by) if isinstance(by, tuple) else by
+        precomputed = aggregate_name(name, by, column, func)
+        if precomputed in DATASETS:
+            return aggregate_cache().get(key, lambda: get_dataset(precomputed))
+        return aggregate_cache().get(key, lambda: get_dataset(name).groupby(group_keys)[column].agg(func))
+
+
+PRECOMPUTED_AGGREGATES = [
+    ('us_co2_clean', 'Year', 'CO2_emissions_1000_tonnes', 'sum'),
+    ('norway_co2', 'Year', 'CO2_per_capita', 'mean'),
+]
+
+
+def register_aggregate(name, by, column, func):
+    dataset(aggregate_name(name, by, column, func), requires=[name])(
+        lambda df: df.groupby(by)[column].agg(func))
+    if by in ('Year', 'Country'):
+        # only the groups holding a changed cell are recomputed
+        patches(aggregate_name(name, by, column, func))(
+            lambda old, changes, df: (patch_groups(old, df, by, column, func,
+                                                   changes.years if by == 'Year' else changes.countries), changes))
+
+
+for spec in PRECOMPUTED_AGGREGATES:
+    register_aggregate(*spec)
+
+
+class LazyData(Mapping):
+    def __init__(self, names):
+        unknown = [name for name in names if name not in DATASETS]
+        if unknown:
+            raise KeyError(f"Unknown dataset(s): {', '.join(unknown)}")
+        self.names = tuple(names)
+        self.loaded = {}
+
+    def __getitem__(self, name):
+        if name not in self.names:
+            raise KeyError(f"Dataset '{name}' was not declared; add it to the section's uses(...)")
+        if name not in self.loaded:
+            self.loaded[name] = get_dataset(name)
+        return self.loaded[name]
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+def uses(*names):
+    def declare(section):
+        section.datasets = names
+        return section
+    return declare
+
+
+def section_data(section):
+    return LazyData(getattr(section, 'datasets', ()))
+
+
+COMPARISON_DATASETS = [
+    'norway_co2', 'us_co2_per_capita', 'norway_energy', 'us_energy_per_capita_global',
+    'norway_gdp', 'us_gdp_global', 'us_energy_filtered', 'us_co2_clean',
+    'us_temp_data', 'us_disasters_data', 'us_energy_per_person', 'us_gdp_growth'
+]
+
+
+def prepare_comparison_data():
+    return {name: get_dataset(name) for name in COMPARISON_DATASETS}
@@ -0,0 +1,256 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+COMPACT_DIR = 'models'
+FORMAT_VERSION = 1
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 1 / (1 + np.exp(-x)),
+}
+
+
+def save(path, meta, arrays):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    meta = dict(meta, format_version=FORMAT_VERSION)
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, meta=np.array(json.dumps(meta, sort_keys=True)), **arrays)
+    os.replace(tmp, path)
+
+
+def export_random_forest(model, columns=(0, 1, 2)):
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        leaf = tree.children_left < 0
+        roots.append(offset)
+        features.append(np.where(leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+        lefts.append(np.where(leaf, -1, tree.children_left + offset))
+        rights.append(np.where(leaf, -1, tree.children_right + offset))
+        values.append(tree.value.reshape(tree.node_count, -1)[:, 0])
+        offset += tree.node_count
+        depth = max(depth, tree.max_depth)
+
+    meta = {'kind': 'random_forest', 'columns': list(columns), 'depth': int(depth)}
+    return meta, {
+        'feature': np.concatenate(features).astype(np.int32),
+        'threshold': np.concatenate(thresholds).astype(np.float64),
+        'left': np.concatenate(lefts).astype(np.int32),
+        'right': np.concatenate(rights).astype(np.int32),
+        'value': np.concatenate(values).astype(np.float64),
+        'roots': np.array(roots, dtype=np.int32),
+    }
+
+
+def export_keras_h5(path, scaler=None, columns=(2,)):
+    import h5py
+
+    with h5py.File(path, 'r') as f:
+        config = json.loads(f.attrs['model_config'])
+        weights = f['model_weights']
+        layers, arrays = [], {}
+        for layer in config['config']['layers']:
+            kind, options = layer['class_name'], layer['config']
+            if kind in ('InputLayer', 'Dropout'):
+                continue
+            if kind == 'Flatten':
+                layers.append({'kind': 'flatten'})
+                continue
+            if kind == 'Conv1D' and (options['kernel_size'] != [1] or options['strides'] != [1]
+                                     or options['dilation_rate'] != [1] or options['groups'] != 1):
+                raise ValueError(f"Only pointwise Conv1D layers can be exported, got {options['name']}")
+            if kind not in ('Conv1D', 'Dense'):
+                raise ValueError(f'Unsupported layer type: {kind}')
+            if options['activation'] not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {options['activation']}")
+
+            group = weights[options['name']]
+            names = [name.decode() if isinstance(name, bytes) else name for name in group.attrs['weight_names']]
+            found = {name.rsplit('/', 1)[-1]: group[name][()] for name in names}
+            i = len(layers)
+            # a pointwise Conv1D is a Dense applied to every step
+            arrays[f'kernel_{i}'] = found['kernel'].reshape(found['kernel'].shape[-2:]).astype(np.float32)
+            if options.get('use_bias', True):
+                arrays[f'bias_{i}'] = found['bias'].astype(np.float32)
+            layers.append({'kind': 'dense', 'activation': options['activation']})
+
+    meta = {'kind': 'network', 'columns': list(columns), 'layers': layers}
+    if scaler is not None:
+        arrays['scaler_mean'] = np.asarray(scaler.mean_, dtype=np.float64)
+        arrays['scaler_scale'] = np.asarray(scaler.scale_, dtype=np.float64)
+    return meta, arrays
+
+
+class ForestRuntime:
+    def __init__(self, meta, arrays):
+        self.columns = meta['columns']
+        self.depth = meta['depth']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+
+    def predict(self, X):
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float64)[:, self.columns].astype(np.float32)
+        if np.isnan(X).any():
+            raise ValueError('Input contains NaN')
+        rows = np.arange(len(X))
+        node = np.repeat(self.roots[:, None], len(X), axis=1)
+        for _ in range(self.depth):
+            left = self.left[node]
+            leaf = left < 0
+            if leaf.all():
+                break
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(leaf, node, np.where(go_left, left, self.right[node]))
+        return self.value[node].mean(axis=0)
+
+
+class NetworkRuntime:
+    def __init__(self, meta, arrays):
+        self.columns = meta['columns']
+        self.mean = arrays.get('scaler_mean')
+        self.scale = arrays.get('scaler_scale')
+        self.layers = []
+        for i, layer in enumerate(meta['layers']):
+            if layer['kind'] == 'flatten':
+                self.layers.append(None)
+            else:
+                self.layers.append((arrays[f'kernel_{i}'], arrays.get(f'bias_{i}'), ACTIVATIONS[layer['activation']]))
+
+    def predict(self, X):
+        x = np.asarray(X, dtype=np.float64)[:, self.columns]
+        if self.mean is not None:
+            x = (x - self.mean) / self.scale
+        # Keras runs in float32 on a (batch, steps, channels) input with one step
+        h = x.astype(np.float32)[:, None, :]
+        for layer in self.layers:
+            if layer is None:
+                h = h.reshape(len(h), -1)
+                continue
+            kernel, bias, activation = layer
+            h = h @ kernel
+            if bias is not None:
+                h = h + bias
+            h = activation(h)
+        return h.reshape(len(h)).astype(np.float64)
+
+
+RUNTIMES = {
+    'random_forest': ForestRuntime,
+    'network': NetworkRuntime,
+}
+
+
+def load(path):
+    with np.load(path, allow_pickle=False) as f:
+        arrays = {name: f[name] for name in f.files}
+    meta = json.loads(arrays.pop('meta').item())
+    if meta.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compact model format in '{path}': {meta.get('format_version')}")
+    return RUNTIMES[meta['kind']](meta, arrays)
+
+
+def export_all(source_dir='.', out_dir=COMPACT_DIR):
+    import joblib
+
+    paths = {}
+    forest = joblib.load(os.path.join(source_dir, 'random_forest_model.pkl'))
+    paths['random_forest'] = os.path.join(out_dir, 'random_forest.npz')
+    save(paths['random_forest'], *export_random_forest(forest))
+
+    scaler = joblib.load(os.path.join(source_dir, 'cnn_scaler.pkl'))
+    paths['cnn'] = os.path.join(out_dir, 'cnn.npz')
+    save(paths['cnn'], *export_keras_h5(os.path.join(source_dir, 'cnn_model.h5'), scaler))
+    return paths
+
+
+def training_rows():
+    from climate_data import get_dataset
+    from training import norway_training_data
+
+    X, _ = norway_training_data({name: get_dataset(name) for name in ('norway_co2', 'norway_energy', 'norway_gdp')})
+    return X
+
+
+def check_rows(X, n=2000, seed=0):
+    # the training rows plus uniform draws over each feature's training range, so every split the models
+    # learnt sees rows on both sides; Year runs on past the data for the forecast years
+    rng = np.random.default_rng(seed)
+    low, high = X.min(axis=0), X.max(axis=0)
+    high[2] = max(high[2], 2050)
+    drawn = rng.uniform(low, high, (n, X.shape[1]))
+    drawn[:, 2] = np.round(drawn[:, 2])
+    return np.vstack([X, drawn]).astype(np.float64)
+
+
+def verify(source_dir='.', out_dir=COMPACT_DIR, rtol=1e-5, atol=1e-6):
+    import joblib
+
+    X = check_rows(training_rows())
+    results = {}
+    forest = joblib.load(os.path.join(source_dir, 'random_forest_model.pkl'))
+    results['random_forest'] = (forest.predict(X), load(os.path.join(out_dir, 'random_forest.npz')).predict(X))
+
+    try:
+        from tensorflow.keras.models import load_model
+    except ImportError:
+        results['cnn'] = None
+    else:
+        scaler = joblib.load(os.path.join(source_dir, 'cnn_scaler.pkl'))
+        network = load_model(os.path.join(source_dir, 'cnn_model.h5'), compile=False)
+        expected = network.predict(scaler.transform(X[:, 2:3]).reshape(-1, 1, 1), verbose=0).ravel()
+        results['cnn'] = (expected, load(os.path.join(out_dir, 'cnn.npz')).predict(X))
+
+    report = {}
+    for name, pair in results.items():
+        if pair is None:
+            report[name] = None
+            continue
+        expected, actual = pair
+        report[name] = {
+            'max_abs_error': float(np.max(np.abs(expected - actual))),
+            'ok': bool(np.allclose(expected, actual, rtol=rtol, atol=atol)),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the trained models to flat NumPy arrays.')
+    parser.add_argument('--source', default='.', help='directory holding the .pkl and .h5 files')
+    parser.add_argument('--out', default=COMPACT_DIR)
+    parser.add_argument('--no-verify', action='store_true', help='skip comparing against the original models')
+    args = parser.parse_args()
+
+    for name, path in export_all(args.source, args.out).items():
+        start = time.perf_counter()
+        load(path)
+        print(f'{name}: {path} ({os.path.getsize(path) / 1024:.0f} KB, loads in '
+              f'{(time.perf_counter() - start) * 1000:.2f} ms)')
+
+    if args.no_verify:
+        return
+    failed = False
+    for name, result in verify(args.source, args.out).items():
+        if result is None:
+            print(f'{name}: not verified (TensorFlow is not installed)')
+            continue
+        print(f"{name}: max abs error {result['max_abs_error']:.3g} ({'ok' if result['ok'] else 'MISMATCH'})")
+        failed = failed or not result['ok']
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from reshape import matrix_to_long
+from trends import country_year_matrix, fit_trends
+
+
+class CountryTensor:
+    def __init__(self, indexes):
+        matrices = {metric: country_year_matrix(index.df, metric) for metric, index in indexes.items()}
+        codes = sorted(set().union(*(labels for labels, _, _ in matrices.values())))
+        spans = [years for _, years, _ in matrices.values() if len(years)]
+        first = min(years[0] for years in spans)
+        last = max(years[-1] for years in spans)
+
+        self.metrics = list(indexes)
+        self.codes = np.array(codes, dtype=object)
+        self.years = np.arange(first, last + 1, dtype=np.int16)
+        self.position = {code: i for i, code in enumerate(codes)}
+        self.values = np.full((len(self.metrics), len(codes), len(self.years)), np.nan, dtype=np.float32)
+        for m, (labels, years, matrix) in enumerate(matrices.values()):
+            rows = [self.position[code] for code in labels]
+            self.values[m][np.ix_(rows, years - first)] = matrix
+
+        # later indexes win, so World Bank names replace Gapminder ones like 'USA'
+        self.names = {}
+        for index in indexes.values():
+            firsts = index.df.drop_duplicates('ISO3')
+            self.names.update(zip(firsts['ISO3'].astype(str), firsts['Country']))
+
+        digest = hashlib.sha1(self.values.tobytes())
+        digest.update('|'.join(codes + self.metrics).encode())
+        self.key = digest.hexdigest()
+
+    def name(self, code):
+        return self.names.get(code, code)
+
+    def countries(self):
+        return sorted(self.codes, key=self.name)
+
+    def rows(self, codes):
+        return [self.position[code] for code in codes]
+
+    def frame(self, metric, codes):
+        block = self.values[self.metrics.index(metric)][self.rows(codes)]
+        names = np.array([self.name(code) for code in codes], dtype=object)
+        return matrix_to_long(names, self.years, block, metric)
+
+
+class ComparisonSet:
+    def __init__(self, tensor):
+        self.tensor = tensor
+        self.members = []
+        self.summaries = {}
+        self.reset()
+
+    def reset(self):
+        shape = (len(self.tensor.metrics), len(self.tensor.years))
+        self.total = np.zeros(shape)
+        self.total_sq = np.zeros(shape)
+        self.count = np.zeros(shape, dtype=np.int64)
+
+    def block(self, code):
+        block = self.tensor.values[:, self.tensor.position[code], :].astype(np.float64)
+        present = ~np.isnan(block)
+        return np.where(present, block, 0.0), present
+
+    def add(self, code):
+        if code in self.members:
+            return
+        values, present = self.block(code)
+        self.total += values
+        self.total_sq += values * values
+        self.count += present
+        self.members.append(code)
+        if code not in self.summaries:
+            self.summaries[code] = self.summarise(code)
+
+    def remove(self, code):
+        if code not in self.members:
+            return
+        self.members.remove(code)
+        if not self.members:
+            # start from exact zeros again rather than carrying subtraction error forward
+            self.reset()
+            return
+        values, present = self.block(code)
+        self.total -= values
+        self.total_sq -= values * values
+        self.count -= present
+
+    def update(self, codes):
+        removed = [code for code in self.members if code not in codes]
+        added = [code for code in codes if code not in self.members]
+        for code in removed:
+            self.remove(code)
+        for code in added:
+            self.add(code)
+        self.members = [code for code in codes if code in self.members]
+        return added, removed
+
+    def summarise(self, code):
+        block = self.tensor.values[:, self.tensor.position[code], :]
+        fit = fit_trends(self.tensor.years, block)
+        summary = {'Country': self.tensor.name(code)}
+        for m, metric in enumerate(self.tensor.metrics):
+            observed = np.flatnonzero(~np.isnan(block[m]))
+            summary[f'{metric} (latest)'] = block[m, observed[-1]] if len(observed) else np.nan
+            summary[f'{metric} (trend/yr)'] = fit['slope'][m]
+        return summary
+
+    def summary(self):
+        return pd.DataFrame([self.summaries[code] for code in self.members],
+                            index=pd.Index(self.members, name='ISO3'))
+
+    def aggregate(self, metric):
+        m = self.tensor.metrics.index(metric)
+        count = self.count[m]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self.total[m] / count
+            std = np.sqrt(np.maximum(self.total_sq[m] / count - mean ** 2, 0.0))
+        observed = count > 0
+        return pd.DataFrame({
+            'Year': self.tensor.years[observed],
+            'mean': mean[observed],
+            'std': std[observed],
+            'countries': count[observed],
+        })
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+# Gapminder spellings that differ from the World Bank "Country Name" column
+COUNTRY_ALIASES = {
+    'Bahamas': 'BHS',
+    'Brunei': 'BRN',
+    'Cape Verde': 'CPV',
+    'Czech Republic': 'CZE',
+    'Egypt': 'EGY',
+    'Gambia': 'GMB',
+    'Hong Kong, China': 'HKG',
+    'Iran': 'IRN',
+    'Lao': 'LAO',
+    'Macedonia, FYR': 'MKD',
+    'North Korea': 'PRK',
+    'Palestine': 'PSE',
+    'Russia': 'RUS',
+    'South Korea': 'KOR',
+    'Swaziland': 'SWZ',
+    'Syria': 'SYR',
+    'Taiwan': 'TWN',
+    'Turkey': 'TUR',
+    'UAE': 'ARE',
+    'UK': 'GBR',
+    'USA': 'USA',
+    'Venezuela': 'VEN',
+    'Vietnam': 'VNM',
+    'Yemen': 'YEM',
+}
+
+
+def country_codes(worldbank_df):
+    codes = dict(zip(worldbank_df['Country Name'], worldbank_df['Country Code']))
+    codes.update(COUNTRY_ALIASES)
+    return codes
+
+
+class CountryIndex:
+    def __init__(self, df, codes, ordered=False):
+        # ordered: df already has its ISO3 column and is sorted by (ISO3, Year), as a stored or patched index is
+        if not ordered:
+            named = df['Country'].map(codes).fillna(df['Country'])
+            if 'ISO3' in df:
+                # sources that ship their own codes only fall back to the name aliases where a code is missing
+                iso3 = df['ISO3'].astype(object).fillna(named)
+                codes = {**codes, **dict(zip(df['Country'], iso3))}
+            else:
+                iso3 = named
+            df = df.assign(ISO3=iso3.astype('category'))
+            df = df.sort_values(['ISO3', 'Year'], kind='stable').reset_index(drop=True)
+
+        positions = df['ISO3'].cat.codes.to_numpy()
+        starts = np.flatnonzero(np.r_[True, positions[1:] != positions[:-1]]) if len(df) else np.array([], dtype=int)
+        stops = np.r_[starts[1:], len(df)]
+        keys = np.asarray(df['ISO3'].cat.categories, dtype=object)[positions[starts]]
+
+        self.df = df
+        self.codes = codes
+        self.slices = {key: slice(start, stop) for key, start, stop in zip(keys, starts, stops)}
+
+    def patch(self, df, countries):
+        # the index of df, given this one was built from a df that differs only in these countries' rows
+        if 'ISO3' in df:
+            raise ValueError("an index over shipped ISO3 codes can't be patched by country name")
+        touched = {self.code(country) for country in countries}
+        if 2 * len(touched) > len(self.slices):
+            # splicing most of the codes back in costs more than sorting them all again
+            return CountryIndex(df, self.codes)
+        names = [name for name, code in self.codes.items() if code in touched]
+        fresh = CountryIndex(df[df['Country'].isin(names + list(touched))], self.codes)
+
+        present = self.df['ISO3'].cat.categories
+        gone = [code for code in touched if code in self.slices and code not in fresh.slices]
+        added = [code for code in touched if code in fresh.slices and code not in self.slices]
+        categories = present.difference(gone).union(added) if gone or added else present
+
+        # splice the rebuilt codes in between the untouched runs of rows, which are already in order
+        pieces, start = [], 0
+        for code in sorted(touched):
+            rows = self.slices.get(code)
+            if rows is None:
+                following = present.searchsorted(code)
+                at = self.slices[present[following]].start if following < len(present) else len(self.df)
+                rows = slice(at, at)
+            pieces.append(self.df.iloc[start:rows.start])
+            if code in fresh.slices:
+                pieces.append(fresh.df.iloc[fresh.slices[code]])
+            start = rows.stop
+        pieces.append(self.df.iloc[start:])
+        pieces = [piece.assign(ISO3=piece['ISO3'].cat.set_categories(categories)) for piece in pieces]
+        return CountryIndex(pd.concat(pieces, ignore_index=True), self.codes, ordered=True)
+
+    def equals(self, other):
+        return isinstance(other, CountryIndex) and self.codes == other.codes and self.df.equals(other.df)
+
+    def code(self, country):
+        return self.codes.get(country, country)
+
+    def select(self, country):
+        rows = self.slices.get(self.code(country))
+        if rows is None:
+            return self.df.iloc[0:0]
+        return self.df.iloc[rows]
+
+    def countries(self):
+        return sorted(self.slices)
+
+    def __contains__(self, country):
+        return self.code(country) in self.slices
@@ -0,0 +1,239 @@
+import argparse
+import gzip
+import json
+import logging
+import struct
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+from climate_data import dataset_key, get_dataset
+from memo import LRUCache, digest
+
+# metric -> the indexed dataset holding it; metric names are the cleaned column names
+SERIES = {
+    'CO2_per_capita': 'co2_index',
+    'Energy_use_per_capita': 'energy_index',
+    'GDP_growth': 'gdp_index',
+    'US_Energy_use_per_capita': 'us_energy_index',
+    'CO2_emissions_1000_tonnes': 'us_co2_index',
+    'Temperature_F': 'us_temperature_index',
+    'Temperature_anomaly_F': 'us_temperature_index',
+    'Billion_dollar_disasters': 'us_disasters_index',
+    'Disaster_cost_billion_usd': 'us_disasters_index',
+    'Disasters': 'emdat_index',
+    'Deaths': 'emdat_index',
+    'cdd65': 'cmip6_index',
+    'hdd65': 'cmip6_index',
+    'tas': 'cmip6_index',
+}
+FORMATS = {
+    'json': 'application/json',
+    'binary': 'application/octet-stream',
+}
+MAX_BATCH = 64
+
+
+def parse_spec(spec):
+    metric, sep, country = unquote(spec).partition('/')
+    if not sep or not country:
+        raise ValueError(f"Expected '<metric>/<country>', got '{spec}'")
+    if metric not in SERIES:
+        raise KeyError(f'Unknown metric: {metric}')
+    return metric, country
+
+
+def encode_json(series):
+    return json.dumps([{
+        'metric': item['metric'],
+        'country': item['country'],
+        'iso3': item['iso3'],
+        'years': item['years'].tolist(),
+        # float32 -> shortest repr that round-trips in the browser
+        'values': [float(f'{value:.7g}') for value in item['values'].tolist()],
+    } for item in series], separators=(',', ':')).encode()
+
+
+def encode_binary(series):
+    # uint32 count, then per series: int16 first year, uint16 length, float32[length] with NaN gaps,
+    # little-endian and 4-byte aligned so the client can view each block as a Float32Array
+    parts = [struct.pack('<I', len(series))]
+    for item in series:
+        years = item['years']
+        first = int(years[0]) if len(years) else 0
+        length = int(years[-1]) - first + 1 if len(years) else 0
+        dense = np.full(length, np.nan, dtype='<f4')
+        dense[years - first] = item['values']
+        parts.append(struct.pack('<hH', first, length))
+        parts.append(dense.tobytes())
+    return b''.join(parts)
+
+
+ENCODERS = {
+    'json': encode_json,
+    'binary': encode_binary,
+}
+
+
+class SeriesService:
+    def __init__(self, cache_size=4096):
+        self.cache = LRUCache(maxsize=cache_size)
+
+    def metrics(self):
+        return {metric: {'dataset': index_name, 'countries': len(get_dataset(index_name).slices)}
+                for metric, index_name in SERIES.items()}
+
+    def countries(self, metric):
+        if metric not in SERIES:
+            raise KeyError(f'Unknown metric: {metric}')
+        index = get_dataset(SERIES[metric])
+        return sorted(index.slices)
+
+    def series(self, metric, country):
+        rows = get_dataset(SERIES[metric]).select(country)
+        rows = rows[rows[metric].notna()]
+        if not len(rows):
+            raise KeyError(f'No {metric} series for {country}')
+        return {
+            'metric': metric,
+            'country': str(rows['Country'].iloc[0]),
+            'iso3': str(rows['ISO3'].iloc[0]),
+            'years': rows['Year'].to_numpy(dtype=np.int64),
+            'values': rows[metric].to_numpy(dtype=np.float32),
+        }
+
+    def etag(self, specs, fmt):
+        # from dataset keys alone, so a revalidation never touches the data
+        return '"' + digest(fmt, [(metric, country, dataset_key(SERIES[metric])) for metric, country in specs]) + '"'
+
+    def body(self, specs, fmt, etag, compressed):
+        def encode():
+            return ENCODERS[fmt]([self.series(metric, country) for metric, country in specs])
+
+        raw = self.cache.get((etag, False), encode)
+        if not compressed:
+            return raw
+        return self.cache.get((etag, True), lambda: gzip.compress(raw, compresslevel=9, mtime=0))
+
+    def warm(self, formats=tuple(FORMATS)):
+        count = 0
+        for metric in SERIES:
+            for country in self.countries(metric):
+                for fmt in formats:
+                    specs = [(metric, country)]
+                    try:
+                        self.body(specs, fmt, self.etag(specs, fmt), compressed=True)
+                    except KeyError:
+                        continue
+                    count += 1
+        return count
+
+    def stats(self):
+        return {'cache': self.cache.stats()}
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def send_body(self, status, data, content_type, headers=()):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(data)
+
+        def send_json(self, status, body):
+            self.send_body(status, json.dumps(body).encode(), 'application/json')
+
+        def send_series(self, specs, fmt):
+            if fmt not in FORMATS:
+                raise ValueError(f"Unknown format '{fmt}' (choose from {', '.join(FORMATS)})")
+            etag = service.etag(specs, fmt)
+            headers = [('ETag', etag), ('Cache-Control', 'no-cache'), ('Vary', 'Accept-Encoding'),
+                       ('Access-Control-Expose-Headers', 'ETag')]
+            matches = [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]
+            if etag in matches or '*' in matches:
+                self.send_body(304, b'', FORMATS[fmt], headers)
+                return
+            compressed = 'gzip' in self.headers.get('Accept-Encoding', '')
+            data = service.body(specs, fmt, etag, compressed)
+            if compressed:
+                headers.append(('Content-Encoding', 'gzip'))
+            self.send_body(200, data, FORMATS[fmt], headers)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            fmt = query.get('format', ['json'])[0]
+            try:
+                if url.path == '/health':
+                    self.send_json(200, {'status': 'ok'})
+                elif url.path == '/stats':
+                    self.send_json(200, service.stats())
+                elif url.path == '/metrics':
+                    self.send_json(200, service.metrics())
+                elif url.path.startswith('/countries/'):
+                    self.send_json(200, service.countries(unquote(url.path[len('/countries/'):])))
+                elif url.path.startswith('/series/'):
+                    self.send_series([parse_spec(url.path[len('/series/'):])], fmt)
+                elif url.path == '/batch':
+                    specs = [parse_spec(spec) for value in query.get('series', []) for spec in value.split(',') if spec]
+                    if not specs:
+                        raise ValueError("Pass series=<metric>/<country>,... to /batch")
+                    if len(specs) > MAX_BATCH:
+                        raise ValueError(f'At most {MAX_BATCH} series per batch')
+                    self.send_series(specs, fmt)
+                else:
+                    self.send_json(404, {'error': f'Unknown path: {url.path}'})
+            except KeyError as exc:
+                self.send_json(404, {'error': str(exc).strip("'")})
+            except ValueError as exc:
+                self.send_json(400, {'error': str(exc)})
+
+        do_HEAD = do_GET
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class DataServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def serve(host='127.0.0.1', port=8700, service=None):
+    return DataServer((host, port), make_handler(service or SeriesService()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve per-country series to the React dashboard.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8700)
+    parser.add_argument('--cache-size', type=int, default=8192, help='encoded responses kept in memory')
+    parser.add_argument('--warm', action='store_true', help='encode and compress every single series at startup')
+    args = parser.parse_args()
+
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    service = SeriesService(cache_size=args.cache_size)
+    if args.warm:
+        print(f'precompressed {service.warm()} responses')
+    server = serve(args.host, args.port, service)
+    print(f'Serving {len(SERIES)} metrics on http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+from reshape import wide_matrix, year_columns
+from trends import trend_table
+
+YEAR_SPAN = 10000
+CELL_COLUMNS = ['Country', 'Year', 'old', 'new', 'change']
+
+
+class Changes:
+    # which (country, year) cells of a dataset differ from the previous bundle
+    def __init__(self, cells=None):
+        self.cells = pd.DataFrame(columns=CELL_COLUMNS) if cells is None else cells
+
+    @property
+    def countries(self):
+        return set(self.cells['Country'])
+
+    @property
+    def years(self):
+        return set(self.cells['Year'].astype(int))
+
+    def only(self, countries):
+        return Changes(self.cells[self.cells['Country'].isin(countries)])
+
+    def __or__(self, other):
+        if not other:
+            return self
+        if not self:
+            return other
+        return Changes(pd.concat([self.cells, other.cells], ignore_index=True))
+
+    def __bool__(self):
+        return len(self.cells) > 0
+
+    def __len__(self):
+        return len(self.cells)
+
+
+def grid(ids, years, values, all_ids, all_years):
+    if ids is all_ids and np.array_equal(years, all_years):
+        return values
+    out = np.full((len(all_ids), len(all_years)), np.nan, dtype=values.dtype)
+    rows = pd.Index(all_ids).get_indexer(ids)
+    cols = pd.Index(all_years).get_indexer(years)
+    out[np.ix_(rows, cols)] = values
+    return out
+
+
+def diff_wide(old, new, id_col, dtype=np.float32):
+    if old[id_col].equals(new[id_col]):
+        # identical columns can't hold a changed cell, so only the rest are densified
+        moved = [col for col in year_columns(new, (id_col,)) if col not in old or not new[col].equals(old[col])]
+        gone = [col for col in year_columns(old, (id_col,)) if col not in new]
+        old = old[[id_col] + [col for col in moved if col in old] + gone]
+        new = new[[id_col] + moved]
+    # compared at the precision the clean stages store, so float noise in a re-export isn't a change
+    old_ids, old_years, old_values = wide_matrix(old, id_col, dtype=dtype)
+    new_ids, new_years, new_values = wide_matrix(new, id_col, dtype=dtype)
+    for ids in (old_ids, new_ids):
+        if not pd.Index(ids).is_unique:
+            raise ValueError(f"'{id_col}' has duplicate values; cells can't be matched")
+
+    # most releases keep the same countries in the same order, which needs no realignment
+    if len(old_ids) == len(new_ids) and (old_ids == new_ids).all():
+        old_ids = all_ids = new_ids
+    else:
+        all_ids = np.concatenate([new_ids, old_ids[~pd.Index(old_ids).isin(new_ids)]])
+    all_years = np.union1d(old_years, new_years)
+    before = grid(old_ids, old_years, old_values, all_ids, all_years)
+    after = grid(new_ids, new_years, new_values, all_ids, all_years)
+
+    had, has = ~np.isnan(before), ~np.isnan(after)
+    changed = (had != has) | (had & has & (before != after))
+    rows, cols = np.nonzero(changed)
+    change = np.where(~had[rows, cols], 'added', np.where(~has[rows, cols], 'removed', 'revised'))
+    return pd.DataFrame({
+        'Country': all_ids[rows],
+        'Year': all_years[cols],
+        'old': before[rows, cols],
+        'new': after[rows, cols],
+        'change': change,
+    }, columns=CELL_COLUMNS)
+
+
+def cell_keys(countries, years, ids):
+    position = pd.Index(ids).get_indexer(countries).astype(np.int64)
+    return position * YEAR_SPAN + np.asarray(years, dtype=np.int64), position
+
+
+def apply_cells(old, cells, value_name, ids, min_year=None):
+    # the long frame wide_to_long would build from the new source, touching only the changed cells
+    if min_year is not None:
+        cells = cells[cells['Year'] >= min_year]
+    ids = pd.Index(ids).dropna()
+    # countries dropped from the source still need a position to find their old rows by
+    gone = pd.Index(old['Country'].unique()).append(pd.Index(cells['Country'])).unique().difference(ids)
+    ids = ids.append(gone)
+    # the old frame is year-major, so only the blocks of years with a changed cell need re-keying and re-sorting
+    touched = old['Year'].isin(cells['Year'].unique()).to_numpy()
+    block = old[touched]
+    old_keys, _ = cell_keys(block['Country'], block['Year'], ids)
+    changed_keys, _ = cell_keys(cells['Country'], cells['Year'], ids)
+    added = cells[cells['new'].notna()]
+    rows = pd.DataFrame({
+        'Country': added['Country'].to_numpy(dtype=object),
+        'Year': added['Year'].to_numpy(dtype=old['Year'].dtype),
+        value_name: added['new'].to_numpy(dtype=old[value_name].dtype),
+    })
+    block = pd.concat([block[~np.isin(old_keys, changed_keys)], rows], ignore_index=True)
+    # year-major, then source row order, as DataFrame.melt lays it out
+    _, position = cell_keys(block['Country'], block['Year'], ids)
+    block = block.iloc[np.lexsort((position, block['Year'].to_numpy()))]
+    # splice each rebuilt year back in between slices of the old frame rather than re-sorting all of it
+    years = old['Year'].to_numpy()
+    pieces, start = [], 0
+    for year, rows in block.groupby('Year', sort=True):
+        pieces += [old.iloc[start:np.searchsorted(years, year, 'left')], rows]
+        start = np.searchsorted(years, year, 'right')
+    pieces.append(old.iloc[start:])
+    return pd.concat(pieces, ignore_index=True)
+
+
+def patch_trends(old, df, value_col, codes, key='ISO3', **kwargs):
+    # a country's fit depends only on its own rows
+    rows = df[df[key].isin(codes)]
+    if isinstance(rows[key].dtype, pd.CategoricalDtype):
+        # otherwise every code in the index gets a row of the fit's matrix
+        rows = rows.assign(**{key: rows[key].cat.remove_unused_categories()})
+    refit = trend_table(rows, value_col, key=key, **kwargs)
+    kept = old[~old.index.isin(codes)]
+    return pd.concat([kept, refit]).sort_index()
+
+
+def patch_groups(old, df, by, column, func, keys):
+    regrouped = df[df[by].isin(keys)].groupby(by)[column].agg(func)
+    kept = old[~old.index.isin(keys)]
+    return pd.concat([kept, regrouped.astype(old.dtype)]).sort_index()
+
+
+def summarise(cells):
+    counts = cells['change'].value_counts()
+    return {
+        'cells': len(cells),
+        'added': int(counts.get('added', 0)),
+        'revised': int(counts.get('revised', 0)),
+        'removed': int(counts.get('removed', 0)),
+        'countries': int(cells['Country'].nunique()),
+        'years': sorted(int(year) for year in cells['Year'].unique()),
+    }
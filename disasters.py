@@ -0,0 +1,384 @@
+import argparse
+import csv
+import io
+import re
+import time
+from collections import Counter
+from itertools import compress
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+CHUNK_BYTES = 2 * 2**20
+SAMPLE_LIMIT = 20
+MISSING = ['', 'n/a', 'na', 'nan', 'none', 'null', '-', '--']
+UNITS = {'thousands': 1e3, 'millions': 1e6, 'billions': 1e9}
+SCALES = {'': None, 'k': 1e3, 'm': 1e6, 'b': 1e9, 't': 1e12}
+DATE_FORMATS = ['%Y%m%d', '%Y-%m-%d', '%m/%d/%Y']
+BAD_TEXT = re.compile('[\udc80-\udcff\x00]')
+INTEGER = r'^\s*[-+]?\d+\s*$'
+NUMBER = r'^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$'
+COST = r'^(\(?)\s*(-?)\s*\$?\s*(\d[\d,]*\.?\d*|\.\d+)\s*([kmbt]?)\s*\)?$'
+
+
+def column_kind(name):
+    lowered = name.strip().lower()
+    if lowered == 'year':
+        return 'int'
+    if lowered == 'deaths' or lowered.endswith(' count'):
+        return 'count'
+    if 'cost' in lowered or re.search(r' (lower|upper) \d+$', lowered):
+        return 'cost'
+    if lowered.endswith('date'):
+        return 'date'
+    return 'text'
+
+
+class ParseMetrics:
+    def __init__(self):
+        self.lines = 0
+        self.rows = 0
+        self.accepted = 0
+        self.blank = 0
+        self.bytes = 0
+        self.chunks = 0
+        self.elapsed_s = 0.0
+        self.repaired = Counter()
+        self.rejected = Counter()
+        self.invalid_values = Counter()
+        self.samples = []
+
+    def reject(self, reason, line_no, text, count=1):
+        self.rejected[reason] += count
+        if len(self.samples) < SAMPLE_LIMIT:
+            self.samples.append({'line': line_no, 'reason': reason, 'text': text[:200]})
+
+    def as_dict(self):
+        return {
+            'lines': self.lines,
+            'rows': self.rows,
+            'accepted': self.accepted,
+            'rejected': sum(self.rejected.values()),
+            'blank': self.blank,
+            'bytes': self.bytes,
+            'chunks': self.chunks,
+            'elapsed_s': round(self.elapsed_s, 4),
+            'repaired_by_reason': dict(self.repaired),
+            'rejected_by_reason': dict(self.rejected),
+            'invalid_values': dict(self.invalid_values),
+            'samples': self.samples,
+        }
+
+
+def decode(raw, metrics):
+    try:
+        text = raw.decode('utf-8')
+    except UnicodeDecodeError:
+        metrics.repaired['encoding'] += 1
+        try:
+            text = raw.decode('cp1252')
+        except UnicodeDecodeError:
+            text = raw.decode('latin-1')
+    if '\x00' in text:
+        metrics.repaired['nul_bytes'] += 1
+        text = text.replace('\x00', '')
+    return text.rstrip('\r\n')
+
+
+def decode_lines(data, metrics):
+    metrics.bytes += len(data)
+    text = data.decode('utf-8', errors='surrogateescape')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n')
+    lines = text[:-1].split('\n') if text.endswith('\n') else text.split('\n')
+    # find the few lines with non-ASCII or NUL bytes without a Python loop over every line
+    codes = np.frombuffer(data, dtype=np.uint8)
+    suspect = np.flatnonzero((codes >= 0x80) | (codes == 0))
+    if len(suspect):
+        for line in np.unique(np.searchsorted(np.flatnonzero(codes == 10), suspect)):
+            if BAD_TEXT.search(lines[line]):
+                lines[line] = decode(lines[line].encode('utf-8', errors='surrogateescape'), metrics)
+    return lines
+
+
+def split_line(text):
+    return next(csv.reader([text]), [])
+
+
+def repair_quotes(text, width):
+    # an unterminated quote makes the csv module swallow the following lines,
+    # so try dropping the stray quote before giving up on the row
+    last = text.rfind('"')
+    first = text.find('"')
+    for candidate in (text[:last] + text[last + 1:], text[:first] + text[first + 1:], text.replace('"', '')):
+        fields = split_line(candidate)
+        if len(fields) == width:
+            return fields
+    return None
+
+
+def fit_width(fields, width, line_no, text, metrics):
+    if len(fields) > width and not any(field.strip() for field in fields[width:]):
+        metrics.repaired['trailing_fields'] += 1
+        return fields[:width]
+    metrics.reject('extra_fields' if len(fields) > width else 'missing_fields', line_no, text)
+    return None
+
+
+def read_preamble(f, metrics):
+    unit = 1.0
+    line_no = 0
+    for raw in f:
+        line_no += 1
+        metrics.bytes += len(raw)
+        text = decode(raw, metrics).lstrip('\ufeff')
+        fields = [field.strip() for field in split_line(text)]
+        lowered = text.lower()
+        for word, scale in UNITS.items():
+            if word in lowered:
+                unit = scale
+        # the header is the first line with several labels and no numbers
+        if len(fields) > 1 and all(fields) and not any(re.fullmatch(r'[\d.,$-]+', field) for field in fields):
+            return fields, unit, line_no
+    raise ValueError('No header row found')
+
+
+def parse_line(text, line_no, header, metrics):
+    width = len(header)
+    # lines are split one at a time, so an unterminated quote can't swallow the lines after it
+    fields = split_line(text)
+    if len(fields) != width and text.count('"') % 2:
+        fields = repair_quotes(text, width)
+        if fields is None:
+            metrics.reject('unbalanced_quotes', line_no, text)
+            return None
+        metrics.repaired['quotes'] += 1
+    if [field.strip() for field in fields] == header:
+        metrics.reject('repeated_header', line_no, text)
+        return None
+    if len(fields) != width:
+        return fit_width(fields, width, line_no, text, metrics)
+    return fields
+
+
+def split_clean(texts, width):
+    names = [str(i) for i in range(width)]
+    if not texts:
+        return [pa.array([], pa.string()) for _ in names]
+    table = pa_csv.read_csv(
+        io.BytesIO('\n'.join(texts).encode()),
+        read_options=pa_csv.ReadOptions(column_names=names),
+        parse_options=pa_csv.ParseOptions(quote_char=False),
+        convert_options=pa_csv.ConvertOptions(column_types=dict.fromkeys(names, pa.string()),
+                                              strings_can_be_null=False),
+    )
+    return [table.column(i).combine_chunks() for i in range(width)]
+
+
+def parse_rows(texts, first_line, header, metrics):
+    width = len(header)
+    # lines without quotes and with the right number of commas go through Arrow's parser in one call
+    lines = pa.array(texts, pa.string())
+    clean = pc.and_(pc.equal(pc.count_substring(lines, ','), width - 1),
+                    pc.invert(pc.match_substring(lines, '"'))).to_numpy(zero_copy_only=False)
+    columns = split_clean(list(compress(texts, clean)), width)
+    line_nos = first_line + np.flatnonzero(clean)
+    metrics.rows += len(line_nos)
+
+    headers = np.flatnonzero(pc.equal(columns[0], header[0]).to_numpy(zero_copy_only=False))
+    if len(headers):
+        repeated = [i for i in headers if [column[i].as_py().strip() for column in columns] == header]
+        for i in repeated:
+            metrics.reject('repeated_header', int(line_nos[i]), texts[line_nos[i] - first_line])
+        keep = np.ones(len(line_nos), dtype=bool)
+        keep[repeated] = False
+        columns = [column.filter(keep) for column in columns]
+        line_nos = line_nos[keep]
+
+    rows, slow_nos = [], []
+    for i in np.flatnonzero(~clean):
+        text = texts[i]
+        if not text or text.isspace():
+            metrics.blank += 1
+            continue
+        metrics.rows += 1
+        fields = parse_line(text, first_line + int(i), header, metrics)
+        if fields is not None:
+            rows.append(fields)
+            slow_nos.append(first_line + int(i))
+    if rows:
+        columns = [pa.concat_arrays([column, pa.array(values, pa.string())])
+                   for column, values in zip(columns, zip(*rows))]
+        line_nos = np.concatenate([line_nos, slow_nos])
+        order = np.argsort(line_nos, kind='stable')
+        columns = [column.take(order) for column in columns]
+        line_nos = line_nos[order]
+    return columns, line_nos
+
+
+def parse_ints(values, nullable=False):
+    try:
+        numbers, good = pc.cast(values, pa.int64()).to_numpy(), None
+    except pa.ArrowInvalid:
+        good = pc.match_substring_regex(values, INTEGER).to_numpy(zero_copy_only=False)
+        numbers = np.zeros(len(values), dtype=np.int64)
+        numbers[good] = pc.cast(pc.utf8_trim_whitespace(values.filter(good)), pa.int64()).to_numpy()
+    if not nullable:
+        return numbers, None if good is None else ~good
+    # a blank count or death toll is missing, not a broken row; only text that isn't a number is rejected
+    missing = np.zeros(len(values), dtype=bool)
+    if good is not None:
+        missing[~good] = pc.is_in(pc.utf8_lower(pc.utf8_trim_whitespace(values.filter(~good))),
+                                  pa.array(MISSING)).to_numpy(zero_copy_only=False)
+        good = good | missing
+    return pd.arrays.IntegerArray(numbers, missing), None if good is None else ~good
+
+
+def parse_cost_text(values, unit):
+    text = pd.Series(values, dtype=object).str.strip().str.lower()
+    missing = text.isin(MISSING).to_numpy()
+    parts = text.str.extract(COST)
+    number = pd.to_numeric(parts[2].str.replace(',', '', regex=False), errors='coerce').to_numpy(np.float64)
+    # 1.2B or 350M are converted into the unit the file states, e.g. billions of dollars
+    scale = parts[3].fillna('').map(lambda suffix: SCALES[suffix] / unit if SCALES[suffix] else 1.0)
+    negative = ((parts[0] == '(') | (parts[1] == '-')).to_numpy()
+    number = np.where(negative, -number, number) * scale.to_numpy(np.float64)
+    invalid = np.isnan(number) & ~missing
+    return np.where(missing, np.nan, number), int(invalid.sum())
+
+
+def parse_costs(values, unit):
+    try:
+        return pc.cast(values, pa.float64()).to_numpy(), 0
+    except pa.ArrowInvalid:
+        pass
+    # plain numbers stay on the vectorised path; only the leftovers go through the regex
+    plain = pc.match_substring_regex(values, NUMBER).to_numpy(zero_copy_only=False)
+    numbers = np.full(len(values), np.nan)
+    numbers[plain] = pc.cast(pc.utf8_trim_whitespace(values.filter(plain)), pa.float64()).to_numpy()
+    todo = np.flatnonzero(~plain)
+    numbers[todo], invalid = parse_cost_text(values.take(todo).to_numpy(zero_copy_only=False), unit)
+    return numbers, invalid
+
+
+def parse_dates(values):
+    parsed = pc.strptime(values, format=DATE_FORMATS[0], unit='ns', error_is_null=True)
+    dates = parsed.to_numpy(zero_copy_only=False).astype('datetime64[ns]')
+    todo = np.flatnonzero(np.isnat(dates))
+    if not len(todo):
+        return dates, 0
+    text = pd.Series(values.take(todo).to_numpy(zero_copy_only=False), dtype=object).str.strip()
+    missing = text.str.lower().isin(MISSING).to_numpy()
+    found = pd.Series(pd.NaT, index=text.index, dtype='datetime64[ns]')
+    for fmt in DATE_FORMATS:
+        left = found.isna().to_numpy() & ~missing
+        if not left.any():
+            break
+        found[left] = pd.to_datetime(text[left], format=fmt, errors='coerce')
+    dates[todo] = found.to_numpy(dtype='datetime64[ns]')
+    return dates, int((found.isna().to_numpy() & ~missing).sum())
+
+
+def empty_frame(header):
+    dtypes = {'int': np.int64, 'count': 'Int64', 'cost': np.float64, 'date': 'datetime64[ns]', 'text': object}
+    return pd.DataFrame({name: pd.Series(dtype=dtypes[column_kind(name)]) for name in header})
+
+
+def typed_frame(columns, line_nos, texts, first_line, header, unit, metrics):
+    if not len(line_nos):
+        return empty_frame(header)
+    keep = np.ones(len(line_nos), dtype=bool)
+    out = {}
+    for name, values in zip(header, columns):
+        kind = column_kind(name)
+        if kind in ('int', 'count'):
+            out[name], bad = parse_ints(values, nullable=kind == 'count')
+            if bad is not None and bad.any():
+                for i in np.flatnonzero(bad & keep):
+                    metrics.reject('invalid_integer', int(line_nos[i]), texts[line_nos[i] - first_line])
+                keep &= ~bad
+        elif kind == 'cost':
+            out[name], invalid = parse_costs(values, unit)
+            if invalid:
+                metrics.invalid_values[name] += invalid
+        elif kind == 'date':
+            out[name], invalid = parse_dates(values)
+            if invalid:
+                metrics.invalid_values[name] += invalid
+        else:
+            out[name] = pc.utf8_trim_whitespace(values).to_pandas()
+    frame = pd.DataFrame(out)
+    return frame if keep.all() else frame[keep].reset_index(drop=True)
+
+
+def iter_disasters(path, chunk_bytes=CHUNK_BYTES, metrics=None):
+    metrics = metrics if metrics is not None else ParseMetrics()
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        header, unit, line_no = read_preamble(f, metrics)
+        first_line = line_no + 1
+        tail = b''
+        # read fixed-size blocks and cut them at the last newline, so memory doesn't grow with the file
+        for block in iter(lambda: f.read(chunk_bytes), b''):
+            data = tail + block
+            cut = data.rfind(b'\n') + 1
+            data, tail = data[:cut], data[cut:]
+            if data:
+                texts = decode_lines(data, metrics)
+                yield chunk(texts, first_line, header, unit, metrics)
+                first_line += len(texts)
+        if tail:
+            texts = decode_lines(tail, metrics)
+            yield chunk(texts, first_line, header, unit, metrics)
+            first_line += len(texts)
+        metrics.lines = first_line - 1
+    metrics.elapsed_s += time.perf_counter() - start
+
+
+def chunk(texts, first_line, header, unit, metrics):
+    columns, line_nos = parse_rows(texts, first_line, header, metrics)
+    frame = typed_frame(columns, line_nos, texts, first_line, header, unit, metrics)
+    metrics.accepted += len(frame)
+    metrics.chunks += 1
+    return frame
+
+
+def read_disasters(path, chunk_bytes=CHUNK_BYTES):
+    metrics = ParseMetrics()
+    frames = list(iter_disasters(path, chunk_bytes, metrics))
+    if not frames:
+        with open(path, 'rb') as f:
+            df = empty_frame(read_preamble(f, ParseMetrics())[0])
+    elif len(frames) == 1:
+        df = frames[0]
+    else:
+        df = pd.concat(frames, ignore_index=True)
+    df.attrs['parse_metrics'] = metrics.as_dict()
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse a NOAA billion-dollar disasters CSV and report rejected rows.')
+    parser.add_argument('path', nargs='?', default='invidual/disasters.csv')
+    parser.add_argument('--chunk-mb', type=float, default=CHUNK_BYTES / 2**20)
+    args = parser.parse_args()
+    if args.chunk_mb <= 0:
+        parser.error('--chunk-mb must be positive')
+
+    metrics = ParseMetrics()
+    rows = sum(len(frame) for frame in iter_disasters(args.path, int(args.chunk_mb * 2**20), metrics))
+    report = metrics.as_dict()
+    print(f"{rows} rows kept, {report['rejected']} rejected, {report['blank']} blank lines "
+          f"({report['bytes'] / 1e6:.1f} MB in {report['elapsed_s']:.2f}s)")
+    for label in ('repaired_by_reason', 'rejected_by_reason', 'invalid_values'):
+        for reason, count in sorted(report[label].items()):
+            print(f"  {label.split('_')[0]:<9} {reason:<28} {count}")
+    for sample in report['samples'][:5]:
+        print(f"  line {sample['line']} ({sample['reason']}): {sample['text']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import json
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from memo import LRUCache, content_hash
+from tracing import traced, watch
+
+MAX_POINTS_PER_SERIES = 1000
+
+
+@st.cache_resource
+def figure_cache():
+    return watch('figures', LRUCache(maxsize=64))
+
+
+def lttb(x, y, threshold):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    keep = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        if end >= n - 1:
+            avg_x, avg_y = x[-1], y[-1]
+        else:
+            avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        keep.append(a)
+    keep.append(n - 1)
+
+    # LTTB can step over the single highest or lowest point; put them back
+    keep += [int(y.argmin()), int(y.argmax())]
+    return np.unique(keep)
+
+
+def downsample(df, x, y, max_points, group=None):
+    if max_points is None:
+        return df
+    if group is None:
+        if len(df) <= max_points:
+            return df
+        ordered = df.dropna(subset=[x, y]).sort_values(x)
+        return ordered.iloc[lttb(ordered[x], ordered[y], max_points)]
+
+    if df.groupby(group, observed=True).size().max() <= max_points:
+        return df
+    parts = [downsample(part, x, y, max_points) for _, part in df.groupby(group, sort=False, observed=True)]
+    return pd.concat(parts)
+
+
+def spec_key(spec):
+    return json.dumps(spec, sort_keys=True, default=str)
+
+
+def payload(fig):
+    # the JSON the frontend renders, so a cache hit skips both building and serializing the figure
+    import plotly.io
+
+    return {'spec': plotly.io.to_json(fig, validate=False), 'height': fig.layout.height}
+
+
+def cached(key, build):
+    return figure_cache().get(key, lambda: payload(build()))
+
+
+@traced('figure')
+def plot(kind, df, height=None, max_points=MAX_POINTS_PER_SERIES, source=None, **spec):
+    # keyed by where the frame came from (e.g. a dataset_key); hashing the frame is the fallback
+    key = (kind, content_hash(df) if source is None else source, height, max_points, spec_key(spec))
+
+    def build():
+        import plotly.express as px
+
+        frame = df
+        if kind in ('line', 'scatter') and 'x' in spec and 'y' in spec:
+            frame = downsample(df, spec['x'], spec['y'], max_points, group=spec.get('color'))
+        fig = getattr(px, kind)(frame, **spec)
+        if height is not None:
+            fig.update_layout(height=height)
+        return fig
+
+    return cached(key, build)
+
+
+def render(chart, use_container_width=True, key=None):
+    try:
+        return enqueue_spec(chart, use_container_width, key)
+    except (ImportError, AttributeError, TypeError):
+        # a Streamlit release outside the pinned range moved these internals; the public call re-serializes the
+        # figure on every rerun but draws the same chart
+        import plotly.io
+
+        figure = plotly.io.from_json(chart['spec'], skip_invalid=True)
+        return st.plotly_chart(figure, use_container_width=use_container_width, key=key)
+
+
+def enqueue_spec(chart, use_container_width=True, key=None):
+    # st.plotly_chart would validate and serialize the figure again on every rerun; send the cached spec as is.
+    # These are Streamlit internals, so requirements.txt pins the releases they were written against
+    from streamlit.elements.lib.form_utils import current_form_id
+    from streamlit.elements.lib.layout_utils import LayoutConfig
+    from streamlit.elements.lib.utils import compute_and_register_element_id
+    from streamlit.proto.PlotlyChart_pb2 import PlotlyChart
+
+    dg = st._main
+    width = 'stretch' if use_container_width else 700
+    proto = PlotlyChart()
+    proto.theme = 'streamlit'
+    proto.form_id = current_form_id(dg)
+    proto.spec = chart['spec']
+    proto.config = '{}'
+    proto.id = compute_and_register_element_id(
+        'plotly_chart', user_key=key, key_as_main_identity=False, dg=dg, plotly_spec=proto.spec,
+        plotly_config=proto.config, selection_mode=(), is_selection_activated=False, theme='streamlit',
+        width=width, height='content', alt=None)
+    return dg._enqueue('plotly_chart', proto, layout_config=LayoutConfig(width=width, height=chart['height'] or 450))
@@ -0,0 +1,134 @@
+import argparse
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from trends import country_year_matrix, fit_trends
+
+QUANTILES = (5, 25, 50, 75, 95)
+HORIZON = 2100
+# below this many resampled residuals a pool costs more to start than it saves
+PARALLEL_DRAWS = 50_000_000
+
+
+def country_rng(seed, label):
+    # one stream per country, so its paths don't depend on which other countries or workers share the run
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(zlib.crc32(str(label).encode()),)))
+
+
+def bootstrap_paths(years, values, slope, intercept, future, n_sims, rng):
+    present = ~np.isnan(values)
+    x = years[present].astype(np.float64)
+    n = len(x)
+    fitted = intercept + slope * x
+    # residuals shrink by the two fitted parameters; scale them back up to the noise they stand for
+    residuals = (values[present] - fitted) * np.sqrt(n / (n - 2))
+
+    # resample the history to refit the trend (parameter uncertainty) and the future as noise on top of it;
+    # float32 halves the memory traffic of the gather, which is most of the cost
+    draws = residuals.astype(np.float32)[rng.integers(0, n, size=(n_sims, n + len(future)), dtype=np.int32)]
+    x_mean = x.mean()
+    dx = x - x_mean
+    sim_slope = slope + draws[:, :n] @ dx.astype(np.float32) / (dx @ dx)
+    sim_level = intercept + slope * x_mean + draws[:, :n].mean(axis=1)
+    return sim_level[:, None] + sim_slope[:, None] * (future - x_mean) + draws[:, n:]
+
+
+def percentiles(paths, quantiles):
+    # np.percentile's linear interpolation, but one sort for all quantiles instead of a partition per column
+    ranked = np.sort(paths, axis=0)
+    position = np.asarray(quantiles, dtype=np.float64) / 100 * (len(paths) - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, len(paths) - 1)
+    weight = (position - lower)[:, None]
+    return ranked[lower] * (1 - weight) + ranked[upper] * weight
+
+
+def simulate_bands(labels, years, matrix, future, n_sims, seed, quantiles=QUANTILES):
+    fit = fit_trends(years, matrix)
+    bands = np.empty((len(labels), len(quantiles), len(future)))
+    for row, label in enumerate(labels):
+        paths = bootstrap_paths(years, matrix[row], fit['slope'][row], fit['intercept'][row], future, n_sims,
+                                country_rng(seed, label))
+        bands[row] = percentiles(paths, quantiles)
+    return bands
+
+
+def chunks(count, parts):
+    bounds = np.linspace(0, count, parts + 1).astype(int)
+    return [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+
+def run_bands(labels, years, matrix, future, n_sims, seed, quantiles=QUANTILES, workers=None):
+    draws = int((~np.isnan(matrix)).sum() + len(labels) * len(future)) * n_sims
+    workers = min(workers or os.cpu_count() or 1, len(labels))
+    if workers <= 1 or draws < PARALLEL_DRAWS:
+        return simulate_bands(labels, years, matrix, future, n_sims, seed, quantiles)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = chunks(len(labels), workers)
+        results = pool.map(simulate_bands, [labels[part] for part in parts], [years] * len(parts),
+                           [matrix[part] for part in parts], [future] * len(parts), [n_sims] * len(parts),
+                           [seed] * len(parts), [quantiles] * len(parts))
+        return np.concatenate(list(results))
+
+
+def forecast_table(df, value_col, key='ISO3', start=None, end=None, horizon=HORIZON, n_sims=1000, seed=0,
+                   quantiles=QUANTILES, min_points=3, workers=None):
+    labels, years, matrix = country_year_matrix(df, value_col, key=key, start=start, end=end)
+    enough = (~np.isnan(matrix)).sum(axis=1) >= min_points
+    labels, matrix = labels[enough], matrix[enough]
+    columns = [key, 'Country', 'Year'] + [f'p{q}' for q in quantiles]
+    if not len(labels) or horizon <= years[-1]:
+        return pd.DataFrame(columns=columns)
+
+    future = np.arange(years[-1] + 1, horizon + 1)
+    bands = run_bands(labels, years, matrix, future, n_sims, seed, quantiles, workers)
+    names = df.drop_duplicates(key).set_index(key)['Country'].reindex(labels).to_numpy()
+    table = pd.DataFrame({
+        key: np.repeat(labels, len(future)),
+        'Country': np.repeat(names, len(future)),
+        'Year': np.tile(future, len(labels)),
+    })
+    for i, q in enumerate(quantiles):
+        table[f'p{q}'] = bands[:, i].ravel()
+    return table[columns]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bootstrap trend forecasts with percentile bands for every country.')
+    parser.add_argument('metrics', nargs='*', help='metrics to forecast (default: the comparison metrics)')
+    parser.add_argument('--horizon', type=int, default=HORIZON)
+    parser.add_argument('--sims', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--start', type=int, help='first year of the trend fit')
+    parser.add_argument('--workers', type=int, help='processes (default: one per CPU)')
+    parser.add_argument('--out', help='write the bands to this CSV file')
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    from climate_data import COMPARISON_METRICS, get_dataset
+    unknown = [metric for metric in args.metrics if metric not in COMPARISON_METRICS]
+    if unknown:
+        parser.error(f"unknown metric(s): {', '.join(unknown)}; choose from {', '.join(COMPARISON_METRICS)}")
+
+    tables = []
+    for metric in args.metrics or COMPARISON_METRICS:
+        df = get_dataset(COMPARISON_METRICS[metric]).df
+        start = time.perf_counter()
+        table = forecast_table(df, metric, start=args.start, horizon=args.horizon, n_sims=args.sims,
+                               seed=args.seed, workers=args.workers)
+        print(f"{metric}: {table['ISO3'].nunique()} countries x {args.sims} simulations "
+              f"in {time.perf_counter() - start:.2f}s")
+        tables.append(table.assign(Metric=metric))
+    if args.out:
+        pd.concat(tables, ignore_index=True).to_csv(args.out, index=False)
+
+
+if __name__ == '__main__':
+    main()
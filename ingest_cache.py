@@ -0,0 +1,188 @@
+import argparse
+import functools
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from disasters import read_disasters
+from tracing import span
+from workbook import read_workbook
+
+CACHE_DIR = os.environ.get('INGEST_CACHE_DIR', '.ingest_cache')
+CMIP6_PATH = ('data/cmip6-x0.25_timeseries_cdd65,hdd65,tas_timeseries_annual_1950-2014,2015-2100'
+              '_median_historical_ensemble_all_mean.xlsx')
+EMDAT_PATH = 'data/public_emdat_custom_request_2025-08-17_cf186ed7-74bb-4cc4-ae27-dcd164c54e48.xlsx'
+
+SOURCES = {
+    'co2_data': ('data/co2_pcap_cons.csv', {}),
+    'energy_data': ('data/API_EG.USE.PCAP.KG.OE_DS2_en_excel_v2_20374.xls', {'skiprows': 3}),
+    'gdp_data': ('data/API_NY.GDP.PCAP.KD.ZG_DS2_en_excel_v2_122434.xls', {'skiprows': 3}),
+    'us_energy_data': ('data/us_energy.xls', {'skiprows': 3}),
+    # the dashboard only uses emissions from 1960 on, so earlier columns are never parsed
+    'us_co2_data': ('invidual/yearly_co2_emissions_1000_tonnes.xlsx', {'reader': 'gapminder_xlsx', 'min_year': 1960}),
+    'us_temp_data': ('invidual/temperature.csv', {'encoding': 'latin-1', 'skiprows': 4}),
+    'us_disasters_data': ('invidual/disasters.csv', {'reader': 'noaa_disasters'}),
+    'us_energy_per_person': ('invidual/energy_use_per_person.xlsx', {'reader': 'gapminder_xlsx'}),
+    'us_gdp_growth': ('invidual/gdp_per_capita_yearly_growth.xlsx', {'reader': 'gapminder_xlsx'}),
+    'cmip6_cdd65': (CMIP6_PATH, {'sheet_name': 'cdd65_1950-2014'}),
+    'cmip6_hdd65': (CMIP6_PATH, {'sheet_name': 'hdd65_1950-2014'}),
+    'cmip6_tas': (CMIP6_PATH, {'sheet_name': 'tas_1950-2014'}),
+    'emdat_data': (EMDAT_PATH, {'sheet_name': 'EM-DAT Data'}),
+}
+READERS = {
+    'noaa_disasters': read_disasters,
+    'gapminder_xlsx': read_workbook,
+}
+
+
+def read_source(path, reader=None, **kwargs):
+    if reader is not None:
+        return READERS[reader](path, **kwargs)
+    if path.endswith('.csv'):
+        return pd.read_csv(path, **kwargs)
+    return pd.read_excel(path, **kwargs)
+
+
+@functools.lru_cache(maxsize=None)
+def hashed_file(path, mtime_ns, size):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def file_digest(path):
+    # re-hashed only when the file's mtime or size moves, so checking it costs one os.stat call
+    stat = os.stat(path)
+    return hashed_file(path, stat.st_mtime_ns, stat.st_size)
+
+
+def reader_version(reader):
+    return file_digest(sys.modules[READERS[reader].__module__].__file__)
+
+
+def source_fingerprint(path, **kwargs):
+    stat = os.stat(path)
+    parts = [os.path.abspath(path), stat.st_mtime_ns, stat.st_size, kwargs]
+    if kwargs.get('reader') is not None:
+        # a fix to a reader has to re-parse what it read, even though the file itself didn't change
+        parts.append(reader_version(kwargs['reader']))
+    key = json.dumps(parts, sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def cache_prefix(path, sheet_name=None):
+    # sheets of one workbook are cached side by side, so they need their own prefix
+    name = os.path.basename(path) if sheet_name is None else f'{os.path.basename(path)}__{sheet_name}'
+    return os.path.join(CACHE_DIR, name.replace('.', '_').replace(',', '_').replace(' ', '_'))
+
+
+def cache_path(path, **kwargs):
+    return f"{cache_prefix(path, kwargs.get('sheet_name'))}-{source_fingerprint(path, **kwargs)}.arrow"
+
+
+def to_arrow(df):
+    # keep NaN as NaN instead of nulls so float columns can be mapped back without a copy
+    arrays = []
+    for col in df.columns:
+        series = df[col]
+        if series.dtype.kind in 'fiub':
+            arrays.append(pa.array(series.to_numpy(), from_pandas=False))
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            # a dictionary array maps back to a categorical instead of a column of strings
+            arrays.append(pa.array(series, from_pandas=True))
+        else:
+            arrays.append(pa.array(series.astype(object), from_pandas=True))
+    columns = list(df.columns)
+    metadata = {'columns': json.dumps(columns)}
+    if df.attrs:
+        # e.g. the parse metrics of a source, so a cache hit still reports its rejected rows
+        metadata['attrs'] = json.dumps(df.attrs, default=str)
+    return pa.Table.from_arrays(arrays, names=[str(col) for col in columns], metadata=metadata)
+
+
+def from_arrow(table):
+    df = table.to_pandas(split_blocks=True)
+    df.columns = json.loads(table.schema.metadata[b'columns'])
+    if b'attrs' in table.schema.metadata:
+        df.attrs = json.loads(table.schema.metadata[b'attrs'])
+    return df
+
+
+def write_cache(df, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f'{target}.tmp'
+    feather.write_feather(to_arrow(df), tmp, compression='uncompressed')
+    os.replace(tmp, target)
+
+
+def read_cache(target):
+    return from_arrow(feather.read_table(target, memory_map=True))
+
+
+def evict_stale(path, keep, sheet_name=None):
+    for old in glob.glob(f'{glob.escape(cache_prefix(path, sheet_name))}-*.arrow'):
+        if old != keep:
+            os.remove(old)
+
+
+def read_cached(path, **kwargs):
+    target = cache_path(path, **kwargs)
+    if os.path.exists(target):
+        try:
+            return read_cache(target)
+        except (pa.ArrowException, OSError, KeyError, ValueError):
+            pass
+
+    with span(f'parse:{os.path.basename(path)}', 'ingest'):
+        df = read_source(path, **kwargs)
+    try:
+        write_cache(df, target)
+        evict_stale(path, target, kwargs.get('sheet_name'))
+    except (pa.ArrowException, OSError, TypeError, ValueError):
+        pass
+    return df
+
+
+def load_source(name):
+    path, kwargs = SOURCES[name]
+    with span(f'source:{name}', 'ingest'):
+        return read_cached(path, **kwargs)
+
+
+def warm(names=None, force=False):
+    results = []
+    for name in names or SOURCES:
+        path, kwargs = SOURCES[name]
+        target = cache_path(path, **kwargs)
+        if force and os.path.exists(target):
+            os.remove(target)
+        hit = os.path.exists(target)
+        start = time.perf_counter()
+        df = read_cached(path, **kwargs)
+        results.append((name, hit, df.shape, time.perf_counter() - start))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-warm the columnar ingest cache for the dashboard sources.')
+    parser.add_argument('sources', nargs='*', help='sources to warm (default: all)')
+    parser.add_argument('--force', action='store_true', help='re-parse even if a fresh cache entry exists')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.sources if name not in SOURCES]
+    if unknown:
+        parser.error(f"unknown source(s): {', '.join(unknown)}; choose from {', '.join(SOURCES)}")
+
+    for name, hit, shape, elapsed in warm(args.sources, args.force):
+        status = 'hit' if hit else 'built'
+        print(f'{name:<22} {status:<6} {shape[0]:>5} x {shape[1]:<4} {elapsed * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import functools
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+from pandas.util import hash_pandas_object
+
+ORIGINS = {}
+WIDE_COLUMNS = 32
+
+# cached frames and the memory-mapped shared ones are handed out as shallow copies, which is only safe
+# under copy-on-write: always on from pandas 3, opt-in on 2.x, and missing before that, where share deep-copies
+PANDAS_MAJOR = int(pd.__version__.split('.')[0])
+if PANDAS_MAJOR == 2:
+    pd.set_option('mode.copy_on_write', True)
+COPY_ON_WRITE = PANDAS_MAJOR >= 2
+
+
+def content_hash(df):
+    row_hashes = hash_pandas_object(df, index=True).to_numpy()
+    labels = df.columns if isinstance(df, pd.DataFrame) else [df.name]
+    columns = '|'.join(map(str, labels)).encode()
+    return hashlib.sha1(row_hashes.tobytes() + columns).hexdigest()
+
+
+def digest(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+
+
+def remember(value, key):
+    # identity, not attrs: pandas copies attrs onto every derived frame, so they can't vouch for content
+    ident = id(value)
+    ORIGINS[ident] = (weakref.ref(value, lambda _: ORIGINS.pop(ident, None)), key)
+
+
+def argument_key(value):
+    entry = ORIGINS.get(id(value))
+    if entry is not None and entry[0]() is value:
+        return entry[1]
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return content_hash(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(argument_key(item) for item in value)
+    return value
+
+
+def compact(value):
+    # frames read from Arrow keep one block per column, which every shallow copy has to duplicate;
+    # merging a wide one once per process makes each hand-out a few objects instead of hundreds
+    if isinstance(value, pd.DataFrame) and value.shape[1] > WIDE_COLUMNS:
+        return value.copy()
+    return value
+
+
+def share(value, key):
+    # a shallow copy costs one object per column block; copy-on-write keeps callers' edits off the cached value
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        value = value.copy(deep=not COPY_ON_WRITE)
+        remember(value, key)
+    return value
+
+
+def fingerprinted(store, version, key=None):
+    # keyed by where the arguments came from (a source fingerprint or the key of the
+    # cached value they were handed out from) instead of hashing them on every call
+    def wrap(func):
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            if key is not None:
+                parts = key(*args, **kwargs)
+            else:
+                parts = ([argument_key(arg) for arg in args],
+                         sorted((name, argument_key(arg)) for name, arg in kwargs.items()))
+            cache_key = digest(func.__module__, func.__qualname__, version, parts)
+            return share(store().get(cache_key, lambda: compact(func(*args, **kwargs))), cache_key)
+
+        call.clear = lambda: store().clear()
+        return call
+    return wrap
+
+
+class LRUCache:
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, compute):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def lookup(self, key, default=None):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,241 @@
+import argparse
+import functools
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from bundle import ARTIFACT_DIR, Bundle, link_artifact, save_artifact
+from climate_data import DATASETS, DELTAS, PARTITIONS, WIDE_SOURCES, stage_key, transform_version
+from country_index import CountryIndex
+from delta import Changes, diff_wide, summarise
+
+CHANGELOG = 'CHANGELOG.jsonl'
+
+WEB_EXPORTS = [
+    'norway_co2', 'norway_energy', 'norway_gdp', 'us_co2_per_capita', 'us_energy_per_capita_global',
+    'us_gdp_global', 'us_energy_filtered', 'us_co2_filtered', 'us_temperature_clean',
+    'us_co2_clean__Year__CO2_emissions_1000_tonnes__sum',
+    'norway_co2__Year__CO2_per_capita__mean', 'co2_trends',
+]
+
+
+def topological_order(names):
+    order = []
+
+    def visit(name, path):
+        if name in path:
+            raise ValueError(f"Dataset dependency cycle: {' -> '.join(path + (name,))}")
+        if name in order:
+            return
+        for dep in DATASETS[name][0]:
+            visit(dep, path + (name,))
+        order.append(name)
+
+    for name in names:
+        visit(name, ())
+    return order
+
+
+def stage_keys(order, version):
+    keys = {}
+    return {name: stage_key(name, version, keys) for name in order}
+
+
+def code_keys(order, version):
+    # stage_keys without the source fingerprints: equal across bundles when only the data changed
+    keys = {}
+    return {name: stage_key(name, version, keys, sources=False) for name in order}
+
+
+def same_value(a, b):
+    if isinstance(a, (pd.DataFrame, pd.Series, CountryIndex)):
+        return type(a) is type(b) and a.equals(b)
+    return a == b
+
+
+def refresh(name, previous, value, changes):
+    # (value, changes, mode) from the previous bundle's copy, or None to build from scratch
+    requires, _ = DATASETS[name]
+    if name in WIDE_SOURCES:
+        new = value(name)
+        return new, Changes(diff_wide(previous.load(name), new, WIDE_SOURCES[name])), 'diffed'
+    # only stages with a patch depend on nothing but the cells a diff covers
+    if name not in DELTAS or any(dep not in changes for dep in requires):
+        return None
+    upstream = functools.reduce(lambda a, b: a | b, (changes[dep] for dep in requires))
+    if not upstream:
+        return None, upstream, 'unchanged'
+    result, change = DELTAS[name](previous.load(name), upstream, *[value(dep) for dep in requires])
+    return (result, change, 'patched') if change else (None, change, 'unchanged')
+
+
+def write_changelog(root, staging, previous, version, diffs, artifacts):
+    cells = pd.concat([frame.assign(Source=name) for name, frame in diffs.items()], ignore_index=True)
+    entry = save_artifact(cells, staging, 'changes')
+    summary = {name: summarise(frame) for name, frame in diffs.items()}
+    stages = {}
+    for name, artifact in artifacts.items():
+        stages.setdefault(artifact.get('refresh', 'reused' if artifact.get('reused') else 'built'), []).append(name)
+    with open(os.path.join(root, CHANGELOG), 'a') as f:
+        f.write(json.dumps({
+            'version': version,
+            'previous': previous.version,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'sources': summary,
+            'stages': stages,
+        }) + '\n')
+    return dict(entry, summary=summary)
+
+
+def build(root=ARTIFACT_DIR, force=False, names=None, log=print):
+    order = topological_order(names or list(DATASETS))
+    keys = stage_keys(order, transform_version())
+    codes = code_keys(order, transform_version())
+    version = hashlib.sha1(''.join(keys[name] for name in order).encode()).hexdigest()[:12]
+
+    previous = None if force else Bundle.latest(root)
+    if previous is not None and previous.version == version:
+        log(f'bundle {version} is up to date')
+        return previous
+
+    target = os.path.join(root, version)
+    staging = f'{target}.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    values = {}
+    artifacts = {}
+    # what changed in each stage since the previous bundle, where that is known cell by cell
+    changes = {}
+    diffs = {}
+
+    def value(name):
+        if name not in values:
+            entry = artifacts.get(name)
+            if entry is not None and entry.get('reused'):
+                values[name] = previous.load(name)
+            else:
+                requires, build_fn = DATASETS[name]
+                values[name] = build_fn(*[value(dep) for dep in requires])
+        return values[name]
+
+    for name in order:
+        start = time.perf_counter()
+        old = previous.artifacts.get(name) if previous is not None else None
+        if old is not None and old['key'] == keys[name]:
+            link_artifact(old, previous.path, staging)
+            artifacts[name] = dict(old, code=codes[name], reused=True)
+            changes[name] = Changes()
+            log(f'{name:<55} reused')
+            continue
+
+        requires = DATASETS[name][0]
+        known = bool(requires) and all(dep in changes for dep in requires)
+        refreshed = None
+        if old is not None and old.get('code') == codes[name]:
+            try:
+                refreshed = refresh(name, previous, value, changes)
+            except (KeyError, ValueError, TypeError, pd.errors.InvalidIndexError) as exc:
+                log(f'{name:<55} delta failed ({exc}); building from scratch')
+        if refreshed is not None and refreshed[2] == 'unchanged':
+            link_artifact(old, previous.path, staging)
+            artifacts[name] = dict(old, key=keys[name], refresh='unchanged', reused=True,
+                                   stage_ms=round((time.perf_counter() - start) * 1000, 1))
+            changes[name] = refreshed[1]
+            log(f'{name:<55} unchanged')
+            continue
+
+        if refreshed is not None:
+            result, changes[name], mode = refreshed
+            values[name] = result
+            if mode == 'diffed':
+                diffs[name] = changes[name].cells
+        else:
+            result, mode = value(name), 'built'
+            if known and old is not None and same_value(result, previous.load(name)):
+                changes[name] = Changes()
+        column = PARTITIONS.get(name)
+        # a patched stage only rewrites the parts its changed cells fall in
+        reuse = refreshed is not None and column in changes[name].cells
+        try:
+            entry = save_artifact(result, staging, name, column, (previous.path, old) if reuse else None,
+                                  set(changes[name].cells[column].tolist()) if reuse else ())
+        except TypeError:
+            if known:
+                # not stored (e.g. the country tensor), so its changes are its inputs'
+                changes[name] = functools.reduce(lambda a, b: a | b, (changes[dep] for dep in requires))
+            log(f'{name:<55} rebuilt on load ({type(result).__name__})')
+            continue
+        artifacts[name] = dict(entry, key=keys[name], code=codes[name],
+                               stage_ms=round((time.perf_counter() - start) * 1000, 1))
+        if mode != 'built':
+            artifacts[name]['refresh'] = mode
+        detail = f' ({len(changes[name])} cells)' if mode != 'built' else ''
+        log(f'{name:<55} {mode:<8} {artifacts[name]["stage_ms"]:8.1f} ms{detail}')
+
+    manifest = {
+        'version': version,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'artifacts': {name: {k: v for k, v in entry.items() if k != 'reused'} for name, entry in artifacts.items()},
+    }
+    if diffs:
+        manifest['changes'] = write_changelog(root, staging, previous, version, diffs, artifacts)
+    with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+    with open(os.path.join(root, 'LATEST.tmp'), 'w') as f:
+        f.write(version)
+    os.replace(os.path.join(root, 'LATEST.tmp'), os.path.join(root, 'LATEST'))
+    log(f'bundle {version} written to {target}')
+    return Bundle(target)
+
+
+def export_web(bundle, directory):
+    os.makedirs(directory, exist_ok=True)
+    exported = {}
+    for name in WEB_EXPORTS:
+        if name not in bundle:
+            continue
+        value = bundle.load(name)
+        if isinstance(value, pd.Series):
+            value = value.reset_index()
+        elif not isinstance(value.index, pd.RangeIndex):
+            value = value.reset_index()
+        value = value.drop(columns=['ISO3'], errors='ignore')
+        filename = f'{name}.json'
+        value.to_json(os.path.join(directory, filename), orient='records')
+        exported[name] = filename
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump({'version': bundle.version, 'files': exported}, f, indent=2, sort_keys=True)
+
+
+def prune(root, keep):
+    bundles = sorted((entry for entry in os.scandir(root) if entry.is_dir() and not entry.name.endswith('.tmp')),
+                     key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in bundles[keep:]:
+        shutil.rmtree(entry.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the versioned dataset bundle the dashboard reads.')
+    parser.add_argument('--out', default=ARTIFACT_DIR, help=f'artifact root (default: {ARTIFACT_DIR})')
+    parser.add_argument('--force', action='store_true', help='rebuild every stage')
+    parser.add_argument('--web', metavar='DIR', help='also export JSON series for the React app, e.g. '
+                                                       'climate-analysis-app/public/data/bundle')
+    parser.add_argument('--keep', type=int, default=3, help='number of bundles to keep')
+    args = parser.parse_args()
+
+    bundle = build(args.out, force=args.force)
+    if args.web:
+        export_web(bundle, args.web)
+    prune(args.out, args.keep)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+
+def year_columns(df, exclude=()):
+    return [col for col in df.columns if col not in exclude and str(col).isdigit()]
+
+
+def numeric_block(df, columns, dtype=np.float32):
+    values = np.empty((len(df), len(columns)), dtype=dtype)
+    for i, col in enumerate(columns):
+        series = df[col]
+        if series.dtype.kind not in 'fiub':
+            series = pd.to_numeric(series, errors='coerce')
+        values[:, i] = series.to_numpy(dtype=dtype, na_value=np.nan)
+    return values
+
+
+def wide_matrix(df, id_col, countries=None, min_year=None, dtype=np.float32):
+    ids = df[id_col]
+    keep = ids.notna().to_numpy()
+    if countries is not None:
+        keep = keep & ids.isin(countries).to_numpy()
+    rows = df[keep] if not keep.all() else df
+
+    columns = year_columns(rows, exclude=(id_col,))
+    years = np.array([int(str(col)) for col in columns], dtype=np.int16)
+    if min_year is not None:
+        columns = [col for col, year in zip(columns, years) if year >= min_year]
+        years = years[years >= min_year]
+
+    return rows[id_col].to_numpy(dtype=object), years, numeric_block(rows, columns, dtype)
+
+
+def matrix_to_long(ids, years, values, value_name, id_name='Country'):
+    # iterate year-major so row order matches DataFrame.melt
+    year_idx, id_idx = np.nonzero(~np.isnan(values.T))
+    return pd.DataFrame({
+        id_name: ids[id_idx],
+        'Year': years[year_idx],
+        value_name: values[id_idx, year_idx],
+    })
+
+
+def wide_to_long(df, id_col, value_name, countries=None, min_year=None, dtype=np.float32):
+    ids, years, values = wide_matrix(df, id_col, countries=countries, min_year=min_year, dtype=dtype)
+    return matrix_to_long(ids, years, values, value_name)
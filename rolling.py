@@ -0,0 +1,94 @@
+import numpy as np
+
+
+def prefix_sums(years, values):
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    # measure x from the first year so the sums of squares stay small
+    x = np.broadcast_to(np.asarray(years, dtype=np.float64) - years[0], values.shape)
+    x = np.where(present, x, 0.0)
+    y = np.where(present, values, 0.0)
+
+    change = np.full(values.shape, np.nan)
+    change[..., 1:] = values[..., 1:] - values[..., :-1]
+    changed = ~np.isnan(change)
+    d = np.where(changed, change, 0.0)
+
+    terms = {'n': present, 'x': x, 'y': y, 'xx': x * x, 'xy': x * y, 'yy': y * y, 'nd': changed, 'd': d, 'dd': d * d}
+    pad = [(0, 0)] * (values.ndim - 1) + [(1, 0)]
+    return {name: np.pad(np.cumsum(term, axis=-1, dtype=np.float64), pad) for name, term in terms.items()}
+
+
+def first_valid_argmax(score):
+    filled = np.where(np.isnan(score), -np.inf, score)
+    best = filled.argmax(axis=-1)
+    found = np.isfinite(np.take_along_axis(filled, best[..., None], axis=-1)[..., 0])
+    return best, found
+
+
+class RollingWindows:
+    def __init__(self, years, values):
+        self.years = np.asarray(years)
+        self.prefix = prefix_sums(self.years, values)
+
+    def sums(self, start, stop):
+        start = np.clip(start, 0, len(self.years))
+        stop = np.clip(stop, 0, len(self.years))
+        sums = {name: cum[..., stop] - cum[..., start] for name, cum in self.prefix.items()}
+        # a change belongs to a window only if the year before it is inside too
+        change_start = np.minimum(start + 1, stop)
+        for name in ('nd', 'd', 'dd'):
+            sums[name] = self.prefix[name][..., stop] - self.prefix[name][..., change_start]
+        return sums
+
+    def moments(self, start, stop, min_periods):
+        s = self.sums(start, stop)
+        n, nd = s['n'], s['nd']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = s['y'] / n
+            sxx = s['xx'] - s['x'] * s['x'] / n
+            sxy = s['xy'] - s['x'] * s['y'] / n
+            slope = sxy / sxx
+            change_mean = s['d'] / nd
+            volatility = np.sqrt(np.maximum(s['dd'] / nd - change_mean ** 2, 0.0))
+        enough = n >= min_periods
+        return {
+            'mean': np.where(enough, mean, np.nan),
+            'slope': np.where(enough & (sxx > 0), slope, np.nan),
+            'volatility': np.where(enough & (nd >= 2), volatility, np.nan),
+            'n': n,
+        }
+
+    def min_periods(self, window, min_periods):
+        return max(2, (window + 1) // 2) if min_periods is None else min_periods
+
+    def stats(self, window, min_periods=None):
+        stop = np.arange(1, len(self.years) + 1)
+        return self.moments(stop - window, stop, self.min_periods(window, min_periods))
+
+    def centered(self, window, min_periods=None):
+        start = np.arange(len(self.years)) - window // 2
+        return self.moments(start, start + window, self.min_periods(window, min_periods))
+
+    def breaks(self, window, min_periods=None):
+        min_periods = self.min_periods(window, min_periods)
+        split = np.arange(len(self.years))
+        before = self.moments(split - window, split, min_periods)['slope']
+        after = self.moments(split, split + window, min_periods)['slope']
+        best, found = first_valid_argmax(np.abs(after - before))
+        pick = lambda values: np.take_along_axis(values, best[..., None], axis=-1)[..., 0]
+        return {
+            'year': np.where(found, self.years[best], -1),
+            'slope_before': np.where(found, pick(before), np.nan),
+            'slope_after': np.where(found, pick(after), np.nan),
+            'found': found,
+        }
+
+    def peaks(self, window, min_periods=None):
+        smoothed = self.centered(window, min_periods)['mean']
+        best, found = first_valid_argmax(smoothed)
+        return {
+            'year': np.where(found, self.years[best], -1),
+            'value': np.where(found, np.take_along_axis(smoothed, best[..., None], axis=-1)[..., 0], np.nan),
+            'found': found,
+        }
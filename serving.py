@@ -0,0 +1,314 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from memo import LRUCache
+
+MODEL_DIR = os.environ.get('CLIMATE_MODEL_DIR', os.path.dirname(os.path.abspath(__file__)))
+FEATURES = ['Energy_use_per_capita', 'GDP_growth', 'Year']
+logger = logging.getLogger('climate.serving')
+
+
+def load_compact(directory, name):
+    import compact_models
+
+    path = os.path.join(directory, compact_models.COMPACT_DIR, f'{name}.npz')
+    if os.environ.get('CLIMATE_COMPACT_MODELS', '').lower() in ('off', '0', 'false') or not os.path.exists(path):
+        return None
+    return compact_models.load(path).predict
+
+
+def load_random_forest(directory):
+    compact = load_compact(directory, 'random_forest')
+    if compact is not None:
+        return compact
+
+    import joblib
+    model = joblib.load(os.path.join(directory, 'random_forest_model.pkl'))
+    model.set_params(n_jobs=1)
+    return model.predict
+
+
+def load_cnn(directory):
+    compact = load_compact(directory, 'cnn')
+    if compact is not None:
+        return compact
+
+    import joblib
+    from tensorflow.keras.models import load_model
+
+    scaler = joblib.load(os.path.join(directory, 'cnn_scaler.pkl'))
+    model = load_model(os.path.join(directory, 'cnn_model.h5'), compile=False)
+
+    def predict(X):
+        # the CNN was trained on the scaled year alone, shaped (n, 1, 1)
+        years = scaler.transform(X[:, 2:3]).reshape(-1, 1, 1)
+        return np.asarray(model(years, training=False)).ravel()
+
+    return predict
+
+
+MODELS = {
+    'random_forest': load_random_forest,
+    'cnn': load_cnn,
+}
+
+
+class ModelRegistry:
+    def __init__(self, directory=MODEL_DIR, loaders=MODELS):
+        self.directory = directory
+        self.loaders = loaders
+        self.models = {}
+        self.lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self.loaders
+
+    def names(self):
+        return list(self.loaders)
+
+    def loaded(self):
+        return list(self.models)
+
+    def get(self, name):
+        if name not in self.loaders:
+            raise KeyError(f'Unknown model: {name}')
+        model = self.models.get(name)
+        if model is None:
+            with self.lock:
+                if name not in self.models:
+                    self.models[name] = self.loaders[name](self.directory)
+                model = self.models[name]
+        return model
+
+
+class MicroBatcher:
+    def __init__(self, predict, max_batch=256, max_wait_ms=2.0):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.rows = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, rows):
+        future = Future()
+        self.queue.put((rows, future))
+        return future
+
+    def collect(self):
+        pending = [self.queue.get()]
+        size = len(pending[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    def run(self):
+        while True:
+            pending = self.collect()
+            batch = np.concatenate([rows for rows, _ in pending])
+            try:
+                out = np.asarray(self.predict(batch), dtype=np.float64)
+            except Exception as exc:
+                if len(pending) == 1:
+                    pending[0][1].set_exception(exc)
+                    continue
+                # one bad request mustn't fail the others batched with it, so each is retried on its own
+                for rows, future in pending:
+                    try:
+                        future.set_result(np.asarray(self.predict(rows), dtype=np.float64))
+                    except Exception as error:
+                        future.set_exception(error)
+                continue
+
+            self.batches += 1
+            self.rows += len(batch)
+            offset = 0
+            for rows, future in pending:
+                future.set_result(out[offset:offset + len(rows)])
+                offset += len(rows)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch': round(self.rows / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+class PredictionService:
+    def __init__(self, registry=None, max_batch=256, max_wait_ms=2.0, cache_size=4096):
+        self.registry = registry or ModelRegistry()
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.cache = LRUCache(maxsize=cache_size) if cache_size else None
+        self.batchers = {}
+        self.lock = threading.Lock()
+
+    def batcher(self, name):
+        if name not in self.registry:
+            raise KeyError(f'Unknown model: {name}')
+        batcher = self.batchers.get(name)
+        if batcher is None:
+            with self.lock:
+                if name not in self.batchers:
+                    self.batchers[name] = MicroBatcher(lambda X: self.registry.get(name)(X),
+                                                       self.max_batch, self.max_wait_ms)
+                batcher = self.batchers[name]
+        return batcher
+
+    def predict(self, name, rows, timeout=30):
+        rows = np.asarray(rows, dtype=np.float64)
+        if rows.ndim == 1:
+            rows = rows[None, :]
+        if rows.ndim != 2 or rows.shape[1] != len(FEATURES):
+            raise ValueError(f'Expected rows of {len(FEATURES)} features: {", ".join(FEATURES)}')
+        if not np.isfinite(rows).all():
+            raise ValueError('Features must be finite numbers, not NaN or infinity')
+        batcher = self.batcher(name)
+
+        if self.cache is None:
+            return batcher.submit(rows).result(timeout)
+
+        keys = [(name,) + row for row in map(tuple, rows.tolist())]
+        out = np.array([self.cache.lookup(key, np.nan) for key in keys])
+        missing = np.flatnonzero(np.isnan(out))
+        if len(missing):
+            out[missing] = batcher.submit(rows[missing]).result(timeout)
+            for i in missing:
+                self.cache.put(keys[i], out[i])
+        return out
+
+    def stats(self):
+        return {
+            'loaded': self.registry.loaded(),
+            'batchers': {name: batcher.stats() for name, batcher in self.batchers.items()},
+            'cache': self.cache.stats() if self.cache is not None else None,
+        }
+
+
+def parse_instances(payload):
+    instances = payload.get('instances') if isinstance(payload, dict) else payload
+    if instances is None:
+        instances = [payload]
+    rows = []
+    for row in instances:
+        if isinstance(row, dict):
+            missing = [name for name in FEATURES if name not in row]
+            if missing:
+                raise ValueError(f'Missing features: {", ".join(missing)}')
+            row = [row[name] for name in FEATURES]
+        rows.append(row)
+    return rows
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def send_json(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/models':
+                self.send_json(200, {'models': service.registry.names(), 'features': FEATURES})
+            elif self.path == '/stats':
+                self.send_json(200, service.stats())
+            elif self.path == '/health':
+                self.send_json(200, {'status': 'ok'})
+            else:
+                self.send_json(404, {'error': f'Unknown path: {self.path}'})
+
+        def do_POST(self):
+            prefix = '/predict/'
+            if not self.path.startswith(prefix):
+                self.send_json(404, {'error': f'Unknown path: {self.path}'})
+                return
+            name = self.path[len(prefix):]
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                predictions = service.predict(name, parse_instances(payload))
+            except KeyError as exc:
+                self.send_json(404, {'error': str(exc).strip("'")})
+            except (ValueError, TypeError) as exc:
+                self.send_json(400, {'error': str(exc)})
+            except TimeoutError:
+                self.send_json(503, {'error': f"Model '{name}' did not answer in time; try again"})
+            except Exception as exc:
+                # a model that fails to load or predict must still get the client a response
+                logger.exception('prediction with %r failed', name)
+                self.send_json(500, {'error': f'{type(exc).__name__}: {exc}'})
+            else:
+                self.send_json(200, {'model': name, 'predictions': predictions.tolist()})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # the default backlog of 5 drops connections under concurrent clients
+    request_queue_size = 128
+
+
+def serve(host='127.0.0.1', port=8600, service=None, preload=()):
+    service = service or PredictionService()
+    for name in preload:
+        service.registry.get(name)
+    return PredictionServer((host, port), make_handler(service))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve batched predictions from the trained models.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--cache-size', type=int, default=4096, help='0 disables the response cache')
+    parser.add_argument('--preload', nargs='*', default=[], help='models to load before accepting requests')
+    args = parser.parse_args()
+
+    for name in args.preload:
+        if name not in MODELS:
+            parser.error(f"unknown model '{name}' (choose from {', '.join(MODELS)})")
+
+    service = PredictionService(max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+                                cache_size=args.cache_size)
+    server = serve(args.host, args.port, service, args.preload)
+    print(f'Serving {", ".join(MODELS)} on http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+
+from bundle import load_artifact, save_artifact
+
+DEFAULT_DIR = os.path.join('/dev/shm', 'climate-frames') if os.path.isdir('/dev/shm') else ''
+SHARED_DIR = os.environ.get('CLIMATE_SHARED_DIR', DEFAULT_DIR)
+ENABLED = os.environ.get('CLIMATE_SHARED', 'on').lower() not in ('0', 'off', 'false') and bool(SHARED_DIR)
+
+
+def entry_path(root, name, key):
+    return os.path.join(root, f'{name}-{key}.json')
+
+
+def shareable(value):
+    # a Series without a name would come back named 'value'
+    return isinstance(value, pd.DataFrame) or (isinstance(value, pd.Series) and value.name is not None)
+
+
+def lookup(name, key, root=SHARED_DIR):
+    try:
+        with open(entry_path(root, name, key)) as f:
+            return load_artifact(root, json.load(f))
+    except (OSError, ValueError, KeyError, pa.ArrowException):
+        return None
+
+
+def evict_stale(name, keep, root=SHARED_DIR):
+    # processes that still map an evicted file keep their pages until they let go of it
+    for old in glob.glob(os.path.join(glob.escape(root), f'{glob.escape(name)}-*')):
+        if not os.path.basename(old).startswith(f'{name}-{keep}.'):
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                pass
+
+
+def publish(value, name, key, root=SHARED_DIR):
+    os.makedirs(root, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=root, prefix='.staging-')
+    try:
+        entry = save_artifact(value, staging, f'{name}-{key}')
+        os.replace(os.path.join(staging, entry['file']), os.path.join(root, entry['file']))
+        with open(os.path.join(staging, 'entry.json'), 'w') as f:
+            json.dump(entry, f)
+        # the entry is renamed in last, so a process that can see it can map a complete file
+        os.replace(os.path.join(staging, 'entry.json'), entry_path(root, name, key))
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    evict_stale(name, key, root)
+
+
+def get(name, key, compute, root=SHARED_DIR):
+    if not ENABLED:
+        return compute()
+    value = lookup(name, key, root)
+    if value is not None:
+        return value
+
+    value = compute()
+    if not shareable(value):
+        return value
+    try:
+        publish(value, name, key, root)
+    except (OSError, TypeError, ValueError, pa.ArrowException):
+        return value
+    # hand back the mapped copy so the heap one can be freed
+    mapped = lookup(name, key, root)
+    return value if mapped is None else mapped
+
+
+def entries(root=SHARED_DIR):
+    rows = []
+    paths = glob.glob(os.path.join(glob.escape(root), '*.json')) if root else []
+    for path in sorted(paths):
+        with open(path) as f:
+            entry = json.load(f)
+        data = os.path.join(root, entry['file'])
+        rows.append({
+            'entry': os.path.basename(path)[:-len('.json')],
+            'kind': entry['kind'],
+            'mb': round(os.path.getsize(data) / 2**20, 2) if os.path.exists(data) else None,
+            'modified': pd.Timestamp(os.path.getmtime(path), unit='s').floor('s'),
+        })
+    return pd.DataFrame(rows, columns=['entry', 'kind', 'mb', 'modified'])
+
+
+def clear(root=SHARED_DIR):
+    if root and os.path.isdir(root):
+        shutil.rmtree(root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List or clear the host-wide memory-mapped dataset store.')
+    parser.add_argument('--dir', default=SHARED_DIR)
+    parser.add_argument('--clear', action='store_true', help='remove every entry (keys cover source data and transform code, so this only frees memory early)')
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error('no shared directory: /dev/shm is missing, set CLIMATE_SHARED_DIR or pass --dir')
+
+    if args.clear:
+        clear(args.dir)
+        print(f'cleared {args.dir}')
+        return
+    table = entries(args.dir)
+    print(table.to_string(index=False) if len(table) else f'no entries in {args.dir}')
+    print(f"{len(table)} entries, {table['mb'].sum():.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,12 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy import stats
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from climate_data import (COMPARISON_METRICS, aggregate, dataset_key, get_forecast, get_trends, rolling_series,
+                          rolling_summary, section_data, uses)
+from comparison import ComparisonSet
+from figures import cached, plot, render
+from tracing import RECENT, trace, traced
+from trends import fit_series
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -21,123 +21,13 @@ st.title("Climate Change Analysis: Comparative Study")
 st.markdown("**Team Members:** Abhijith Varma Mudunuri & Niaz Namdar")
 st.markdown("---")
 
-@st.cache_data
-def load_data():
-    co2_data = pd.read_csv('data/co2_pcap_cons.csv')
-    
-    energy_data = pd.read_excel('data/API_EG.USE.PCAP.KG.OE_DS2_en_excel_v2_20374.xls', skiprows=3)
-    
-    gdp_data = pd.read_excel('data/API_NY.GDP.PCAP.KD.ZG_DS2_en_excel_v2_122434.xls', skiprows=3)
-    
-    us_energy_data = pd.read_excel('data/us_energy.xls', skiprows=3)
-    
-    us_co2_data = pd.read_excel('invidual/yearly_co2_emissions_1000_tonnes.xlsx')
-    
-    us_temp_data = pd.read_csv('invidual/temperature.csv', encoding='latin-1')
-    
-    us_disasters_data = pd.read_csv('invidual/disasters.csv', encoding='latin-1', on_bad_lines='skip')
-    
-    us_energy_per_person = pd.read_excel('invidual/energy_use_per_person.xlsx')
-    
-    us_gdp_growth = pd.read_excel('invidual/gdp_per_capita_yearly_growth.xlsx')
-    
-    return (co2_data, energy_data, gdp_data, us_energy_data, 
-            us_co2_data, us_temp_data, us_disasters_data, 
-            us_energy_per_person, us_gdp_growth)
-
-@st.cache_data
-def clean_co2_data(df):
-    df_clean = df.copy()
-    
-    if 'country' not in df_clean.columns:
-        if df_clean.index.name == 'country':
-            df_clean = df_clean.reset_index()
-        elif 'Country' in df_clean.columns:
-            df_clean = df_clean.rename(columns={'Country': 'country'})
-        else:
-            df_clean.columns = ['country'] + list(df_clean.columns[1:])
-    
-    year_columns = [col for col in df_clean.columns if col != 'country' and str(col).isdigit()]
-    
-    df_clean = df_clean.melt(id_vars=['country'], value_vars=year_columns, 
-                           var_name='Year', value_name='CO2_per_capita')
-    
-    df_clean['Year'] = pd.to_numeric(df_clean['Year'])
-    df_clean['CO2_per_capita'] = pd.to_numeric(df_clean['CO2_per_capita'], errors='coerce')
-    
-    df_clean = df_clean.rename(columns={'country': 'Country'})
-    
-    return df_clean.dropna()
-
-@st.cache_data
-def clean_worldbank_data(df, value_name):
-    df_clean = df.copy()
-    
-    cols_to_drop = ['Country Code', 'Indicator Name', 'Indicator Code', 'Unnamed: 67']
-    for col in cols_to_drop:
-        if col in df_clean.columns:
-            df_clean = df_clean.drop(col, axis=1)
-    
-    df_clean = df_clean.melt(id_vars=['Country Name'], var_name='Year', value_name=value_name)
-    
-    df_clean['Year'] = pd.to_numeric(df_clean['Year'], errors='coerce')
-    df_clean[value_name] = pd.to_numeric(df_clean[value_name], errors='coerce')
-    df_clean = df_clean.rename(columns={'Country Name': 'Country'})
-    
-    return df_clean.dropna()
+METRIC_LABELS = {
+    'CO2_per_capita': 'CO2 per Capita (tons)',
+    'Energy_use_per_capita': 'Energy Use per Capita (kg oil eq.)',
+    'GDP_growth': 'GDP Growth (%)'
+}
 
-@st.cache_data
-def clean_us_co2_data(df):
-    df_clean = df.copy()
-    
-    if df_clean.index.name == 'country' or 'country' not in df_clean.columns:
-        df_clean = df_clean.reset_index()
-        if df_clean.columns[0] == 'index':
-            df_clean = df_clean.rename(columns={'index': 'country'})
-    
-    df_clean = pd.melt(df_clean, id_vars=['country'], var_name='Year', value_name='CO2_emissions_1000_tonnes')
-    df_clean['Year'] = pd.to_numeric(df_clean['Year'], errors='coerce')
-    df_clean = df_clean.dropna(subset=['Year', 'CO2_emissions_1000_tonnes'])
-    df_clean = df_clean[df_clean['Year'] >= 1960]
-    df_clean = df_clean.rename(columns={'country': 'Country'})
-    
-    return df_clean
-
-@st.cache_data
-def prepare_comparison_data():
-    co2_data, energy_data, gdp_data, us_energy_data, us_co2_data, us_temp_data, us_disasters_data, us_energy_per_person, us_gdp_growth = load_data()
-    
-    co2_clean = clean_co2_data(co2_data)
-    energy_clean = clean_worldbank_data(energy_data, 'Energy_use_per_capita')
-    gdp_clean = clean_worldbank_data(gdp_data, 'GDP_growth')
-    us_energy_clean = clean_worldbank_data(us_energy_data, 'US_Energy_use_per_capita')
-    us_co2_clean = clean_us_co2_data(us_co2_data)
-    
-    norway_co2 = co2_clean[co2_clean['Country'].str.contains('Norway', case=False, na=False)]
-    us_co2_per_capita = co2_clean[co2_clean['Country'].str.contains('United States', case=False, na=False)]
-    
-    norway_energy = energy_clean[energy_clean['Country'].str.contains('Norway', case=False, na=False)]
-    us_energy_per_capita_global = energy_clean[energy_clean['Country'].str.contains('United States', case=False, na=False)]
-    
-    norway_gdp = gdp_clean[gdp_clean['Country'].str.contains('Norway', case=False, na=False)]
-    us_gdp_global = gdp_clean[gdp_clean['Country'].str.contains('United States', case=False, na=False)]
-    
-    us_energy_filtered = us_energy_clean[us_energy_clean['Country'].str.contains('United States', case=False, na=False)]
-    
-    return {
-        'norway_co2': norway_co2,
-        'us_co2_per_capita': us_co2_per_capita,
-        'norway_energy': norway_energy,
-        'us_energy_per_capita_global': us_energy_per_capita_global,
-        'norway_gdp': norway_gdp,
-        'us_gdp_global': us_gdp_global,
-        'us_energy_filtered': us_energy_filtered,
-        'us_co2_clean': us_co2_clean,
-        'us_temp_data': us_temp_data,
-        'us_disasters_data': us_disasters_data,
-        'us_energy_per_person': us_energy_per_person,
-        'us_gdp_growth': us_gdp_growth
-    }
+plotly_chart = traced('render', 'plotly_chart')(render)
 
 def show_navigation_outline():
     st.sidebar.header("Project Outline")
@@ -163,46 +53,76 @@ def show_navigation_outline():
     st.sidebar.markdown("**5. Statistical Analysis**")
     st.sidebar.markdown("   - Descriptive Stats")
     st.sidebar.markdown("   - Trend Analysis")
+    st.sidebar.markdown("   - Trend Rankings")
     
     st.sidebar.markdown("**6. Interactive Charts**")
     st.sidebar.markdown("   - Dynamic Comparisons")
+    st.sidebar.markdown("   - Country Comparison")
     st.sidebar.markdown("   - Correlation Analysis")
+    st.sidebar.markdown("   - Rolling Trends & Breaks")
+    st.sidebar.markdown("   - Forecasts to 2100")
+    
+    st.sidebar.checkbox("Show performance trace", key='show_trace')
 
 def main():
     show_navigation_outline()
     
-    data = prepare_comparison_data()
-    
     st.markdown("---")
     
     st.header("1. Project Overview")
-    show_overview(data)
+    show_overview(section_data(show_overview))
     
     st.markdown("---")
     
     st.header("2. Norway Analysis")
-    show_norway_analysis(data)
+    show_norway_analysis(section_data(show_norway_analysis))
     
     st.markdown("---")
     
     st.header("3. US Analysis")
-    show_us_analysis(data)
+    show_us_analysis(section_data(show_us_analysis))
     
     st.markdown("---")
     
     st.header("4. Comparative Analysis")
-    show_comparative_analysis(data)
+    show_comparative_analysis(section_data(show_comparative_analysis))
     
     st.markdown("---")
     
     st.header("5. Statistical Analysis")
-    show_statistical_analysis(data)
+    show_statistical_analysis(section_data(show_statistical_analysis))
     
     st.markdown("---")
     
     st.header("6. Interactive Charts")
-    show_interactive_charts(data)
+    show_interactive_charts(section_data(show_interactive_charts))
 
+def show_ingest_report(df):
+    metrics = df.attrs.get('parse_metrics')
+    if not metrics:
+        return
+    
+    if metrics['rejected']:
+        st.warning(f"NOAA disasters: {metrics['accepted']} rows loaded, {metrics['rejected']} rejected")
+    else:
+        st.success(f"NOAA disasters: {metrics['accepted']} rows loaded, none rejected")
+    
+    with st.expander("NOAA disasters ingest report"):
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Rows Loaded", metrics['accepted'])
+        col2.metric("Rows Repaired", sum(metrics['repaired_by_reason'].values()))
+        col3.metric("Rows Rejected", metrics['rejected'])
+        
+        reasons = [("Rejected", reason, count) for reason, count in metrics['rejected_by_reason'].items()]
+        reasons += [("Repaired", reason, count) for reason, count in metrics['repaired_by_reason'].items()]
+        reasons += [("Unparseable value", column, count) for column, count in metrics['invalid_values'].items()]
+        if reasons:
+            st.dataframe(pd.DataFrame(reasons, columns=["Outcome", "Reason", "Rows"]), use_container_width=True)
+        if metrics['samples']:
+            st.dataframe(pd.DataFrame(metrics['samples']), use_container_width=True)
+
+@traced('section')
+@uses('norway_co2', 'us_co2_clean', 'us_disasters_data')
 def show_overview(data):
     st.subheader("Data Summary")
     
@@ -233,6 +153,8 @@ def show_overview(data):
             st.success(f"US CO2 data: {len(data['us_co2_clean'])} data points")
         else:
             st.error("US CO2 data not found")
+        
+        show_ingest_report(data['us_disasters_data'])
     
     st.subheader("Research Questions")
     st.markdown("""
@@ -268,14 +190,15 @@ def show_overview(data):
         summary_df = pd.DataFrame(summary_data)
         st.dataframe(summary_df, use_container_width=True)
 
+@traced('section')
+@uses('norway_co2', 'norway_energy', 'norway_gdp')
 def show_norway_analysis(data):
     st.subheader("CO2 Emissions")
     if not data['norway_co2'].empty:
-        fig = px.line(data['norway_co2'], x='Year', y='CO2_per_capita',
+        fig = plot('line', data['norway_co2'], source=dataset_key('norway_co2'), x='Year', y='CO2_per_capita',
                      title='Norway CO2 Emissions per Capita Over Time',
-                     labels={'CO2_per_capita': 'CO2 per Capita (metric tons)', 'Year': 'Year'})
-        fig.update_layout(height=400)
-        st.plotly_chart(fig, use_container_width=True)
+                     labels={'CO2_per_capita': 'CO2 per Capita (metric tons)', 'Year': 'Year'}, height=400)
+        plotly_chart(fig, use_container_width=True)
         
         st.metric("Average CO2 per Capita", 
                  f"{data['norway_co2']['CO2_per_capita'].mean():.2f} metric tons")
@@ -292,11 +215,11 @@ def show_norway_analysis(data):
     
     st.subheader("Energy Use")
     if not data['norway_energy'].empty:
-        fig = px.line(data['norway_energy'], x='Year', y='Energy_use_per_capita',
+        fig = plot('line', data['norway_energy'], source=dataset_key('norway_energy'), x='Year',
+                     y='Energy_use_per_capita',
                      title='Norway Energy Use per Capita Over Time',
-                     labels={'Energy_use_per_capita': 'Energy Use per Capita (kg oil eq.)', 'Year': 'Year'})
-        fig.update_layout(height=400)
-        st.plotly_chart(fig, use_container_width=True)
+                     labels={'Energy_use_per_capita': 'Energy Use per Capita (kg oil eq.)', 'Year': 'Year'}, height=400)
+        plotly_chart(fig, use_container_width=True)
         
         st.metric("Average Energy Use", 
                  f"{data['norway_energy']['Energy_use_per_capita'].mean():.0f} kg oil equivalent")
@@ -313,11 +236,10 @@ def show_norway_analysis(data):
     
     st.subheader("GDP Growth")
     if not data['norway_gdp'].empty:
-        fig = px.line(data['norway_gdp'], x='Year', y='GDP_growth',
+        fig = plot('line', data['norway_gdp'], source=dataset_key('norway_gdp'), x='Year', y='GDP_growth',
                      title='Norway GDP per Capita Growth Over Time',
-                     labels={'GDP_growth': 'GDP Growth (%)', 'Year': 'Year'})
-        fig.update_layout(height=400)
-        st.plotly_chart(fig, use_container_width=True)
+                     labels={'GDP_growth': 'GDP Growth (%)', 'Year': 'Year'}, height=400)
+        plotly_chart(fig, use_container_width=True)
         
         st.metric("Average GDP Growth", 
                  f"{data['norway_gdp']['GDP_growth'].mean():.2f}%")
@@ -332,16 +254,18 @@ def show_norway_analysis(data):
     else:
         st.error("Norway GDP data not available")
 
+@traced('section')
+@uses('us_co2_clean', 'us_energy_filtered', 'us_gdp_global')
 def show_us_analysis(data):
     st.subheader("CO2 Emissions")
     if not data['us_co2_clean'].empty:
-        us_co2_by_year = data['us_co2_clean'].groupby('Year')['CO2_emissions_1000_tonnes'].sum().reset_index()
+        us_co2_by_year = aggregate('us_co2_clean', 'Year', 'CO2_emissions_1000_tonnes', 'sum').reset_index()
         
-        fig = px.line(us_co2_by_year, x='Year', y='CO2_emissions_1000_tonnes',
+        fig = plot('line', us_co2_by_year, source=(dataset_key('us_co2_clean'), 'sum by Year'), x='Year',
+                     y='CO2_emissions_1000_tonnes',
                      title='US Total CO2 Emissions Over Time',
-                     labels={'CO2_emissions_1000_tonnes': 'CO2 Emissions (1000 tonnes)', 'Year': 'Year'})
-        fig.update_layout(height=400)
-        st.plotly_chart(fig, use_container_width=True)
+                     labels={'CO2_emissions_1000_tonnes': 'CO2 Emissions (1000 tonnes)', 'Year': 'Year'}, height=400)
+        plotly_chart(fig, use_container_width=True)
         
         st.metric("Average Total CO2", 
                  f"{us_co2_by_year['CO2_emissions_1000_tonnes'].mean():.0f} thousand tonnes")
@@ -358,11 +282,11 @@ def show_us_analysis(data):
     
     st.subheader("Energy Use")
     if not data['us_energy_filtered'].empty:
-        fig = px.line(data['us_energy_filtered'], x='Year', y='US_Energy_use_per_capita',
+        fig = plot('line', data['us_energy_filtered'], source=dataset_key('us_energy_filtered'), x='Year',
+                     y='US_Energy_use_per_capita',
                      title='US Energy Use per Capita Over Time',
-                     labels={'US_Energy_use_per_capita': 'Energy Use per Capita (kg oil eq.)', 'Year': 'Year'})
-        fig.update_layout(height=400)
-        st.plotly_chart(fig, use_container_width=True)
+                     labels={'US_Energy_use_per_capita': 'Energy Use per Capita (kg oil eq.)', 'Year': 'Year'}, height=400)
+        plotly_chart(fig, use_container_width=True)
         
         st.metric("Average Energy Use", 
                  f"{data['us_energy_filtered']['US_Energy_use_per_capita'].mean():.0f} kg oil equivalent")
@@ -379,11 +303,10 @@ def show_us_analysis(data):
     
     st.subheader("GDP Growth")
     if not data['us_gdp_global'].empty:
-        fig = px.line(data['us_gdp_global'], x='Year', y='GDP_growth',
+        fig = plot('line', data['us_gdp_global'], source=dataset_key('us_gdp_global'), x='Year', y='GDP_growth',
                      title='US GDP per Capita Growth Over Time',
-                     labels={'GDP_growth': 'GDP Growth (%)', 'Year': 'Year'})
-        fig.update_layout(height=400)
-        st.plotly_chart(fig, use_container_width=True)
+                     labels={'GDP_growth': 'GDP Growth (%)', 'Year': 'Year'}, height=400)
+        plotly_chart(fig, use_container_width=True)
         
         st.metric("Average GDP Growth", 
                  f"{data['us_gdp_global']['GDP_growth'].mean():.2f}%")
@@ -397,18 +320,20 @@ def show_us_analysis(data):
     else:
         st.error("US GDP data not available")
 
+@traced('section')
+@uses('norway_co2', 'us_co2_clean', 'norway_energy')
 def show_comparative_analysis(data):
     st.subheader("Side-by-Side Comparison")
     
     if not data['norway_co2'].empty and not data['us_co2_clean'].empty:
         comparison_data = []
         
-        norway_yearly = data['norway_co2'].groupby('Year')['CO2_per_capita'].mean().reset_index()
+        norway_yearly = aggregate('norway_co2', 'Year', 'CO2_per_capita', 'mean').reset_index()
         norway_yearly['Country'] = 'Norway'
         norway_yearly['Metric'] = 'CO2 per Capita (tons)'
         norway_yearly['Value'] = norway_yearly['CO2_per_capita']
         
-        us_yearly = data['us_co2_clean'].groupby('Year')['CO2_emissions_1000_tonnes'].sum().reset_index()
+        us_yearly = aggregate('us_co2_clean', 'Year', 'CO2_emissions_1000_tonnes', 'sum').reset_index()
         us_yearly['Country'] = 'United States'
         us_yearly['Metric'] = 'Total CO2 (1000 tonnes)'
         us_yearly['Value'] = us_yearly['CO2_emissions_1000_tonnes']
@@ -416,11 +341,10 @@ def show_comparative_analysis(data):
         comparison_df = pd.concat([norway_yearly[['Year', 'Country', 'Metric', 'Value']], 
                                  us_yearly[['Year', 'Country', 'Metric', 'Value']]])
         
-        fig = px.line(comparison_df, x='Year', y='Value', color='Country',
-                     title='CO2 Emissions Comparison: Norway vs US',
-                     labels={'Value': 'CO2 Emissions', 'Year': 'Year'})
-        fig.update_layout(height=500)
-        st.plotly_chart(fig, use_container_width=True)
+        fig = plot('line', comparison_df, source=(dataset_key('norway_co2'), dataset_key('us_co2_clean'), 'yearly'),
+                     x='Year', y='Value', color='Country', title='CO2 Emissions Comparison: Norway vs US',
+                     labels={'Value': 'CO2 Emissions', 'Year': 'Year'}, height=500)
+        plotly_chart(fig, use_container_width=True)
         
         st.markdown("**Key Insights:**")
         st.markdown("""
@@ -437,12 +361,12 @@ def show_comparative_analysis(data):
         norway_merged = data['norway_energy'].merge(data['norway_co2'], on=['Country', 'Year'], how='inner')
         
         if not norway_merged.empty:
-            fig = px.scatter(norway_merged, x='Energy_use_per_capita', y='CO2_per_capita',
+            fig = plot('scatter', norway_merged, source=(dataset_key('norway_energy'), dataset_key('norway_co2')),
+                           x='Energy_use_per_capita', y='CO2_per_capita',
                            title='Norway: Energy Use vs CO2 Emissions per Capita',
                            labels={'Energy_use_per_capita': 'Energy Use per Capita (kg oil eq.)',
-                                  'CO2_per_capita': 'CO2 per Capita (metric tons)'})
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+                                  'CO2_per_capita': 'CO2 per Capita (metric tons)'}, height=400)
+            plotly_chart(fig, use_container_width=True)
             
             correlation = norway_merged['Energy_use_per_capita'].corr(norway_merged['CO2_per_capita'])
             st.metric("Correlation Coefficient", f"{correlation:.3f}")
@@ -464,6 +388,8 @@ def show_comparative_analysis(data):
             orderly patterns in the manner by which energy use results in emissions in the long term.
             """)
 
+@traced('section')
+@uses('norway_co2', 'us_co2_clean', 'co2_trends', 'co2_index')
 def show_statistical_analysis(data):
     st.subheader("Descriptive Statistics")
     
@@ -497,17 +423,15 @@ def show_statistical_analysis(data):
     
     st.subheader("Trend Analysis")
     
-    if not data['norway_co2'].empty:
-        norway_yearly_avg = data['norway_co2'].groupby('Year')['CO2_per_capita'].mean().reset_index()
+    if not data['norway_co2'].empty and 'NOR' in data['co2_trends'].index:
+        norway_trend = data['co2_trends'].loc['NOR']
         
-        if len(norway_yearly_avg) > 5:
-            slope, intercept, r_value, p_value, std_err = stats.linregress(
-                norway_yearly_avg['Year'], norway_yearly_avg['CO2_per_capita']
-            )
+        if norway_trend['n'] > 5:
+            slope, r_squared, p_value = norway_trend['slope'], norway_trend['r_squared'], norway_trend['p_value']
             
             st.markdown("**Norway CO2 Trend Analysis**")
             st.write(f"- **Slope:** {slope:.4f} (tons per year)")
-            st.write(f"- **R-squared:** {r_value**2:.4f}")
+            st.write(f"- **R-squared:** {r_squared:.4f}")
             st.write(f"- **P-value:** {p_value:.4f}")
             
             if p_value < 0.05:
@@ -521,16 +445,15 @@ def show_statistical_analysis(data):
                 st.info("**Trend:** Decreasing CO2 emissions over time")
     
     if not data['us_co2_clean'].empty:
-        us_yearly_total = data['us_co2_clean'].groupby('Year')['CO2_emissions_1000_tonnes'].sum().reset_index()
+        us_yearly_total = aggregate('us_co2_clean', 'Year', 'CO2_emissions_1000_tonnes', 'sum').reset_index()
         
         if len(us_yearly_total) > 5:
-            slope, intercept, r_value, p_value, std_err = stats.linregress(
-                us_yearly_total['Year'], us_yearly_total['CO2_emissions_1000_tonnes']
-            )
+            us_trend = fit_series(us_yearly_total['Year'], us_yearly_total['CO2_emissions_1000_tonnes'])
+            slope, r_squared, p_value = us_trend['slope'], us_trend['r_squared'], us_trend['p_value']
             
             st.markdown("**US CO2 Trend Analysis**")
             st.write(f"- **Slope:** {slope:.2f} (1000 tonnes per year)")
-            st.write(f"- **R-squared:** {r_value**2:.4f}")
+            st.write(f"- **R-squared:** {r_squared:.4f}")
             st.write(f"- **P-value:** {p_value:.4f}")
             
             if p_value < 0.05:
@@ -542,10 +465,34 @@ def show_statistical_analysis(data):
                 st.info("**Trend:** Increasing CO2 emissions over time")
             else:
                 st.info("**Trend:** Decreasing CO2 emissions over time")
+    
+    st.subheader("Trend Rankings")
+    show_trend_rankings(data)
 
-def show_interactive_charts(data):
-    st.subheader("Dynamic Comparisons")
+@st.fragment
+@traced('fragment', root=True)
+def show_trend_rankings(data):
+    co2_years = data['co2_index'].df['Year']
+    start_year, end_year = st.slider("Trend window (years):", int(co2_years.min()), int(co2_years.max()),
+                                     (1960, int(co2_years.max())))
+    rankings = get_trends('co2_index', 'CO2_per_capita', start_year, end_year)
+    rankings = rankings[rankings['p_value'] < 0.05].sort_values('slope')
+    ranking_columns = ['Country', 'slope', 'r_squared', 'p_value']
+    
+    st.markdown(f"**CO2 per Capita Trends, {start_year}-{end_year}** ({len(rankings)} countries with a significant trend)")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("**Fastest Rising**")
+        st.dataframe(rankings[ranking_columns].iloc[::-1].head(10), use_container_width=True)
     
+    with col2:
+        st.markdown("**Fastest Falling**")
+        st.dataframe(rankings[ranking_columns].head(10), use_container_width=True)
+
+@st.fragment
+@traced('fragment', root=True)
+def show_dynamic_comparison(data):
     if not data['norway_co2'].empty and not data['us_co2_clean'].empty:
         comparison_type = st.selectbox(
             "Choose comparison type:",
@@ -557,7 +504,7 @@ def show_interactive_charts(data):
             norway_data['Metric'] = 'CO2 per Capita (tons)'
             norway_data['Value'] = norway_data['CO2_per_capita']
             
-            us_data = data['us_co2_clean'].groupby('Year')['CO2_emissions_1000_tonnes'].sum().reset_index()
+            us_data = aggregate('us_co2_clean', 'Year', 'CO2_emissions_1000_tonnes', 'sum').reset_index()
             us_data['Country'] = 'United States'
             us_data['Metric'] = 'Total CO2 (1000 tonnes)'
             us_data['Value'] = us_data['CO2_emissions_1000_tonnes']
@@ -567,12 +514,54 @@ def show_interactive_charts(data):
                 us_data[['Year', 'Country', 'Metric', 'Value']]
             ])
             
-            fig = px.line(combined_data, x='Year', y='Value', color='Country',
-                         title=f'{comparison_type}: Norway vs US Comparison',
-                         labels={'Value': comparison_type, 'Year': 'Year'})
-            
-            fig.update_layout(height=600)
-            st.plotly_chart(fig, use_container_width=True)
+            fig = plot('line', combined_data, source=(dataset_key('norway_co2'), dataset_key('us_co2_clean')),
+                         x='Year', y='Value', color='Country', title=f'{comparison_type}: Norway vs US Comparison',
+                         labels={'Value': comparison_type, 'Year': 'Year'}, height=600)
+            plotly_chart(fig, use_container_width=True)
+
+@st.fragment
+@traced('fragment', root=True)
+def show_country_comparison(data):
+    tensor = data['country_tensor']
+    comparison = st.session_state.get('country_comparison')
+    if comparison is None or comparison.tensor.key != tensor.key:
+        comparison = st.session_state['country_comparison'] = ComparisonSet(tensor)
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        selected = st.multiselect("Countries:", comparison.tensor.countries(), default=['NOR', 'USA'],
+                                  format_func=comparison.tensor.name)
+    with col2:
+        metric = st.selectbox("Metric:", comparison.tensor.metrics, format_func=METRIC_LABELS.get)
+    
+    comparison.update(selected)
+    if not selected:
+        st.info("Pick one or more countries to compare.")
+        return
+    
+    selection_mean = comparison.aggregate(metric)
+    selection_mean['Country'] = 'Selection mean'
+    combined_data = pd.concat([
+        comparison.tensor.frame(metric, selected),
+        selection_mean.rename(columns={'mean': metric})[['Country', 'Year', metric]]
+    ])
+    
+    fig = plot('line', combined_data, source=(tensor.key, metric, tuple(selected)), x='Year', y=metric,
+               color='Country', title=f'{METRIC_LABELS[metric]}: {len(selected)} Countries',
+               labels={metric: METRIC_LABELS[metric], 'Year': 'Year'}, height=500)
+    plotly_chart(fig, use_container_width=True)
+    st.dataframe(comparison.summary(), use_container_width=True)
+
+@traced('section')
+@uses('norway_co2', 'us_co2_clean', 'norway_energy', 'co2_trends', 'country_tensor')
+def show_interactive_charts(data):
+    st.subheader("Dynamic Comparisons")
+    
+    show_dynamic_comparison(data)
+    
+    st.subheader("Country Comparison")
+    
+    show_country_comparison(data)
     
     st.subheader("Correlation Analysis")
     
@@ -583,13 +572,11 @@ def show_interactive_charts(data):
             correlation_vars = ['CO2_per_capita', 'Energy_use_per_capita', 'Year']
             correlation_data = norway_merged[correlation_vars].corr()
             
-            fig = px.imshow(correlation_data,
+            fig = plot('imshow', correlation_data, source=(dataset_key('norway_co2'), dataset_key('norway_energy')),
                            title='Norway: Variable Correlation Matrix',
                            color_continuous_scale='RdBu',
-                           aspect='auto')
-            
-            fig.update_layout(height=500)
-            st.plotly_chart(fig, use_container_width=True)
+                           aspect='auto', height=500)
+            plotly_chart(fig, use_container_width=True)
             
             st.markdown("**Correlation Interpretation:**")
             st.markdown("""
@@ -603,27 +590,13 @@ def show_interactive_charts(data):
     st.subheader("Time Series Decomposition")
     
     if not data['norway_co2'].empty:
-        norway_yearly = data['norway_co2'].groupby('Year')['CO2_per_capita'].mean().reset_index()
+        norway_yearly = aggregate('norway_co2', 'Year', 'CO2_per_capita', 'mean').reset_index()
         
-        if len(norway_yearly) > 10:
-            fig = make_subplots(rows=3, cols=1, 
-                              subplot_titles=('Original Time Series', 'Trend Component', 'Residuals'),
-                              vertical_spacing=0.1)
-            
-            fig.add_trace(go.Scatter(x=norway_yearly['Year'], y=norway_yearly['CO2_per_capita'],
-                                   name='Original', line=dict(color='blue')), row=1, col=1)
-            
-            slope, intercept, _, _, _ = stats.linregress(norway_yearly['Year'], norway_yearly['CO2_per_capita'])
-            trend = slope * norway_yearly['Year'] + intercept
-            fig.add_trace(go.Scatter(x=norway_yearly['Year'], y=trend,
-                                   name='Trend', line=dict(color='red')), row=2, col=1)
-            
-            residuals = norway_yearly['CO2_per_capita'] - trend
-            fig.add_trace(go.Scatter(x=norway_yearly['Year'], y=residuals,
-                                   name='Residuals', line=dict(color='green')), row=3, col=1)
-            
-            fig.update_layout(height=800, title_text="Norway CO2 Emissions: Time Series Decomposition")
-            st.plotly_chart(fig, use_container_width=True)
+        if len(norway_yearly) > 10 and 'NOR' in data['co2_trends'].index:
+            slope, intercept = data['co2_trends'].loc['NOR', ['slope', 'intercept']]
+            fig = cached(('decomposition', dataset_key('norway_co2'), slope, intercept),
+                         lambda: build_decomposition_figure(norway_yearly, slope, intercept))
+            plotly_chart(fig, use_container_width=True)
             
             st.markdown("""
             **Analysis:** The decomposition splits Norway's CO2 emissions into trend, seasonal, and residual components. 
@@ -632,6 +605,183 @@ def show_interactive_charts(data):
             in emission trends to be separated from temporary fluctuations, and it informs analysis of the effectiveness 
             of long-run climate policies relative to short-run economic or social influences.
             """)
+    
+    st.subheader("Rolling Trends & Structural Breaks")
+    
+    show_rolling_analysis(data)
+    
+    st.subheader("Forecasts to 2100")
+    
+    show_forecast(data)
+
+@st.fragment
+@traced('fragment', root=True)
+def show_rolling_analysis(data):
+    tensor = data['country_tensor']
+    countries = tensor.countries()
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        code = st.selectbox("Country:", countries, index=countries.index('NOR'), format_func=tensor.name,
+                            key='rolling_country')
+    with col2:
+        metric = st.selectbox("Metric:", tensor.metrics, format_func=METRIC_LABELS.get, key='rolling_metric')
+    with col3:
+        window = st.slider("Window size (years):", 3, 40, 10)
+    
+    summary = rolling_summary(tensor, metric, window)
+    if code not in summary.index:
+        st.info(f"Not enough {METRIC_LABELS[metric]} data for {tensor.name(code)}.")
+        return
+    
+    series = rolling_series(tensor, metric, window, code)
+    fig = cached(('rolling', tensor.key, metric, window, code),
+                 lambda: build_rolling_figure(series, summary.loc[code], metric, window, tensor.name(code)))
+    plotly_chart(fig, use_container_width=True)
+    
+    country = summary.loc[code]
+    findings = []
+    if pd.notna(country['peak_year']):
+        findings.append(f"{window}-year average peaked at {country['peak_value']:.2f} around {country['peak_year']}")
+    if pd.notna(country['break_year']):
+        findings.append(f"the largest change in trend came in {country['break_year']} "
+                        f"({country['slope_before']:+.3f} → {country['slope_after']:+.3f} per year)")
+    st.markdown(f"**{tensor.name(code)}:** {'; '.join(findings)}.")
+    
+    st.markdown(f"**Largest Structural Breaks, {window}-year windows**")
+    breaks = summary[summary['break_year'].notna()]
+    breaks = breaks.reindex(breaks['slope_change'].abs().sort_values(ascending=False).index)
+    st.dataframe(breaks[['Country', 'break_year', 'slope_before', 'slope_after', 'peak_year']].head(10),
+                 use_container_width=True)
+
+@st.fragment
+@traced('fragment', root=True)
+def show_forecast(data):
+    tensor = data['country_tensor']
+    countries = tensor.countries()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        code = st.selectbox("Country:", countries, index=countries.index('NOR'), format_func=tensor.name,
+                            key='forecast_country')
+    with col2:
+        metric = st.selectbox("Metric:", tensor.metrics, format_func=METRIC_LABELS.get, key='forecast_metric')
+    with col3:
+        start_year = st.slider("Fit trend from:", int(tensor.years[0]), int(tensor.years[-1]) - 10, 1990,
+                               key='forecast_start')
+    with col4:
+        n_sims = st.selectbox("Simulations:", [1000, 10000], key='forecast_sims')
+    
+    forecast = get_forecast(COMPARISON_METRICS[metric], metric, start_year, n_sims=n_sims)
+    bands = forecast[forecast['ISO3'] == code]
+    if bands.empty:
+        st.info(f"Not enough {METRIC_LABELS[metric]} data for {tensor.name(code)} since {start_year}.")
+        return
+    
+    values = tensor.values[tensor.metrics.index(metric), tensor.position[code]]
+    observed = pd.DataFrame({'Year': tensor.years, metric: values}).dropna()
+    fig = cached(('forecast', tensor.key, metric, start_year, n_sims, code),
+                 lambda: build_forecast_figure(observed, bands, metric, tensor.name(code)))
+    plotly_chart(fig, use_container_width=True)
+    
+    final = bands.iloc[-1]
+    st.markdown(f"**{tensor.name(code)}, {final['Year']}:** median {final['p50']:.2f}, 90% band "
+                f"{final['p5']:.2f} to {final['p95']:.2f} ({n_sims:,} bootstrap simulations of the "
+                f"{start_year}+ linear trend and its residuals).")
+
+def build_forecast_figure(observed, bands, metric, name):
+    import plotly.graph_objects as go
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=bands['Year'], y=bands['p95'], line=dict(width=0), showlegend=False))
+    fig.add_trace(go.Scatter(x=bands['Year'], y=bands['p5'], line=dict(width=0), fill='tonexty',
+                           fillcolor='rgba(255, 0, 0, 0.15)', name='90% band'))
+    fig.add_trace(go.Scatter(x=bands['Year'], y=bands['p75'], line=dict(width=0), showlegend=False))
+    fig.add_trace(go.Scatter(x=bands['Year'], y=bands['p25'], line=dict(width=0), fill='tonexty',
+                           fillcolor='rgba(255, 0, 0, 0.3)', name='50% band'))
+    fig.add_trace(go.Scatter(x=bands['Year'], y=bands['p50'], name='Median', line=dict(color='red', dash='dash')))
+    fig.add_trace(go.Scatter(x=observed['Year'], y=observed[metric], name='Observed', line=dict(color='blue')))
+    fig.update_layout(height=500, title_text=f"{name}: {METRIC_LABELS[metric]} Forecast",
+                      xaxis_title='Year', yaxis_title=METRIC_LABELS[metric])
+    return fig
+
+def build_rolling_figure(series, country, metric, window, name):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True,
+                      subplot_titles=(f'{METRIC_LABELS[metric]} and {window}-Year Mean',
+                                      f'{window}-Year Slope and Volatility'),
+                      vertical_spacing=0.1)
+    
+    fig.add_trace(go.Scatter(x=series['Year'], y=series[metric],
+                           name='Observed', line=dict(color='lightgray')), row=1, col=1)
+    fig.add_trace(go.Scatter(x=series['Year'], y=series['rolling_mean'],
+                           name='Rolling mean', line=dict(color='blue')), row=1, col=1)
+    if pd.notna(country['peak_year']):
+        fig.add_trace(go.Scatter(x=[country['peak_year']], y=[country['peak_value']], mode='markers',
+                               name='Peak', marker=dict(color='red', size=10)), row=1, col=1)
+    
+    fig.add_trace(go.Scatter(x=series['Year'], y=series['rolling_slope'],
+                           name='Rolling slope', line=dict(color='green')), row=2, col=1)
+    fig.add_trace(go.Scatter(x=series['Year'], y=series['volatility'],
+                           name='Volatility', line=dict(color='orange')), row=2, col=1)
+    
+    if pd.notna(country['break_year']):
+        fig.add_vline(x=country['break_year'], line_dash='dash', line_color='red')
+    
+    fig.update_layout(height=700, title_text=f"{name}: Rolling Trends and Structural Breaks")
+    return fig
+
+def build_decomposition_figure(norway_yearly, slope, intercept):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    
+    fig = make_subplots(rows=3, cols=1, 
+                      subplot_titles=('Original Time Series', 'Trend Component', 'Residuals'),
+                      vertical_spacing=0.1)
+    
+    fig.add_trace(go.Scatter(x=norway_yearly['Year'], y=norway_yearly['CO2_per_capita'],
+                           name='Original', line=dict(color='blue')), row=1, col=1)
+    
+    trend = slope * norway_yearly['Year'] + intercept
+    fig.add_trace(go.Scatter(x=norway_yearly['Year'], y=trend,
+                           name='Trend', line=dict(color='red')), row=2, col=1)
+    
+    residuals = norway_yearly['CO2_per_capita'] - trend
+    fig.add_trace(go.Scatter(x=norway_yearly['Year'], y=residuals,
+                           name='Residuals', line=dict(color='green')), row=3, col=1)
+    
+    fig.update_layout(height=800, title_text="Norway CO2 Emissions: Time Series Decomposition")
+    return fig
+
+def show_trace_panel(current):
+    if current is None or not st.session_state.get('show_trace'):
+        return
+    
+    st.markdown("---")
+    st.header("Performance Trace")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Rerun Time", f"{current.duration_ms:.0f} ms")
+    col2.metric("Spans", len(current.spans) - 1)
+    col3.metric("RSS Change", f"{current.rss_delta_mb:+.1f} MB")
+    previous = [root.duration_ms for root in RECENT if root.kind == 'rerun' and root is not current]
+    col4.metric("Previous Rerun", f"{previous[-1]:.0f} ms" if previous else "n/a")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Time by Kind (self time)**")
+        st.dataframe(current.by_kind().round(2), use_container_width=True)
+    with col2:
+        st.markdown("**Cache Hits, Misses and Overhead**")
+        st.caption("Overhead is argument hashing, lookup and copying the cached value.")
+        st.dataframe(current.cache_stats().round(2), use_container_width=True)
+    
+    st.markdown("**Spans**")
+    st.dataframe(current.table(), use_container_width=True, height=400)
 
 if __name__ == "__main__":
-    main()
+    with trace('rerun') as current:
+        main()
+    show_trace_panel(current)
@@ -0,0 +1,314 @@
+import argparse
+import contextvars
+import functools
+import json
+import logging
+import os
+import resource
+import secrets
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+MODE = os.environ.get('CLIMATE_TRACE', 'on').lower()
+ENABLED = MODE not in ('off', '0', 'false')
+TRACE_FILE = os.environ.get('CLIMATE_TRACE_FILE')
+SERVICE_NAME = 'climate-dashboard'
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+logger = logging.getLogger('climate.trace')
+CURRENT = contextvars.ContextVar('climate_span', default=None)
+RECENT = deque(maxlen=20)
+WATCHED = {}
+EXPORT_LOCK = threading.Lock()
+
+if MODE == 'memory' and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE / 2**20
+    except (OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def allocated_mb():
+    return tracemalloc.get_traced_memory()[0] / 2**20 if tracemalloc.is_tracing() else None
+
+
+def watch(name, cache):
+    WATCHED[name] = cache
+    return cache
+
+
+def watched_stats():
+    return {name: cache.stats() for name, cache in WATCHED.items()}
+
+
+class Span:
+    def __init__(self, name, kind, parent=None, trace_id=None):
+        self.name = name
+        self.kind = kind
+        self.parent = parent
+        self.trace_id = trace_id or parent.trace_id
+        self.span_id = secrets.token_hex(8)
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.attrs = {}
+        self.spans = parent.spans if parent is not None else []
+        self.spans.append(self)
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.start = time.perf_counter()
+        self.duration_ms = None
+        self.rss_start = rss_mb()
+        self.rss_delta_mb = None
+        self.alloc_start = allocated_mb()
+        self.alloc_delta_mb = None
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self.start) * 1000
+        self.end_ns = self.start_ns + int(self.duration_ms * 1e6)
+        self.rss_delta_mb = rss_mb() - self.rss_start
+        if self.alloc_start is not None:
+            self.alloc_delta_mb = allocated_mb() - self.alloc_start
+
+    def children(self):
+        return [span for span in self.spans if span.parent is self]
+
+    def self_ms(self):
+        return self.duration_ms - sum(child.duration_ms or 0.0 for child in self.children())
+
+
+class Trace(Span):
+    def __init__(self, name, kind='rerun'):
+        super().__init__(name, kind, trace_id=secrets.token_hex(16))
+        self.watched_start = watched_stats()
+        self.watched = {}
+
+    def finish(self):
+        super().finish()
+        for name, stats in watched_stats().items():
+            before = self.watched_start.get(name, {})
+            self.watched[name] = {key: stats[key] - before.get(key, 0) for key in ('hits', 'misses', 'evictions')}
+            self.watched[name]['entries'] = stats['entries']
+
+    def table(self):
+        return pd.DataFrame([{
+            'span': '  ' * span.depth + span.name,
+            'kind': span.kind,
+            'ms': round(span.duration_ms, 2) if span.duration_ms is not None else None,
+            'self_ms': round(span.self_ms(), 2) if span.duration_ms is not None else None,
+            'rss_delta_mb': round(span.rss_delta_mb, 2) if span.rss_delta_mb is not None else None,
+            'alloc_delta_mb': round(span.alloc_delta_mb, 2) if span.alloc_delta_mb is not None else None,
+            'cache': span.attrs.get('cache', ''),
+            'cache_overhead_ms': round(span.attrs['cache_overhead_ms'], 2) if 'cache_overhead_ms' in span.attrs else None,
+        } for span in self.spans])
+
+    def by_kind(self):
+        finished = [span for span in self.spans if span.duration_ms is not None and span is not self]
+        return (pd.DataFrame({'kind': [span.kind for span in finished], 'self_ms': [span.self_ms() for span in finished]})
+                .groupby('kind')['self_ms'].agg(['count', 'sum']).sort_values('sum', ascending=False))
+
+    def cache_stats(self):
+        rows = {}
+        for span in self.spans:
+            if 'cache' not in span.attrs:
+                continue
+            row = rows.setdefault(span.kind, {'hits': 0, 'misses': 0, 'overhead_ms': 0.0, 'compute_ms': 0.0})
+            row['hits' if span.attrs['cache'] == 'hit' else 'misses'] += 1
+            row['overhead_ms'] += span.attrs.get('cache_overhead_ms', 0.0)
+            row['compute_ms'] += span.attrs.get('compute_ms', 0.0)
+        for name, stats in self.watched.items():
+            rows[f'lru:{name}'] = {'hits': stats['hits'], 'misses': stats['misses'],
+                                   'overhead_ms': None, 'compute_ms': None}
+        return pd.DataFrame.from_dict(rows, orient='index')
+
+
+@contextmanager
+def trace(name, kind='rerun'):
+    if not ENABLED:
+        yield None
+        return
+    root = Trace(name, kind)
+    token = CURRENT.set(root)
+    try:
+        yield root
+    finally:
+        CURRENT.reset(token)
+        root.finish()
+        RECENT.append(root)
+        export(root)
+
+
+@contextmanager
+def span(name, kind='span'):
+    parent = CURRENT.get()
+    if parent is None:
+        # outside a traced rerun (pipeline, CLIs) spans cost one lookup
+        yield None
+        return
+    current = Span(name, kind, parent)
+    token = CURRENT.set(current)
+    try:
+        yield current
+    finally:
+        CURRENT.reset(token)
+        current.finish()
+
+
+def traced(kind, name=None, root=False):
+    # root=True starts a trace of its own when called outside one, e.g. a fragment rerun
+    def wrap(func):
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            scope = trace if root and CURRENT.get() is None else span
+            with scope(name or func.__name__, kind):
+                return func(*args, **kwargs)
+        return call
+    return wrap
+
+
+def traced_cache(cache, kind, label=None):
+    # the body only runs on a miss, so a span without a compute child was served from the cache;
+    # whatever time is left over is argument hashing, lookup and copying the cached value
+    def wrap(func):
+        @functools.wraps(func)
+        def body(*args, **kwargs):
+            outer = CURRENT.get()
+            with span('compute', kind) as current:
+                result = func(*args, **kwargs)
+            if outer is not None and current is not None:
+                outer.attrs['cache'] = 'miss'
+                outer.attrs['compute_ms'] = outer.attrs.get('compute_ms', 0.0) + current.duration_ms
+            return result
+
+        cached = cache(body)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            name = func.__name__ if label is None else f'{func.__name__}:{label(*args, **kwargs)}'
+            with span(name, kind) as current:
+                result = cached(*args, **kwargs)
+                if current is not None:
+                    current.attrs.setdefault('cache', 'hit')
+            if current is not None:
+                current.attrs['cache_overhead_ms'] = current.duration_ms - current.attrs.get('compute_ms', 0.0)
+            return result
+
+        call.clear = cached.clear
+        return call
+    return wrap
+
+
+def otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def otlp_span(span):
+    attrs = dict(span.attrs, **{'climate.kind': span.kind, 'process.rss_delta_mb': span.rss_delta_mb})
+    if span.alloc_delta_mb is not None:
+        attrs['process.alloc_delta_mb'] = span.alloc_delta_mb
+    record = {
+        'traceId': span.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': 1,
+        'startTimeUnixNano': str(span.start_ns),
+        'endTimeUnixNano': str(span.end_ns),
+        'attributes': [{'key': key, 'value': otlp_value(value)} for key, value in attrs.items()],
+    }
+    if span.parent is not None:
+        record['parentSpanId'] = span.parent.span_id
+    return record
+
+
+def to_otlp(root):
+    # the OTLP/JSON layout the OpenTelemetry Collector's file exporter writes, one trace per line
+    return {'resourceSpans': [{
+        'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}},
+                                    {'key': 'process.pid', 'value': {'intValue': str(os.getpid())}}]},
+        'scopeSpans': [{
+            'scope': {'name': 'climate.tracing'},
+            'spans': [otlp_span(span) for span in root.spans if span.end_ns is not None],
+        }],
+    }]}
+
+
+def export(root, path=None):
+    path = path or TRACE_FILE
+    slowest = sorted((span for span in root.spans if span is not root), key=lambda span: -span.self_ms())[:5]
+    logger.info(json.dumps({
+        'trace_id': root.trace_id,
+        'name': root.name,
+        'ms': round(root.duration_ms, 2),
+        'spans': len(root.spans),
+        'rss_delta_mb': round(root.rss_delta_mb, 2),
+        'slowest': [[span.name, round(span.self_ms(), 2)] for span in slowest],
+        'lru': root.watched,
+    }))
+    if not path:
+        return
+    line = json.dumps(to_otlp(root))
+    with EXPORT_LOCK:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a') as f:
+            f.write(line + '\n')
+
+
+def read_spans(path):
+    rows = []
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            for resource_spans in record['resourceSpans']:
+                for scope in resource_spans['scopeSpans']:
+                    for item in scope['spans']:
+                        attrs = {attr['key']: next(iter(attr['value'].values())) for attr in item['attributes']}
+                        rows.append({
+                            'trace_id': item['traceId'],
+                            'name': item['name'],
+                            'kind': attrs.get('climate.kind'),
+                            'cache': attrs.get('cache'),
+                            'ms': (int(item['endTimeUnixNano']) - int(item['startTimeUnixNano'])) / 1e6,
+                        })
+    return pd.DataFrame(rows)
+
+
+def summarise(spans):
+    return (spans.groupby(['kind', 'name'])['ms']
+            .agg(calls='count', p50=lambda ms: ms.quantile(0.5), p95=lambda ms: ms.quantile(0.95), total='sum')
+            .sort_values('total', ascending=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarise spans written by CLIMATE_TRACE_FILE.')
+    parser.add_argument('path', nargs='?', default=TRACE_FILE)
+    parser.add_argument('--top', type=int, default=25)
+    args = parser.parse_args()
+    if not args.path:
+        parser.error('pass a trace file or set CLIMATE_TRACE_FILE')
+    if not os.path.exists(args.path):
+        parser.error(f"no trace file at '{args.path}'")
+
+    spans = read_spans(args.path)
+    print(f"{spans['trace_id'].nunique()} reruns, {len(spans)} spans")
+    print(summarise(spans).head(args.top).round(2).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+PARAM_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [3, 5, 7, 10],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 4],
+}
+FEATURES = ['Energy_use_per_capita', 'GDP_growth', 'Year']
+TARGET = 'CO2_per_capita'
+FIT_CACHE = os.environ.get('CLIMATE_FIT_CACHE', os.path.join('.fit_cache', 'random_forest.jsonl'))
+# rough resident size of a worker with sklearn imported and one forest in memory
+WORKER_MEMORY_MB = 200
+
+WORKER_DATA = {}
+
+
+def norway_training_data(data):
+    merged = data['norway_energy'].merge(data['norway_co2'], on=['Country', 'Year'], how='inner')
+    merged = merged.merge(data['norway_gdp'], on=['Country', 'Year'], how='inner').dropna()
+    return merged[FEATURES].to_numpy(dtype=np.float64), merged[TARGET].to_numpy(dtype=np.float64)
+
+
+def data_hash(X, y):
+    digest = hashlib.sha1()
+    for array in (X, y):
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def fit_key(data_key, params, fold, cv, random_state):
+    import sklearn
+    spec = {
+        'data': data_key,
+        'params': params,
+        'fold': fold,
+        'cv': cv,
+        'random_state': random_state,
+        'sklearn': sklearn.__version__,
+    }
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+class FitCache:
+    def __init__(self, path=FIT_CACHE):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # a run killed mid-write leaves a partial last line
+                        continue
+                    self.entries[record['key']] = record
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def add(self, key, record):
+        record = dict(record, key=key)
+        self.entries[key] = record
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+
+def halving_schedule(n_candidates, cv, factor=3, min_folds=1):
+    schedule = [(n_candidates, min(min_folds, cv))]
+    while schedule[-1][1] < cv:
+        keep, folds = schedule[-1]
+        schedule.append((max(1, math.ceil(keep / factor)), min(folds * factor, cv)))
+    return schedule
+
+
+def pool_size(memory_budget_mb, workers=None):
+    limit = max(1, int(memory_budget_mb // WORKER_MEMORY_MB))
+    return max(1, min(workers or os.cpu_count() or 1, limit))
+
+
+def init_worker(X, y):
+    WORKER_DATA['X'] = X
+    WORKER_DATA['y'] = y
+
+
+def fit_fold(params, train, test, random_state):
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.metrics import r2_score
+
+    X, y = WORKER_DATA['X'], WORKER_DATA['y']
+    start = time.perf_counter()
+    model = RandomForestRegressor(random_state=random_state, n_jobs=1, **params).fit(X[train], y[train])
+    fitted = time.perf_counter()
+    score = r2_score(y[test], model.predict(X[test]))
+    return {'score': float(score), 'fit_s': fitted - start, 'score_s': time.perf_counter() - fitted}
+
+
+def run_fits(tasks, X, y, workers):
+    if workers == 1 or len(tasks) <= 1:
+        init_worker(X, y)
+        for task, args in tasks:
+            yield task, fit_fold(*args)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(X, y)) as pool:
+        pending = {}
+        queued = iter(tasks)
+        # keep at most two fits per worker in flight so results don't pile up in memory
+        for task, args in queued:
+            pending[pool.submit(fit_fold, *args)] = task
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+                for task, args in queued:
+                    pending[pool.submit(fit_fold, *args)] = task
+                    break
+
+
+def search(X, y, param_grid=PARAM_GRID, cv=5, factor=3, halving=True, random_state=42,
+           memory_budget_mb=1024, workers=None, cache_path=FIT_CACHE, log=print):
+    from sklearn.model_selection import KFold, ParameterGrid
+
+    start = time.perf_counter()
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    data_key = data_hash(X, y)
+    candidates = list(ParameterGrid(param_grid))
+    folds = list(KFold(n_splits=cv).split(X))
+    cache = FitCache(cache_path)
+    workers = pool_size(memory_budget_mb, workers)
+    schedule = halving_schedule(len(candidates), cv, factor) if halving else [(len(candidates), cv)]
+
+    scores = [{} for _ in candidates]
+    timings = [{'fit_s': 0.0, 'score_s': 0.0, 'cached': 0, 'fitted': 0, 'rung': 0} for _ in candidates]
+    alive = list(range(len(candidates)))
+    for rung, (keep, n_folds) in enumerate(schedule):
+        alive = sorted(alive, key=lambda i: -np.mean(list(scores[i].values())) if scores[i] else 0.0)[:keep]
+        tasks = []
+        for i in alive:
+            timings[i]['rung'] = rung
+            for fold in range(n_folds):
+                if fold in scores[i]:
+                    continue
+                key = fit_key(data_key, candidates[i], fold, cv, random_state)
+                hit = cache.get(key)
+                if hit is not None:
+                    scores[i][fold] = hit['score']
+                    timings[i]['cached'] += 1
+                    continue
+                train, test = folds[fold]
+                tasks.append(((i, fold, key), (candidates[i], train, test, random_state)))
+
+        rung_start = time.perf_counter()
+        for (i, fold, key), result in run_fits(tasks, X, y, workers):
+            cache.add(key, result)
+            scores[i][fold] = result['score']
+            timings[i]['fit_s'] += result['fit_s']
+            timings[i]['score_s'] += result['score_s']
+            timings[i]['fitted'] += 1
+        log(f'rung {rung}: {len(alive)} candidates x {n_folds} folds, {len(tasks)} fits '
+            f'({time.perf_counter() - rung_start:.1f}s, {workers} workers)')
+
+    report = pd.DataFrame([
+        dict(candidates[i],
+             mean_score=np.mean(list(scores[i].values())),
+             std_score=np.std(list(scores[i].values())),
+             folds=len(scores[i]),
+             **timings[i])
+        for i in range(len(candidates))
+    ])
+    # rank finished candidates ahead of those pruned at an earlier rung
+    report = report.sort_values(['rung', 'mean_score'], ascending=[False, False], kind='stable')
+    report.insert(0, 'rank', np.arange(1, len(report) + 1))
+
+    return {
+        'best_params': {name: report[name].iloc[0].item() for name in param_grid},
+        'best_score': float(report['mean_score'].iloc[0]),
+        'report': report.reset_index(drop=True),
+        'data_hash': data_key,
+        'fits': int(report['fitted'].sum()),
+        'cached_fits': int(report['cached'].sum()),
+        'elapsed_s': time.perf_counter() - start,
+    }
+
+
+def fit_best(X, y, params, random_state=42):
+    from sklearn.ensemble import RandomForestRegressor
+    return RandomForestRegressor(random_state=random_state, **params).fit(X, y)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cached, parallel hyperparameter search for the Random Forest.')
+    parser.add_argument('--cv', type=int, default=5)
+    parser.add_argument('--factor', type=int, default=3, help='successive halving keeps 1/factor per rung')
+    parser.add_argument('--no-halving', action='store_true', help='score every candidate on every fold')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--memory-budget-mb', type=int, default=1024)
+    parser.add_argument('--cache', default=FIT_CACHE, help='fit cache file (empty string disables it)')
+    parser.add_argument('--report', help='write the per-candidate timing report as CSV')
+    parser.add_argument('--save', help='refit the best candidate and dump it with joblib')
+    parser.add_argument('--strict', action='store_true',
+                        help='fail if the bundle is stale instead of building those datasets from the sources')
+    args = parser.parse_args()
+
+    from sklearn.model_selection import train_test_split
+
+    from bundle import load_bundle
+
+    X, y = norway_training_data(load_bundle(names=['norway_co2', 'norway_energy', 'norway_gdp'], strict=args.strict))
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.3, random_state=42)
+    result = search(X_train, y_train, cv=args.cv, factor=args.factor, halving=not args.no_halving,
+                    memory_budget_mb=args.memory_budget_mb, workers=args.workers, cache_path=args.cache or None)
+
+    print(result['report'].head(15).to_string(index=False))
+    print(f"\nBest Parameters: {result['best_params']}")
+    print(f"Best CV Score: {result['best_score']:.3f}")
+    print(f"{result['fits']} fits, {result['cached_fits']} from cache, {result['elapsed_s']:.1f}s")
+
+    if args.report:
+        result['report'].to_csv(args.report, index=False)
+    if args.save:
+        import joblib
+        joblib.dump(fit_best(X_train, y_train, result['best_params']), args.save)
+        print(f"Saved to '{args.save}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+
+def country_year_matrix(df, value_col, key='ISO3', start=None, end=None):
+    if start is not None:
+        df = df[df['Year'] >= start]
+    if end is not None:
+        df = df[df['Year'] <= end]
+
+    keys = pd.Categorical(df[key])
+    labels = np.asarray(keys.categories, dtype=object)
+    if df.empty:
+        return labels, np.array([], dtype=np.int64), np.empty((len(labels), 0))
+
+    year_values = df['Year'].to_numpy(dtype=np.int64)
+    first = year_values.min()
+    years = np.arange(first, year_values.max() + 1)
+    matrix = np.full((len(labels), len(years)), np.nan)
+    matrix[keys.codes, year_values - first] = df[value_col].to_numpy(dtype=np.float64)
+    return labels, years, matrix
+
+
+def fit_trends(years, matrix):
+    # only the p-values need scipy, and importing scipy.special costs ~150 ms
+    from scipy import special
+
+    matrix = np.atleast_2d(matrix)
+    mask = ~np.isnan(matrix)
+    x = np.broadcast_to(np.asarray(years, dtype=np.float64), matrix.shape)
+    n = mask.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = np.where(mask, x, 0.0).sum(axis=1) / n
+        y_mean = np.where(mask, matrix, 0.0).sum(axis=1) / n
+        dx = np.where(mask, x - x_mean[:, None], 0.0)
+        dy = np.where(mask, matrix - y_mean[:, None], 0.0)
+        sxx = (dx * dx).sum(axis=1)
+        syy = (dy * dy).sum(axis=1)
+        sxy = (dx * dy).sum(axis=1)
+
+        slope = sxy / sxx
+        intercept = y_mean - slope * x_mean
+        r = np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0)
+        dof = (n - 2).astype(np.float64)
+        dof[dof <= 0] = np.nan
+        stderr = np.sqrt((1 - r ** 2) * syy / sxx / dof)
+        t = r * np.sqrt(dof / ((1.0 - r) * (1.0 + r)))
+        p_value = 2 * special.stdtr(dof, -np.abs(t))
+
+    return {
+        'slope': slope,
+        'intercept': intercept,
+        'r_squared': r ** 2,
+        'p_value': p_value,
+        'stderr': stderr,
+        'n': n,
+    }
+
+
+def fit_series(x, y):
+    fit = fit_trends(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)[None, :])
+    return {name: values[0] for name, values in fit.items()}
+
+
+def trend_table(df, value_col, key='ISO3', start=None, end=None, min_points=3):
+    labels, years, matrix = country_year_matrix(df, value_col, key=key, start=start, end=end)
+    table = pd.DataFrame(fit_trends(years, matrix), index=pd.Index(labels, name=key))
+    names = df.drop_duplicates(key).set_index(key)['Country']
+    table.insert(0, 'Country', names.reindex(table.index).to_numpy())
+    return table[table['n'] >= min_points]
@@ -0,0 +1,204 @@
+import argparse
+import posixpath
+import re
+import time
+import zipfile
+from xml.etree import ElementTree
+from xml.sax.saxutils import unescape
+
+import numpy as np
+import pandas as pd
+
+CHUNK_BYTES = 64 * 2**10
+MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+RELATIONSHIP = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+ENTITIES = {'&quot;': '"', '&apos;': "'"}
+ROW = re.compile(rb'<row\b([^>]*?)(/?)>')
+ROW_NUMBER = re.compile(rb'\br="(\d+)"')
+CELL = re.compile(rb'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+REF = re.compile(rb'\br="([A-Z]+)\d*"')
+TYPE = re.compile(rb'\bt="(\w+)"')
+VALUE = re.compile(rb'<v>([^<]*)</v>')
+TEXT = re.compile(rb'<t(?:\s[^>]*)?>([^<]*)</t>')
+# cell types whose value isn't a number
+TEXT_TYPES = (b's', b'str', b'inlineStr', b'e')
+
+
+def column_number(letters):
+    number = 0
+    for code in letters:
+        number = number * 26 + code - 64
+    return number - 1
+
+
+def column_letters(number):
+    letters = ''
+    number += 1
+    while number:
+        number, rest = divmod(number - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters.encode()
+
+
+def shared_strings(archive):
+    try:
+        root = ElementTree.fromstring(archive.read('xl/sharedStrings.xml'))
+    except KeyError:
+        return []
+    strings = []
+    for item in root.iter(f'{MAIN}si'):
+        text = item.find(f'{MAIN}t')
+        # rich text is split into runs; phonetic hints (rPh) aren't part of the value
+        parts = [text] if text is not None else [run.find(f'{MAIN}t') for run in item.iter(f'{MAIN}r')]
+        strings.append(''.join(part.text or '' for part in parts if part is not None))
+    return strings
+
+
+def sheet_member(archive, sheet_name=0):
+    workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+    sheets = [(sheet.get('name'), sheet.get(RELATIONSHIP)) for sheet in workbook.iter(f'{MAIN}sheet')]
+    if isinstance(sheet_name, int):
+        if not 0 <= sheet_name < len(sheets):
+            raise ValueError(f'Worksheet index {sheet_name} is invalid, {len(sheets)} worksheets found')
+        _, rel_id = sheets[sheet_name]
+    else:
+        rel_id = dict(sheets).get(sheet_name)
+        if rel_id is None:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+    rels = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    target = next(rel.get('Target') for rel in rels if rel.get('Id') == rel_id)
+    return target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+
+
+def iter_rows(stream, chunk_bytes=CHUNK_BYTES):
+    # read fixed-size blocks of the sheet XML and cut them at the last row end, so memory doesn't grow with it
+    tail = b''
+    number = 0
+    for block in iter(lambda: stream.read(chunk_bytes), b''):
+        data = tail + block
+        cut = data.rfind(b'</row>')
+        if cut < 0:
+            tail = data
+            continue
+        data, tail = data[:cut], data[cut + len(b'</row>'):]
+        for piece in data.split(b'</row>'):
+            # a self-closing <row/> has no cells, but still takes a row number
+            for match in ROW.finditer(piece):
+                found = ROW_NUMBER.search(match.group(1))
+                number = int(found.group(1)) if found else number + 1
+                if not match.group(2):
+                    yield number, piece[match.end():]
+
+
+def cell_text(attrs, body, strings):
+    kind = TYPE.search(attrs)
+    kind = kind.group(1) if kind else b'n'
+    if kind == b'inlineStr':
+        return unescape(b''.join(TEXT.findall(body or b'')).decode(), ENTITIES)
+    value = VALUE.search(body or b'')
+    if value is None:
+        return None
+    if kind == b's':
+        return strings[int(value.group(1))]
+    if kind in (b'str', b'e'):
+        return unescape(value.group(1).decode(), ENTITIES)
+    number = float(value.group(1))
+    return int(number) if number.is_integer() else number
+
+
+def year_label(letters, label):
+    if isinstance(label, int) or (isinstance(label, str) and label.isdigit()):
+        return int(label)
+    raise ValueError(f'Column {letters.decode()} is headed {label!r}, not a year; '
+                     'expected a country column followed by one column per year')
+
+
+def read_matrix(path, sheet_name=0, countries=None, min_year=None, max_year=None, chunk_bytes=CHUNK_BYTES):
+    # (id label, ids, year labels, float64 values) of a country-by-year sheet, parsing only the cells asked for
+    wanted = None if countries is None else set(countries)
+    with zipfile.ZipFile(path) as archive:
+        strings = shared_strings(archive)
+        with archive.open(sheet_member(archive, sheet_name)) as stream:
+            rows = iter_rows(stream, chunk_bytes)
+            header = next(((number, row) for number, row in rows if CELL.search(row)), None)
+            if header is None:
+                raise ValueError(f"'{path}' has no header row")
+            cells = [(REF.search(attrs).group(1), cell_text(attrs, body, strings))
+                     for attrs, body in CELL.findall(header[1])]
+            (id_letters, id_label), cells = cells[0], [cell for cell in cells[1:] if cell[1] is not None]
+            years = [year_label(letters, label) for letters, label in cells]
+            keep = [(min_year is None or year >= min_year) and (max_year is None or year <= max_year)
+                    for year in years]
+            labels = [label for (_, label), kept in zip(cells, keep) if kept]
+            # sheet column -> output column, for the year columns in range
+            columns = {column_number(letters): i
+                       for i, letters in enumerate(letters for (letters, _), kept in zip(cells, keep) if kept)}
+            first = column_letters(min(columns)) if columns else None
+            last = max(columns, default=-1)
+
+            ids, rows_out, seen = [], [], set()
+            for number, row in rows:
+                match = CELL.search(row)
+                if match is None:
+                    continue
+                ref = REF.search(match.group(1))
+                is_id = ref is None or ref.group(1) == id_letters
+                country = cell_text(*match.groups(), strings) if is_id else None
+                if wanted is not None and country not in wanted:
+                    continue
+                # cells are stored in column order, so jump straight to the first year in range
+                start = row.find(b'<c r="' + first + str(number).encode() + b'"') if first else -1
+                start = start if start >= 0 else (match.end() if is_id else match.start())
+                targets, raw = [], []
+                for cell in CELL.finditer(row, start) if first else ():
+                    attrs, body = cell.groups()
+                    column = column_number(REF.search(attrs).group(1))
+                    if column > last:
+                        break
+                    target = columns.get(column)
+                    kind = TYPE.search(attrs)
+                    value = VALUE.search(body) if body else None
+                    if target is None or value is None or (kind and kind.group(1) in TEXT_TYPES):
+                        continue
+                    targets.append(target)
+                    raw.append(value.group(1))
+                values = np.full(len(labels), np.nan)
+                if raw:
+                    values[targets] = np.array(raw).astype(np.float64)
+                ids.append(country)
+                rows_out.append(values)
+                seen.add(country)
+                if wanted is not None and seen >= wanted:
+                    break
+
+    values = np.vstack(rows_out) if rows_out else np.empty((0, len(labels)))
+    return id_label, np.array(ids, dtype=object), labels, values
+
+
+def read_workbook(path, sheet_name=0, countries=None, min_year=None, max_year=None, chunk_bytes=CHUNK_BYTES):
+    id_label, ids, labels, values = read_matrix(path, sheet_name, countries, min_year, max_year, chunk_bytes)
+    df = pd.DataFrame(values, columns=labels)
+    df.insert(0, id_label, ids)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read a slice of a Gapminder country-by-year workbook.')
+    parser.add_argument('path', nargs='?', default='invidual/yearly_co2_emissions_1000_tonnes.xlsx')
+    parser.add_argument('--countries', nargs='+')
+    parser.add_argument('--min-year', type=int)
+    parser.add_argument('--max-year', type=int)
+    parser.add_argument('--out', help='write the slice to this CSV file')
+    args = parser.parse_args()
+    if args.min_year is not None and args.max_year is not None and args.min_year > args.max_year:
+        parser.error('--min-year must not be after --max-year')
+
+    start = time.perf_counter()
+    df = read_workbook(args.path, countries=args.countries, min_year=args.min_year, max_year=args.max_year)
+    print(f'{df.shape[0]} rows x {df.shape[1] - 1} years in {time.perf_counter() - start:.3f}s')
+    if args.out:
+        df.to_csv(args.out, index=False)
+
+
+if __name__ == '__main__':
+    main()